@@ -49,6 +49,7 @@ class ModularFilter():
        covarianceMatrix(covarianceContainer): Object which stores covariance matrix
        subStates(dict): Dictionary of all substate objects
        signalSources(dict): Dictionary of all signal source objects
+       signalSourceCatalogs(dict): Dictionary of all signal source catalogs
        tCurrent(float): Current filter time
        measurementValidationThreshold(float): Probability below which a signal source is rejected
        measurementList(list): A list of measurements used by the filter
@@ -80,6 +81,7 @@ class ModularFilter():
 
         self.subStates = {}
         self.signalSources = {}
+        self.signalSourceCatalogs = {}
         self.tCurrent = time
 
         self.measurementValidationThreshold = measurementValidationThreshold
@@ -166,6 +168,32 @@ class ModularFilter():
         
         return
 
+    def addSignalSourceCatalog(
+            self,
+            name,
+            catalog
+    ):
+        """
+        addSignalSourceCatalog adds a group of signal sources whose association probabilities are computed together (e.g. a :class:`~modest.signals.pointsourcecatalog.PointSourceCatalog`).
+
+        Each source in the catalog is also added as an individual signal source under its own name, so that measurement updates can be done with the source as usual.  Only the association probabilities are computed by the catalog, see :meth:`computeAssociationProbabilities`.
+
+        Args:
+         name (str): The name by which the catalog can be referenced (must be unique)
+         catalog (PointSourceCatalog): The catalog of signal sources
+        """
+        if name in self.signalSourceCatalogs:
+            raise ValueError(
+                'The name %s has already been used for a signal source catalog.'
+                % name
+                )
+        for sourceName in catalog:
+            self.addSignalSource(sourceName, catalog[sourceName])
+
+        self.signalSourceCatalogs[name] = catalog
+
+        return
+
     def timeUpdateEKF(
             self,
             dT,
@@ -295,17 +323,43 @@ class ModularFilter():
     """
         
 
-        probabilityDict = {}
-        probabilitySum = 0
-        for signalKey in self.signalSources:
-            currentProbability = (
-                self.signalSources[signalKey].computeAssociationProbability(
+        signalNames = []
+        probabilities = []
+
+        # Catalogs compute the probabilities of all their sources at once
+        catalogSources = set()
+        for catalogKey in self.signalSourceCatalogs:
+            catalog = self.signalSourceCatalogs[catalogKey]
+            signalNames.extend(catalog.sourceNames)
+            probabilities.append(
+                catalog.computeAssociationProbabilities(
                     measurement,
                     self.subStates,
                     validationThreshold=self.measurementValidationThreshold
                 )
             )
+            catalogSources.update(catalog.sourceNames)
 
+        for signalKey in self.signalSources:
+            if signalKey in catalogSources:
+                continue
+            signalNames.append(signalKey)
+            probabilities.append(
+                [
+                    self.signalSources[signalKey].computeAssociationProbability(
+                        measurement,
+                        self.subStates,
+                        validationThreshold=self.measurementValidationThreshold
+                    )
+                ]
+            )
+
+        if probabilities:
+            probabilities = np.concatenate(probabilities).astype(float)
+        else:
+            probabilities = np.zeros(0)
+
+        for signalKey, currentProbability in zip(signalNames, probabilities):
             if currentProbability < 0:
                 raise ValueError(
                     'Got negative probability for measurement %s, signal source %s'
@@ -316,17 +370,12 @@ class ModularFilter():
                     'Got NaN probability for measurement %s, signal source %s'
                     %(measurement, signalKey)
                     )
-            probabilityDict[signalKey] = currentProbability
-            probabilitySum = probabilitySum + currentProbability
-        for probabilityKey in probabilityDict:
-            if probabilitySum > 0:
-                probabilityDict[probabilityKey] = (
-                    probabilityDict[probabilityKey] / probabilitySum
-                )
-            else:
-                probabilityDict[probabilityKey] = (
-                    probabilityDict[probabilityKey]
-                )
+
+        probabilitySum = np.sum(probabilities)
+        if probabilitySum > 0:
+            probabilities = probabilities / probabilitySum
+
+        probabilityDict = dict(zip(signalNames, probabilities))
 
         # print(probabilityDict)
         return (probabilityDict)
@@ -672,6 +721,66 @@ class ModularFilter():
         # print(signalAssociationProbability)
         return (xPlus, PPlus, measurement, validAssociationsDict, spreadOfMeans)
 
+    def measurementUpdateBatch(
+            self,
+            photonBatch,
+            updateMethod='EKF',
+            sourceName=None,
+            dynamics=None
+            ):
+        """
+        measurementUpdateBatch processes a time-ordered batch of measurements.
+
+        For each measurement in the batch, the state is time-updated (using :meth:`timeUpdateEKF`) from the current filter time to the time of the measurement, and then measurement-updated using the specified update method.
+
+        Args:
+         photonBatch (PhotonBatch or list): Time-ordered measurements, either as a :class:`~modest.utils.photonBatch.PhotonBatch` or a list of measurement dicts
+         updateMethod (str): Measurement update to use: "EKF" (:meth:`measurementUpdateEKF`), "ML" (:meth:`measurementUpdateML`) or "JPDAF" (:meth:`measurementUpdateJPDAF`)
+         sourceName (str): For EKF updates, the name of the signal source of the measurements.  If None, the "name" of each measurement is used.
+         dynamics (function): Optional function which returns the dynamics dict to use for the time update to a given measurement time
+
+        Returns:
+         numpy.array, covarianceContainer: The state vector and covariance after the last measurement update
+
+        Example: ::
+
+            myFilter.measurementUpdateBatch(
+                myPulsar.generatePhotonArrivals(10, columnar=True),
+                sourceName=myPulsar.name
+            )
+        """
+        if updateMethod not in ['EKF', 'ML', 'JPDAF']:
+            raise ValueError(
+                'Unrecognized update method %s.  Method should be "EKF", "ML" or "JPDAF".'
+                % updateMethod
+            )
+
+        xPlus = self.getGlobalStateVector()
+        PPlus = self.covarianceMatrix
+        for measurement in photonBatch:
+            measurementTime = measurement['t']['value']
+            if dynamics is not None:
+                self.timeUpdateEKF(
+                    measurementTime - self.tCurrent,
+                    dynamics=dynamics(measurementTime)
+                )
+            else:
+                self.timeUpdateEKF(measurementTime - self.tCurrent)
+
+            if updateMethod == 'EKF':
+                if sourceName is None:
+                    measurementSource = measurement['name']
+                else:
+                    measurementSource = sourceName
+                xPlus, PPlus = self.measurementUpdateEKF(
+                    measurement, measurementSource
+                )
+            elif updateMethod == 'ML':
+                xPlus, PPlus = self.measurementUpdateML(measurement)
+            else:
+                xPlus, PPlus = self.measurementUpdateJPDAF(measurement)[0:2]
+        return (xPlus, PPlus)
+
     def getGlobalStateVector(
             self
             ):
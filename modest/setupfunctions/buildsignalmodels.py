@@ -1,6 +1,22 @@
 import numpy as np
 from .. import substates, signals, utils
 
+def pulsarCacheArguments(traj):
+    # The pulsar cache is opt-in: it is used if filesAndDirs.usePulsarCache
+    # is set, in filesAndDirs.pulsarCacheDirectory if given (otherwise in the
+    # user cache directory)
+    if (
+            ('usePulsarCache' not in traj.filesAndDirs) or
+            (not traj.filesAndDirs.usePulsarCache.value)
+    ):
+        return {'useCache': False}
+    if 'pulsarCacheDirectory' in traj.filesAndDirs:
+        cacheDirectory = traj.filesAndDirs.pulsarCacheDirectory.value
+    else:
+        cacheDirectory = None
+    return {'useCache': True, 'cacheDirectory': cacheDirectory}
+
+
 def getPulsarCoordinates(pulsarName, traj):
     pulsarObjectDict = utils.loadPulsarData(
         detectorArea=1,
@@ -8,6 +24,7 @@ def getPulsarCoordinates(pulsarName, traj):
         pulsarCatalogFileName=traj.filesAndDirs.pulsarDataFile.value,
         PARDir=traj.filesAndDirs.ParFileDirectory.value,
         profileDir=traj.filesAndDirs.profileDirectory.value,
+        **pulsarCacheArguments(traj)
     )
     return pulsarObjectDict[pulsarName].RaDec()
     
@@ -32,7 +49,8 @@ def buildPulsarModel(
         PARDir=traj.filesAndDirs.ParFileDirectory.value,
         profileDir=traj.filesAndDirs.profileDirectory.value,
         observatoryMJDREF=mySpacecraft.dynamics.MJDREF,
-        energyRange=mySpacecraft.detector.energyRange
+        energyRange=mySpacecraft.detector.energyRange,
+        **pulsarCacheArguments(traj)
     )
 
     try:
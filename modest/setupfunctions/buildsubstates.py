@@ -4,11 +4,22 @@ from .. modularfilter import ModularFilter
 
 
 ## @fun buildPulsarCorrelationSubstate builds an correlation substate based on imported Traj
+#
+# @details If acquisitionPhotons (an array of arrival times, or a list of
+# photon measurement dicts) is given, the photons are folded and
+# cross-correlated with the pulse profile (see
+# utils.pulsarAcquisition.acquireTDOA) to initialize the correlation vector,
+# signalTDOA and TDOAVar (and the position of the internal navigation
+# filter), so that the filter starts near peak lock.  If
+# correlationFilter.acquisitionVelocitySearch is set, a joint TDOA/velocity
+# search (utils.pulsarAcquisition.acquireTDOAVelocity) is used instead, and the
+# velocity found also initializes the internal navigation filter.
 def buildPulsarCorrelationSubstate(
         traj,
         pulsarObject,
         mySpacecraft,
         ureg,
+        acquisitionPhotons=None
 ):
     tdoaStdDevThreshold = None
     velStdDevThreshold = None
@@ -111,8 +122,67 @@ def buildPulsarCorrelationSubstate(
 
     navProcessNoise = navProcessNoise.to(navProcessNoiseUnits).magnitude
         
+    nFilterTaps = traj.correlationFilter.filterTaps.value
+
+    # If photons are available for acquisition, fold them against the pulse
+    # profile to initialize the correlation vector, TDOA and internal
+    # navigation filter near peak lock.  If the velocity search is enabled,
+    # the photons are folded over a grid of velocity hypotheses about
+    # vInitial, and the best velocity replaces vInitial.  Otherwise the filter
+    # starts from a flat correlation vector.
+    if acquisitionPhotons is not None:
+        if 'acquisitionBins' in traj.correlationFilter:
+            acquisitionBins = traj.correlationFilter.acquisitionBins.value
+        else:
+            acquisitionBins = 1024
+        if (
+                ('acquisitionVelocitySearch' in traj.correlationFilter) and
+                traj.correlationFilter.acquisitionVelocitySearch.value
+        ):
+            if vInitial is None:
+                raise ValueError(
+                    'The acquisition velocity search requires an initial ' +
+                    'velocity estimate (initialVelocityStdDev)'
+                )
+            if 'acquisitionProcesses' in traj.correlationFilter:
+                acquisitionProcesses = traj.correlationFilter.acquisitionProcesses.value
+            else:
+                acquisitionProcesses = 1
+            acquisition = utils.pulsarAcquisition.acquireTDOAVelocity(
+                acquisitionPhotons,
+                pulsarObject,
+                vInitial['value'],
+                np.sqrt(vInitial['var']),
+                nBins=acquisitionBins,
+                filterOrder=nFilterTaps,
+                dT=myPulsarPeriod/(nFilterTaps+1),
+                referenceTime=tStart,
+                processes=acquisitionProcesses
+            )
+            vInitial = {
+                'value': acquisition['velocity'],
+                'var': acquisition['velocityVar']
+            }
+        else:
+            acquisition = utils.pulsarAcquisition.acquireTDOA(
+                acquisitionPhotons,
+                pulsarObject,
+                nBins=acquisitionBins,
+                filterOrder=nFilterTaps,
+                dT=myPulsarPeriod/(nFilterTaps+1),
+                referenceTime=tStart
+            )
+        initialCorrelationVector = acquisition['correlationVector']
+        initialCorrelationVectorCovariance = acquisition['correlationVectorCovariance']
+        initialTDOA = acquisition['signalTDOA']
+        initialTDOAVar = acquisition['TDOAVar']
+    else:
+        initialCorrelationVector = None
+        initialCorrelationVectorCovariance = None
+        initialTDOA = 0
+        initialTDOAVar = 0
+
     if traj.correlationFilter.internalNavFilter.INF_Type.value == 'external':
-        internalNavFilter = ModularFilter()
         if traj.correlationFilter.internalNavFilter.biasState.useBiasState.value:
             navCov = np.eye(3)
             navCov[2,2] = myPulsarPeriod/12
@@ -145,43 +215,66 @@ def buildPulsarCorrelationSubstate(
 
         navX0[1] = vInitial['value']
 
+        if acquisitionPhotons is not None:
+            navX0[0] = initialTDOA
+            navCov[0,0] = initialTDOAVar
+
         if biasStateProcessNoiseStdDev:
             biasStateProcessNoiseVar = np.square(biasStateProcessNoiseStdDev)
         else:
             biasStateProcessNoiseVar = None
 
-        navState = substates.oneDimensionalPositionVelocity.oneDPositionVelocity(
-            'oneDPositionVelocity',
-            {
-                't': tStart,
-                'stateVector': navX0,
-                'position': 0,
-                'biasState': 0,
-                'positionStd': np.sqrt(myPulsarPeriod/12),
-                'velocity': navX0[1],
-                'velocityStd': 1,
-                'covariance': navCov,
-                'aPriori': True,
-                'stateVectorID': -1
-            },
-            biasState=traj.correlationFilter.internalNavFilter.biasState.useBiasState.value,
-            biasStateTimeConstant=biasStateTimeConstant,
-            biasStateProcessNoiseVar=biasStateProcessNoiseVar,
-            storeLastStateVectors=traj.correlationFilter.storeLastStateVectors.value,
-        )
+        navStateVectorHistory = {
+            't': tStart,
+            'stateVector': navX0,
+            'position': 0,
+            'biasState': 0,
+            'positionStd': np.sqrt(myPulsarPeriod/12),
+            'velocity': navX0[1],
+            'velocityStd': 1,
+            'covariance': navCov,
+            'aPriori': True,
+            'stateVectorID': -1
+        }
 
-        internalNavFilter.addStates(
-            'oneDPositionVelocity',
-            navState
-        )
-        internalNavFilter.addSignalSource(
-            'oneDPositionVelocity',
-            signals.oneDimensionalObject.oneDObjectMeasurement('oneDPositionVelocity')
-        )
-        internalNavFilter.addSignalSource(
-            '',
-            None
-        )        
+        # The closed form kernel performs the same EKF as a ModularFilter
+        # containing a single oneDPositionVelocity substate, without the
+        # overhead of the general purpose filter
+        if (
+                ('closedFormKernel' in traj.correlationFilter.internalNavFilter) and
+                traj.correlationFilter.internalNavFilter.closedFormKernel.value
+        ):
+            internalNavFilter = substates.oneDimensionalPositionVelocity.oneDPositionVelocityFilter(
+                'oneDPositionVelocity',
+                navStateVectorHistory,
+                biasState=traj.correlationFilter.internalNavFilter.biasState.useBiasState.value,
+                biasStateTimeConstant=biasStateTimeConstant,
+                biasStateProcessNoiseVar=biasStateProcessNoiseVar,
+                storeLastStateVectors=traj.correlationFilter.storeLastStateVectors.value,
+            )
+        else:
+            internalNavFilter = ModularFilter()
+            navState = substates.oneDimensionalPositionVelocity.oneDPositionVelocity(
+                'oneDPositionVelocity',
+                navStateVectorHistory,
+                biasState=traj.correlationFilter.internalNavFilter.biasState.useBiasState.value,
+                biasStateTimeConstant=biasStateTimeConstant,
+                biasStateProcessNoiseVar=biasStateProcessNoiseVar,
+                storeLastStateVectors=traj.correlationFilter.storeLastStateVectors.value,
+            )
+
+            internalNavFilter.addStates(
+                'oneDPositionVelocity',
+                navState
+            )
+            internalNavFilter.addSignalSource(
+                'oneDPositionVelocity',
+                signals.oneDimensionalObject.oneDObjectMeasurement('oneDPositionVelocity')
+            )
+            internalNavFilter.addSignalSource(
+                '',
+                None
+            )
 
     print("|||||||||||||||||||||||||||||||")
     print("inititalizine INF with type:")
@@ -194,7 +287,6 @@ def buildPulsarCorrelationSubstate(
         traj.correlationFilter.processNoise.value
     )  # Unitless??
 
-    nFilterTaps = traj.correlationFilter.filterTaps.value
     measurementNoiseScaleFactor = (
         traj.correlationFilter.measurementNoiseScaleFactor.value
     )
@@ -216,6 +308,10 @@ def buildPulsarCorrelationSubstate(
         pulsarObject,
         nFilterTaps,
         myPulsarPeriod/(nFilterTaps+1),
+        correlationVector=initialCorrelationVector,
+        correlationVectorCovariance=initialCorrelationVectorCovariance,
+        signalTDOA=initialTDOA,
+        TDOAVar=initialTDOAVar,
         tdoaStdDevThreshold=tdoaStdDevThreshold,
         velStdDevThreshold=velStdDevThreshold,
         tdoaNoiseScaleFactor=tdoaNoiseScaleFactor,
@@ -8,6 +8,7 @@ from . pointsource import PointSource
 from . staticxraypointsource import StaticXRayPointSource
 from . uniformnoisexraysource import UniformNoiseXRaySource
 from . periodicxraysource import PeriodicXRaySource
+from . pointsourcecatalog import PointSourceCatalog
 
 __all__ = [
     "SignalSource",
@@ -17,5 +18,6 @@ __all__ = [
     "PointSource",
     "StaticXRayPointSource",
     "UniformNoiseXRaySource",
-    "PeriodicXRaySource"
+    "PeriodicXRaySource",
+    "PointSourceCatalog"
 ]
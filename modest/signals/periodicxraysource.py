@@ -3,12 +3,14 @@
 # @brief This file contains the PeriodicXRaySource class
 
 import numpy as np
-from math import factorial, isnan
+from math import factorial, isnan, isfinite, floor
+from fractions import Fraction
 import matplotlib.pyplot as plt
 
 from . import pointsource
 from . import poissonsource
 from .. utils import spacegeometry as sg
+from .. utils.photonBatch import PhotonBatch
 
 
 class PeriodicXRaySource(
@@ -46,7 +48,9 @@ class PeriodicXRaySource(
             extent=None,
             useTOAprobability=True,
             useFitted=True,
-            detectorArea=1
+            detectorArea=1,
+            phaseCacheSpan=None,
+            profileHarmonics=None
     ):
         
         # Store the user-passed arguments first.  These take priority of
@@ -61,6 +65,28 @@ class PeriodicXRaySource(
         use if both are present.
         """
 
+        self.phaseCacheSpan = phaseCacheSpan
+        """
+        Length of time (in seconds) covered by each segment of the phase cache
+        (see :meth:`getPhaseSegment`).  If None, phase is computed directly
+        from the phase polynomial.
+        """
+
+        self.phaseSegments = {}
+        """
+        Cache of phase segments built by :meth:`getPhaseSegment`, keyed by segment index
+        """
+        self.__segmentIndices__ = None
+
+        self.profileHarmonics = profileHarmonics
+        """
+        Number of harmonics in the Fourier series representation of the
+        profile (see :attr:`fourierCoefficients`).  If None, the profile is
+        only represented by its samples.
+        """
+
+        self.fourierCoefficients = None
+
         self.detectorArea = detectorArea
         """
         Allows user to specify area of detector by which flux is multiplied. 
@@ -253,7 +279,8 @@ class PeriodicXRaySource(
             self.pulsarPeriod = 1/self.fittedPhaseDerivatives[1]
         else:
             self.pulsarPeriod = 1/self.phaseDerivatives[1]
-            
+
+        self.computePhaseCoefficients()
         self.computeSinglePeriodIntegral()
         
         poissonsource.DynamicPoissonSource.__init__(
@@ -314,6 +341,40 @@ class PeriodicXRaySource(
         
         self.profileIndex = np.linspace(0, 1, len(self.profile))
 
+        # Slopes of the profile between samples, used by interpolateProfile
+        # to look up the profile on its uniform phase grid without a search
+        self.profileSlope = np.diff(self.profile)
+        self.__profileTable__ = (self.profile.tolist(), self.profileSlope.tolist())
+
+        if self.profileHarmonics:
+            # Fourier coefficients of the linearly interpolated profile: the
+            # DFT of the samples, multiplied by the transform of the
+            # triangular interpolation kernel
+            profileSamples = self.profile[:-1]
+            harmonics = np.arange(self.profileHarmonics + 1)
+            profileDFT = np.fft.fft(profileSamples) / len(profileSamples)
+            self.fourierCoefficients = (
+                profileDFT[harmonics % len(profileSamples)] *
+                np.square(np.sinc(harmonics / len(profileSamples)))
+            )
+            r"""
+            Complex Fourier coefficients :math:`c_k` of the profile as a
+            function of phase, for :math:`k = 0, \ldots, N`, where :math:`N`
+            is :attr:`profileHarmonics`.
+            """
+
+            # The truncated series rings (and can go negative) around sharp
+            # features of the profile.  Once the time uncertainty damps the
+            # first omitted harmonic by a factor of 100, the truncation error
+            # is negligible.
+            self.fourierPhaseSigma = (
+                np.sqrt(np.log(100) / 2) / (np.pi * (self.profileHarmonics + 1))
+            )
+            """
+            Smallest standard deviation of phase for which :meth:`getSignal`
+            uses the Fourier series to compute the expected signal
+            """
+
         return
     
 
@@ -486,6 +547,11 @@ class PeriodicXRaySource(
         ):
             self.fittedPhaseDerivatives = PARFittedPhaseDerivatives
 
+        # If the phase model was replaced after initialization, update the
+        # polynomial coefficients
+        if replaceCurrentValues and hasattr(self, 'phaseCoefficients'):
+            self.computePhaseCoefficients()
+
         if len(newProfile) > 0:
             # plt.figure()
             # plt.plot(newProfile)
@@ -496,6 +562,52 @@ class PeriodicXRaySource(
                 
         return(PAR_RA, PAR_Dec)
 
+    def computePhaseCoefficients(
+            self
+    ):
+        r"""
+        Compute the polynomial coefficients of phase and frequency as a
+        function of time.
+
+        The phase model is the Taylor series
+
+        .. math::
+            \phi(t) = \sum_n \frac{\phi^{(n)}}{n!} (t - t_0)^n
+
+        where the derivatives are taken from :attr:`phaseDerivatives` (or
+        :attr:`fittedPhaseDerivatives`).  The coefficients of the series and
+        of its derivative (the frequency) are computed once and stored, so
+        that :meth:`getPhase` and :meth:`getFrequency` can evaluate them by
+        Horner's method on arrays of times.  This method should be called
+        again if the phase derivatives are changed.
+        """
+        if self.useFitted:
+            myPhaseDerivatives = self.fittedPhaseDerivatives
+        else:
+            myPhaseDerivatives = self.phaseDerivatives
+
+        maxOrder = int(np.max(list(myPhaseDerivatives.keys())))
+        coefficients = np.zeros(maxOrder + 1)
+        for order in myPhaseDerivatives:
+            coefficients[int(order)] = (
+                myPhaseDerivatives[order] / factorial(int(order))
+            )
+
+        self.phaseCoefficients = coefficients[::-1]
+        """
+        Coefficients of the phase polynomial in time (relative to :attr:`TZeroDiff`), highest order first
+        """
+
+        self.frequencyCoefficients = np.polyder(self.phaseCoefficients)
+        """
+        Coefficients of the frequency polynomial in time (relative to :attr:`TZeroDiff`), highest order first
+        """
+
+        # Any cached phase segments were built from the old coefficients
+        self.phaseSegments = {}
+        self.__segmentIndices__ = None
+        return
+
     def computeSinglePeriodIntegral(
             self
             ):
@@ -525,6 +637,12 @@ class PeriodicXRaySource(
                 axis=0
             )
 
+        self.singlePeriodIntegralSlope = np.diff(self.singlePeriodIntegral)
+        self.__integralTable__ = (
+            self.singlePeriodIntegral.tolist(),
+            self.singlePeriodIntegralSlope.tolist()
+        )
+
         # Store the total flux integral over one period
         fluxIntegral = self.singlePeriodIntegral[-1]
 
@@ -584,29 +702,200 @@ class PeriodicXRaySource(
 It is up to the user to verify the validity of the results.
         
         Args:
-         observatoryTime (float): Local time at which flux is to be computed.
+         observatoryTime (float or numpy.array): Local time(s) at which phase is to be computed.
 
         Returns:
-          (float): Current pulsar phase
+          (float or numpy.array): Current pulsar phase
         """
-        phase = 0
-        shiftedObservatoryTime = observatoryTime - self.TZeroDiff
-        
-        if self.useFitted:
-            myPhaseDerivatives = self.fittedPhaseDerivatives
+        if self.phaseCacheSpan is not None:
+            integerCycles, fractionalPhase = self.getPhaseCycles(observatoryTime)
+            return integerCycles + fractionalPhase
+
+        shiftedObservatoryTime = (
+            np.asarray(observatoryTime, dtype=float) - self.TZeroDiff
+        )
+
+        # Horner evaluation of the phase polynomial (see
+        # computePhaseCoefficients)
+        phase = np.polyval(self.phaseCoefficients, shiftedObservatoryTime)
+        return(phase)
+
+    def getPhaseCycles(
+            self,
+            observatoryTime
+    ):
+        r"""
+        Compute the current phase of the pulsar signal, split into whole
+        cycles and fractional phase.
+
+        Far from the reference epoch, the phase is a large number of cycles
+        and a float cannot hold both the cycle count and the fractional
+        phase to full precision.  If :attr:`phaseCacheSpan` is set, the
+        phase is evaluated from cached segments (see :meth:`getPhaseSegment`),
+        which keep the integer cycle count at the center of each segment
+        separately from the fractional phase, so the fractional phase keeps
+        its precision.  Otherwise the phase is computed by :meth:`getPhase`
+        and split.
+
+        Args:
+         observatoryTime (float or numpy.array): Local time(s) at which phase is to be computed.
+
+        Returns:
+          (float or numpy.array, float or numpy.array): Whole number of cycles, and fractional phase in [0, 1)
+        """
+        if self.phaseCacheSpan is None:
+            phase = self.getPhase(observatoryTime)
+            integerCycles = np.floor(phase)
+            return integerCycles, phase - integerCycles
+
+        shiftedObservatoryTime = (
+            np.asarray(observatoryTime, dtype=float) - self.TZeroDiff
+        )
+        segmentIndices = np.floor(
+            shiftedObservatoryTime / self.phaseCacheSpan
+        ).astype(int)
+
+        if np.ndim(segmentIndices) == 0:
+            segment = self.getPhaseSegment(segmentIndices)
+            tMid = segment['tMid']
+            segmentCycles = segment['integerCycles']
+            coefficients = segment['coefficients']
         else:
-            myPhaseDerivatives = self.phaseDerivatives
-            
-        for order in myPhaseDerivatives:
-            phase = (
-                phase +
-                (
-                    myPhaseDerivatives[order] *
-                    np.power(shiftedObservatoryTime, order) /
-                    factorial(order)
-                )
+            # Gather the segment values for every time from the segment
+            # table, building any missing segments first
+            tableIndices = self.phaseSegmentTableIndices(segmentIndices)
+            tMid = self.__segmentTMid__[tableIndices]
+            segmentCycles = self.__segmentCycles__[tableIndices]
+            coefficients = self.__segmentCoefficients__[tableIndices]
+
+        # Horner evaluation of each segment's local polynomial
+        localTime = shiftedObservatoryTime - tMid
+        localPhase = coefficients[..., 0]
+        for order in range(1, coefficients.shape[-1]):
+            localPhase = localPhase * localTime + coefficients[..., order]
+
+        localCycles = np.floor(localPhase)
+        integerCycles = segmentCycles + localCycles
+        fractionalPhase = localPhase - localCycles
+        return integerCycles, fractionalPhase
+
+    def phaseSegmentTableIndices(
+            self,
+            segmentIndices
+    ):
+        r"""
+        Finds the entries of the segment table for an array of segment
+        indices, building any segments that don't exist yet.
+
+        The segments in :attr:`phaseSegments` are also stored in arrays
+        sorted by segment index, so that the segments of an array of times
+        can be gathered with a binary search.  Only the segments which have
+        been built are stored, so the table grows with the number of
+        segments used rather than the span of time between them.
+
+        Args:
+         segmentIndices (numpy.array): Segment indices
+
+        Returns:
+         (numpy.array): Position of each segment in the segment table
+        """
+        if self.__segmentIndices__ is None:
+            self.updatePhaseSegmentTable()
+        tableIndices = np.searchsorted(self.__segmentIndices__, segmentIndices)
+        if len(self.__segmentIndices__) == 0:
+            missingSegments = np.ones(np.shape(segmentIndices), dtype=bool)
+        else:
+            missingSegments = self.__segmentIndices__[
+                np.minimum(tableIndices, len(self.__segmentIndices__) - 1)
+            ] != segmentIndices
+        if np.any(missingSegments):
+            for segmentIndex in np.unique(segmentIndices[missingSegments]):
+                self.getPhaseSegment(segmentIndex)
+            self.updatePhaseSegmentTable()
+            tableIndices = np.searchsorted(self.__segmentIndices__, segmentIndices)
+        return tableIndices
+
+    def updatePhaseSegmentTable(self):
+        r"""
+        Rebuilds the sorted segment table (see
+        :meth:`phaseSegmentTableIndices`) from :attr:`phaseSegments`.
+        """
+        polynomialOrder = len(self.phaseCoefficients) - 1
+        segmentIndices = sorted(self.phaseSegments)
+        self.__segmentIndices__ = np.array(segmentIndices, dtype=int)
+        self.__segmentTMid__ = np.array(
+            [self.phaseSegments[index]['tMid'] for index in segmentIndices]
+        )
+        self.__segmentCycles__ = np.array(
+            [self.phaseSegments[index]['integerCycles'] for index in segmentIndices]
+        )
+        self.__segmentCoefficients__ = np.reshape(
+            [self.phaseSegments[index]['coefficients'] for index in segmentIndices],
+            [len(segmentIndices), polynomialOrder + 1]
+        )
+        return
+
+    def getPhaseSegment(
+            self,
+            segmentIndex
+    ):
+        r"""
+        Returns a segment of the phase cache, building it if it does not exist.
+
+        Similar to a TEMPO polyco, segment :math:`i` covers
+        :math:`i T_s \le t - t_0 < (i+1) T_s`, where :math:`T_s` is
+        :attr:`phaseCacheSpan`.  Over the segment, phase is expanded about the
+        center of the segment :math:`t_i` as
+
+        .. math::
+            \phi(t) = N_i + \sum_k a_k (t - t_i)^k
+
+        where :math:`N_i` is the whole number of cycles at :math:`t_i` and
+        :math:`a_0` is the fractional phase at :math:`t_i`.  :math:`N_i` and
+        :math:`a_0` are computed from the phase polynomial with exact rational
+        arithmetic.  Since the phase model is a polynomial, the expansion is
+        of the same order and introduces no truncation error.
+
+        Segments are built on demand (i.e. as time advances), and looked up
+        by index in :attr:`phaseSegments`.
+
+        Args:
+         segmentIndex (int): Index of the segment
+
+        Returns:
+         (dict): Dictionary containing the segment center "tMid" (relative to :attr:`TZeroDiff`), "integerCycles", and the local polynomial "coefficients" (highest order first)
+        """
+        segmentIndex = int(segmentIndex)
+        if segmentIndex in self.phaseSegments:
+            return self.phaseSegments[segmentIndex]
+
+        tMid = (segmentIndex + 0.5) * self.phaseCacheSpan
+        globalCoefficients = self.phaseCoefficients[::-1]
+        polynomialOrder = len(globalCoefficients) - 1
+
+        exactPhase = sum(
+            Fraction(globalCoefficients[order]) * (Fraction(tMid) ** order)
+            for order in range(polynomialOrder + 1)
+        )
+        integerCycles = floor(exactPhase)
+
+        localCoefficients = np.zeros(polynomialOrder + 1)
+        localCoefficients[0] = float(exactPhase - integerCycles)
+        for localOrder in range(1, polynomialOrder + 1):
+            localCoefficients[localOrder] = sum(
+                globalCoefficients[order] *
+                (factorial(order) / (factorial(localOrder) * factorial(order - localOrder))) *
+                np.power(tMid, order - localOrder)
+                for order in range(localOrder, polynomialOrder + 1)
             )
-        return(phase)
+
+        segment = {
+            'tMid': tMid,
+            'integerCycles': float(integerCycles),
+            'coefficients': localCoefficients[::-1]
+        }
+        self.phaseSegments[segmentIndex] = segment
+        return segment
 
     def getFrequency(
             self,
@@ -621,30 +910,16 @@ It is up to the user to verify the validity of the results.
          :meth:`getPeriod`
 
         Args:
-         observatoryTime (float): Time for which frequency is to be computed
+         observatoryTime (float or numpy.array): Time(s) for which frequency is to be computed
         
         Returns:
-         (float): Computed frequency in Hz
+         (float or numpy.array): Computed frequency in Hz
         """
         
-        frequency = 0
-        shiftedObservatoryTime = observatoryTime - self.TZeroDiff
-        
-        if self.useFitted:
-            myPhaseDerivatives = self.fittedPhaseDerivatives
-        else:
-            myPhaseDerivatives = self.phaseDerivatives
-        
-        for order in myPhaseDerivatives:
-            if order > 0:
-                frequency  = (
-                    frequency +
-                    (
-                        myPhaseDerivatives[order] *
-                        np.power(shiftedObservatoryTime, order-1)/
-                        factorial(order - 1)
-                    )
-                )
+        shiftedObservatoryTime = (
+            np.asarray(observatoryTime, dtype=float) - self.TZeroDiff
+        )
+        frequency = np.polyval(self.frequencyCoefficients, shiftedObservatoryTime)
         return frequency
     def getPeriod(
             self,
@@ -724,12 +999,23 @@ It is up to the user to verify the validity of the results.
         by looking up the start and end values of :attr:`singlePeriodIntegral`, and
         dividing by the appropriate scaling factor.
 
+        If the source was initialized with profileHarmonics, the expected value
+        is instead computed from the Fourier series representation of the
+        profile, assuming normally distributed time (see
+        :meth:`fourierSignal`).  This is only done where the standard
+        deviation of phase is at least :attr:`fourierPhaseSigma`; for smaller
+        uncertainties the truncated series can't resolve the profile (and
+        may even be negative), so the sampled profile is used.
+
+        observatoryTime and tVar may be arrays (which are broadcast
+        together), in which case the branches above are selected per element.
+
         Args:
-         observatoryTime (float): The time for which to compute the signal
-         tVar (float): The variance of the time estimate (optional) 
+         observatoryTime (float or numpy.array): The time(s) for which to compute the signal
+         tVar (float or numpy.array): The variance of the time estimate (optional) 
 
         Returns:
-         (float): The signal at the requested time, in photons/second
+         (float or numpy.array): The signal at the requested time, in photons/second
         """
         # if state is not None:
         #     if 'signalDelay' in state:
@@ -740,8 +1026,16 @@ It is up to the user to verify the validity of the results.
         #             delayVar = 0
         #         observatoryTime = observatoryTime + delay
         #         tVar = tVar + delayVar
-        # Get the phase corresponding to the current time
-        phase = self.getPhase(observatoryTime)
+        useFourier = False
+        if (tVar is not None) and (self.fourierCoefficients is not None):
+            useFourier = (
+                np.sqrt(tVar) / self.pulsarPeriod >= self.fourierPhaseSigma
+            )
+            if np.all(useFourier):
+                return self.fourierSignal(observatoryTime, tVar)
+
+        # Get the (fractional) phase corresponding to the current time
+        phase = self.getPhaseCycles(observatoryTime)[1]
 
         # If a value was received for the tVar, then we compute the expected
         # value of flux
@@ -753,45 +1047,51 @@ It is up to the user to verify the validity of the results.
             # Convert the time standard deviation to phase standard deviation
             phaseSigma = tSigma/self.pulsarPeriod
 
-            # Check to see if the phase std is bigger than the std
-            # corresponding to a uniform distribution with support = 1.  If so,
-            # this indicates that we effectively have no meaningful knowledge
-            # of phase, and can just return the average flux.
-            if phaseSigma > np.sqrt(1/12):
-                signal = self.avgPhotonFlux * self.pulsedFraction * self.detectorArea
-            elif phaseSigma < 1/(100 * self.profileLen):
-                signal = self.getPulseFromPhase(phase)
-
-            else:
-                phaseFraction = np.mod(phase, 1.0)
-                upperSigma = phaseFraction + (np.sqrt(12) * phaseSigma / 2)
-                lowerSigma = phaseFraction - (np.sqrt(12) * phaseSigma / 2)
-                upperSigmaOffset = 0
-                lowerSigmaOffset = 0
-                if upperSigma > 1:
-                    upperSigma = upperSigma - 1
-                    upperSigmaOffset = self.singlePeriodIntegral[-1]
-                if lowerSigma < 0:
-                    lowerSigma = lowerSigma + 1
-                    lowerSigmaOffset = self.singlePeriodIntegral[-1]
-                signal = (
-                    upperSigmaOffset +
-                    np.interp(
-                        upperSigma,
-                        self.profileIndex,
-                        self.singlePeriodIntegral
-                    ) -
-                    np.interp(
-                        lowerSigma,
-                        self.profileIndex,
-                        self.singlePeriodIntegral)
-                    + lowerSigmaOffset
-                )
-                signal = (
-                    signal /
+            # Expected value of the signal over a moment-matched uniform
+            # distribution of phase, wrapping the limits of the distribution
+            # into [0, 1)
+            phaseFraction = np.mod(phase, 1.0)
+            upperSigma = phaseFraction + (np.sqrt(12) * phaseSigma / 2)
+            lowerSigma = phaseFraction - (np.sqrt(12) * phaseSigma / 2)
+            upperSigmaOffset = np.where(
+                upperSigma > 1, self.singlePeriodIntegral[-1], 0
+            )
+            upperSigma = np.where(upperSigma > 1, upperSigma - 1, upperSigma)
+            lowerSigmaOffset = np.where(
+                lowerSigma < 0, self.singlePeriodIntegral[-1], 0
+            )
+            lowerSigma = np.where(lowerSigma < 0, lowerSigma + 1, lowerSigma)
+            expectedSignal = (
+                upperSigmaOffset +
+                self.interpolateProfile(upperSigma, integral=True) -
+                self.interpolateProfile(lowerSigma, integral=True)
+                + lowerSigmaOffset
+            )
+            # The expected value is only used where tSigma is large enough
+            # for the division to be meaningful (see below)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                expectedSignal = (
+                    expectedSignal /
                     (np.sqrt(12) * tSigma)
                 )
-                signal = signal * self.scaleFactor
+            expectedSignal = expectedSignal * self.scaleFactor
+
+            # If the phase std is bigger than the std corresponding to a
+            # uniform distribution with support = 1, we effectively have no
+            # meaningful knowledge of phase, and can just return the average
+            # flux.  If it is very small, the signal is just looked up from
+            # the phase.
+            signal = np.where(
+                phaseSigma > np.sqrt(1/12),
+                self.avgPhotonFlux * self.pulsedFraction * self.detectorArea,
+                np.where(
+                    phaseSigma < 1/(100 * self.profileLen),
+                    self.getPulseFromPhase(phase),
+                    expectedSignal
+                )
+            )
+            if np.ndim(signal) == 0:
+                signal = signal[()]
                 
         else:
             signal = self.getPulseFromPhase(phase)
@@ -799,6 +1099,11 @@ It is up to the user to verify the validity of the results.
         if self.backgroundCountRate is not None:
             signal = signal + self.backgroundCountRate
 
+        if np.any(useFourier):
+            signal = np.where(
+                useFourier, self.fourierSignal(observatoryTime, tVar), signal
+            )
+
         return(signal)
 
     def signalIntegral(
@@ -827,12 +1132,12 @@ It is up to the user to verify the validity of the results.
         
 
         Args:
-         tStart (float): Start time of the definite integralTStart
-         tStop (float): Stop time of the definite integral
+         tStart (float or numpy.array): Start time of the definite integralTStart
+         tStop (float or numpy.array): Stop time of the definite integral
          state: Optionally, a state object which contains a signal delay
 
         Returns:
-         (float): The definite integral of the signal.
+         (float or numpy.array): The definite integral of the signal.
 
         """
         if state is not None:
@@ -842,29 +1147,28 @@ It is up to the user to verify the validity of the results.
                 tStart = tStart + delay
                 tStop = tStop + delay
         # Get the phase corresponding to the current time
-        phaseStart = self.getPhase(tStart)
-        phaseStop = self.getPhase(tStop)
-
-        completeCycles = np.floor(phaseStop-phaseStart)
+        cyclesStart, phaseStartFraction = self.getPhaseCycles(tStart)
+        cyclesStop, phaseStopFraction = self.getPhaseCycles(tStop)
 
-        phaseStartFraction = np.mod(phaseStart, 1.0)
-        phaseStopFraction = np.mod(phaseStop, 1.0)
+        completeCycles = np.floor(
+            (cyclesStop - cyclesStart) +
+            (phaseStopFraction - phaseStartFraction)
+        )
 
-        integralTStart = np.interp(
-            phaseStartFraction,
-            self.profileIndex,
-            self.singlePeriodIntegral
+        integralTStart = self.interpolateProfile(
+            phaseStartFraction, integral=True
         )
-        integralTStop = np.interp(
-            phaseStopFraction,
-            self.profileIndex,
-            self.singlePeriodIntegral
+        integralTStop = self.interpolateProfile(
+            phaseStopFraction, integral=True
         )
         phaseFractionIntegral = integralTStop - integralTStart
-        if phaseFractionIntegral < 0:
-            phaseFractionIntegral = (
-                phaseFractionIntegral + self.singlePeriodIntegral[-1]
-                )
+        phaseFractionIntegral = np.where(
+            phaseFractionIntegral < 0,
+            phaseFractionIntegral + self.singlePeriodIntegral[-1],
+            phaseFractionIntegral
+        )
+        if np.ndim(phaseFractionIntegral) == 0:
+            phaseFractionIntegral = phaseFractionIntegral[()]
         signalIntegral = (
             phaseFractionIntegral + self.singlePeriodIntegral[-1] * completeCycles
             )
@@ -878,6 +1182,190 @@ It is up to the user to verify the validity of the results.
        
         return signalIntegral
 
+    def fourierSignal(
+            self,
+            observatoryTime,
+            tVar=None
+    ):
+        r"""
+        Returns the signal computed from the Fourier series representation of
+        the profile.
+
+        With the profile represented by the coefficients :math:`c_k` in
+        :attr:`fourierCoefficients`, the signal is
+
+        .. math::
+            \lambda(t) = s \left(c_0 + \sum_{k=1}^N 2 \textrm{Re}\left[
+            c_k e^{2 \pi i k \phi(t)} \right] \right) + \lambda_b
+
+        where :math:`s` is :attr:`scaleFactor` and :math:`\lambda_b` is
+        :attr:`backgroundCountRate`.  If the time is normally distributed
+        with variance :math:`\sigma^2`, the expected value of the signal is
+        found by damping each harmonic by
+        :math:`e^{-2 \pi^2 k^2 \sigma^2 / P^2}`, where :math:`P` is the pulsar
+        period.  Unlike the uniform approximation used by :meth:`getSignal`,
+        this is smooth in both time and variance.
+
+        The truncated series can ring below zero near sharp features of the
+        profile, so the pulsed part of the signal is clipped at zero.
+
+        Args:
+         observatoryTime (float or numpy.array): The time(s) for which to compute the signal
+         tVar (float or numpy.array): The variance of the time estimate (optional)
+
+        Returns:
+         (float or numpy.array): The (expected) signal, in photons/second
+        """
+        harmonicSum = self.fourierHarmonicSum(
+            self.getPhaseCycles(observatoryTime)[1],
+            np.ones(self.profileHarmonics),
+            tVar
+        )
+        signal = np.maximum(
+            (self.fourierCoefficients[0].real + harmonicSum) * self.scaleFactor,
+            0
+        )
+        if self.backgroundCountRate is not None:
+            signal = signal + self.backgroundCountRate
+        return signal
+
+    def fourierSignalDerivative(
+            self,
+            observatoryTime,
+            tVar=None
+    ):
+        r"""
+        Returns the time derivative of the signal, computed from the Fourier
+        series representation of the profile.
+
+        Each harmonic is differentiated with respect to phase, and multiplied
+        by the frequency at the given time.  If tVar is given, this is the
+        derivative of the expected signal returned by :meth:`fourierSignal`.
+
+        Args:
+         observatoryTime (float or numpy.array): The time(s) at which to compute the derivative
+         tVar (float or numpy.array): The variance of the time estimate (optional)
+
+        Returns:
+         (float or numpy.array): The derivative of the signal, in photons/second^2
+        """
+        harmonics = np.arange(1, self.profileHarmonics + 1)
+        harmonicSum = self.fourierHarmonicSum(
+            self.getPhaseCycles(observatoryTime)[1],
+            2j * np.pi * harmonics,
+            tVar
+        )
+        return (
+            harmonicSum * self.getFrequency(observatoryTime) * self.scaleFactor
+        )
+
+    def fourierSignalIntegral(
+            self,
+            tStart,
+            tStop
+    ):
+        r"""
+        Computes the definite integral of the signal over a given time
+        interval, using the Fourier series representation of the profile.
+
+        As in :meth:`signalIntegral`, the integral is split into complete
+        cycles and the integral of the profile between the start and stop
+        phase fractions, which is found by integrating each harmonic.
+
+        Args:
+         tStart (float or numpy.array): Start time of the definite integral
+         tStop (float or numpy.array): Stop time of the definite integral
+
+        Returns:
+         (float or numpy.array): The definite integral of the signal.
+        """
+        cyclesStart, phaseStartFraction = self.getPhaseCycles(tStart)
+        cyclesStop, phaseStopFraction = self.getPhaseCycles(tStop)
+
+        completeCycles = np.floor(
+            (cyclesStop - cyclesStart) +
+            (phaseStopFraction - phaseStartFraction)
+        )
+        remainingPhase = (
+            phaseStopFraction - phaseStartFraction -
+            completeCycles + (cyclesStop - cyclesStart)
+        )
+
+        # Integral of each harmonic from phase zero, evaluated at both ends
+        harmonics = np.arange(1, self.profileHarmonics + 1)
+        harmonicWeights = 1 / (2j * np.pi * harmonics)
+        phaseFractionIntegral = (
+            self.fourierCoefficients[0].real * remainingPhase +
+            self.fourierHarmonicSum(phaseStopFraction, harmonicWeights) -
+            self.fourierHarmonicSum(phaseStartFraction, harmonicWeights)
+        )
+        signalIntegral = (
+            (phaseFractionIntegral + completeCycles *
+             self.fourierCoefficients[0].real) *
+            self.pulsarPeriod * self.scaleFactor
+        )
+
+        if self.backgroundCountRate is not None:
+            signalIntegral = (
+                signalIntegral +
+                self.backgroundCountRate * (tStop - tStart)
+            )
+        return signalIntegral
+
+    def fourierHarmonicSum(
+            self,
+            phaseFraction,
+            harmonicWeights,
+            tVar=None
+    ):
+        r"""
+        Evaluates the weighted sum of the harmonics of the profile,
+
+        .. math::
+            \sum_{k=1}^N 2 \textrm{Re}\left[w_k c_k e^{2 \pi i k \phi}
+            e^{-2 \pi^2 k^2 \sigma^2 / P^2} \right]
+
+        where the damping term is only included if tVar is given.
+
+        Args:
+         phaseFraction (float or numpy.array): Fractional phase
+         harmonicWeights (numpy.array): Weights :math:`w_k` of the harmonics
+         tVar (float or numpy.array): The variance of the time (optional)
+
+        Returns:
+         (float or numpy.array): The sum of the harmonics
+        """
+        harmonicCount = self.profileHarmonics
+        if tVar is not None and np.min(tVar) > 0:
+            # Harmonics damped below double precision by the smallest
+            # variance don't contribute to the sum
+            harmonicCount = min(
+                harmonicCount,
+                int(np.ceil(
+                    self.pulsarPeriod * np.sqrt(20 / np.min(tVar)) / np.pi
+                ))
+            )
+        harmonics = np.arange(1, harmonicCount + 1)
+        harmonicCoefficients = (
+            harmonicWeights[0:harmonicCount] *
+            self.fourierCoefficients[1:harmonicCount + 1]
+        )
+
+        # Successive harmonics are found as powers of the first
+        firstHarmonic = np.exp(2j * np.pi * np.asarray(phaseFraction, dtype=float))
+        harmonicTerms = np.cumprod(
+            np.repeat(firstHarmonic[..., np.newaxis], harmonicCount, axis=-1),
+            axis=-1
+        )
+        if tVar is not None:
+            harmonicTerms = harmonicTerms * np.exp(
+                -2 * np.square(np.pi) *
+                np.multiply.outer(tVar, np.square(harmonics)) /
+                np.square(self.pulsarPeriod)
+            )
+        harmonicSum = 2 * np.dot(harmonicTerms, harmonicCoefficients).real
+        return harmonicSum[()]
+
     def getPulseFromPhase(self,
                           phase):
         r"""
@@ -886,16 +1374,65 @@ It is up to the user to verify the validity of the results.
         This function uses the signal :attr:`profile` to compute the value of the signal given the signal phase.  It uses simple linear interpolation to find the value.
 
         Args:
-         phase (float): The phase number of the signal.  Phase can be any numerical value; the fractional phase will be computed by taking remainder of the value divided by 1.
+         phase (float or numpy.array): The phase number of the signal.  Phase can be any numerical value; the fractional phase will be computed by taking remainder of the value divided by 1.
 
         Returns:
-         (float): The value of the signal at the given phase
+         (float or numpy.array): The value of the signal at the given phase
         """
         pFrac = np.mod(phase, 1.0)
-        signal = np.interp(pFrac, self.profileIndex, self.profile)
+        signal = self.interpolateProfile(pFrac)
         signal = signal * self.scaleFactor
         return signal
 
+    def interpolateProfile(
+            self,
+            phaseFraction,
+            integral=False
+    ):
+        r"""
+        Linearly interpolates the pulse profile (or its integral) at the given
+        fractional phase.
+
+        The profile samples lie on a uniform grid in phase (see
+        :attr:`profileIndex`), so the sample preceding a phase is found
+        directly as :math:`\lfloor \phi (L - 1) \rfloor`, where :math:`L` is
+        the number of samples, and the value is interpolated using the
+        precomputed slopes between samples.  This gives the same result as
+        ``np.interp`` against :attr:`profileIndex`, without the binary search.
+
+        Args:
+         phaseFraction (float or numpy.array): Fractional phase, in [0, 1]
+         integral (bool): If True, interpolate :attr:`singlePeriodIntegral` rather than :attr:`profile`
+
+        Returns:
+         (float or numpy.array): The interpolated value(s)
+        """
+        if isinstance(phaseFraction, float) and isfinite(phaseFraction):
+            # Plain float arithmetic is much faster than numpy for scalars
+            if integral:
+                values, slopes = self.__integralTable__
+            else:
+                values, slopes = self.__profileTable__
+            gridScale = len(slopes)
+            gridPosition = phaseFraction * gridScale
+            gridIndex = min(max(int(gridPosition), 0), gridScale - 1)
+            return values[gridIndex] + slopes[gridIndex] * (gridPosition - gridIndex)
+
+        if integral:
+            values = self.singlePeriodIntegral
+            slopes = self.singlePeriodIntegralSlope
+        else:
+            values = self.profile
+            slopes = self.profileSlope
+        gridScale = len(slopes)
+        gridPosition = np.asarray(phaseFraction, dtype=float) * gridScale
+        gridIndex = np.clip(gridPosition.astype(int), 0, gridScale - 1)
+        interpolatedValues = (
+            values[gridIndex] + slopes[gridIndex] * (gridPosition - gridIndex)
+        )
+        # Zero-dimensional input gives a scalar, as with np.interp
+        return interpolatedValues[()]
+
     def MJD2seconds(
             self,
             MJD
@@ -1034,31 +1571,39 @@ It is up to the user to verify the validity of the results.
             t0=0,
             timeOffset=None,
             spacecraft=None,
+            columnar=False,
+            method='thinning',
+            spanLength=1.0
             ):
         """
         Generate photon arrival measurements
 
         This function generates photon arrivals from the pulsar signal based on the parameters of the simulation.  The
+        arrival times are generated by one of two methods:
+
+        - "thinning" (see :meth:`generateArrivalTimesThinning`), which draws
+          candidates at the peak photon rate and rejects most of them for
+          pulsars with narrow peaks
+        - "inverseCDF" (see :meth:`generateArrivalTimesInverseCDF`), which
+          places photons directly by inverting the integral of the profile, so
+          that its cost is proportional to the number of photons generated
+
+        Args:
+         tMax (float): Time at which to stop generating photons
+         t0 (float): Time at which to start generating photons
+         timeOffset (float): Offset subtracted from the measured arrival times (optional)
+         spacecraft: Spacecraft object, whose dynamics and detector (if present) determine the range, attitude and measurement noise (optional)
+         columnar (bool): If True, return the photons as a :class:`~modest.utils.photonBatch.PhotonBatch` rather than a list of dicts
+         method (str): Method used to generate the arrival times, "thinning" or "inverseCDF"
+         spanLength (float): Length of the spans of time used by the "inverseCDF" method
+
+        Returns:
+         (list or PhotonBatch): List of photon measurement dicts, or, if columnar is True, a PhotonBatch
         """
 
         if not timeOffset:
             timeOffset = 0
-            
-        nCandidates = np.int((tMax - t0) * self.peakAmplitude * 1.1)
-
-        # Generate a batch of candidate arrival times (more efficient than generating on the fly)
-        candidateTimeArray = np.random.exponential(1.0/self.peakAmplitude, nCandidates)
-        selectionVariableArray = np.random.uniform(0, 1, nCandidates)
 
-        photonMeasurements = []
-        photonArrivalTimes = []
-        tLastCandidate = t0
-
-        # # If we have a position, then we want to get the signal at T0 at that
-        # # position, not the SSB.  So, shift T0 accordingly.
-        # if position is not None:
-        #     rangeDeltaT = self.unitVec().dot(position(t0)) / self.speedOfLight()
-        #     tLastCandidate = tLastCandidate + rangeDeltaT
         attitude = None
         if spacecraft is not None:
             if hasattr(spacecraft, 'dynamics'):
@@ -1069,7 +1614,7 @@ It is up to the user to verify the validity of the results.
                 attitude = spacecraft.dynamics.attitude
             else:
                 def myRangeFunction(t):
-                    return (0)
+                    return np.zeros_like(t)
             if hasattr(spacecraft, 'detector'):
                 TOA_StdDev = spacecraft.detector.TOA_StdDev
                 AOA_StdDev = spacecraft.detector.AOA_StdDev
@@ -1080,91 +1625,334 @@ It is up to the user to verify the validity of the results.
                 FOV = None
         else:
             def myRangeFunction(t):
-                return 0
+                return np.zeros_like(t)
             TOA_StdDev = None
             AOA_StdDev = None
             attitude = None
             FOV = None
-            
-        candidateIndex = 0
-        # plt.figure()
-        # plt.plot(np.linspace(0,tMax,1000), myRangeFunction(np.linspace(0,tMax,1000)))
-        # plt.show(block=False)
-        while tLastCandidate < tMax:
-            # Draw the next arrival time and selection variable from our
-            # pre-generated arrays
-            if candidateIndex < len(candidateTimeArray):
-                nextCandidate = candidateTimeArray[candidateIndex]
-                selectionVariable = selectionVariableArray[candidateIndex]
-            # If we run out, generate more on the fly
-            else:
-                nextCandidate = np.random.exponential(1.0/self.peakAmplitude)
-                selectionVariable = np.random.uniform(0, 1)
-            tNextCandidate = (
-                tLastCandidate +
-                nextCandidate
+
+        if method == 'thinning':
+            photonArrivalTimes = self.generateArrivalTimesThinning(
+                tMax, t0=t0, rangeFunction=myRangeFunction
             )
-            
-            rangeDeltaT = myRangeFunction(tNextCandidate) / self.speedOfLight()
-            # rangeDeltaT = 0
-            currentFluxNormalized = (
-                self.getSignal(tNextCandidate + rangeDeltaT)/self.peakAmplitude
-                )
-            # This if statement uses a uniform variable to determine whether
-            # the next generated photon arrival time is a real photon arrival
-            # time.
-            if selectionVariable <= currentFluxNormalized:
-                # if position is not None:
-                #     rangeDeltaT = (
-                #         self.unitVec().dot(position(tNextCandidate - rangeDeltaT)) /
-                #         self.speedOfLight()
-                #     )
-                # else:
-                #     rangeDeltaT = 0
-                
-                # newPhotonArrivalTime = tNextCandidate - rangeDeltaT
-                # photonArrivalTimes.append(tNextCandidate - rangeDeltaT)
-                newPhotonArrivalTime = tNextCandidate
-                photonArrivalTimes.append(tNextCandidate)
-
-                if TOA_StdDev:
-                    newPhotonArrivalTime = (
-                        newPhotonArrivalTime + np.random.normal(scale=TOA_StdDev)
+        elif method == 'inverseCDF':
+            photonArrivalTimes = self.generateArrivalTimesInverseCDF(
+                tMax, t0=t0, rangeFunction=myRangeFunction, spanLength=spanLength
+            )
+        else:
+            raise ValueError(
+                'Unrecognized photon generation method %s.  Method should be ' %method +
+                '"thinning" or "inverseCDF".'
+            )
+        nPhotons = len(photonArrivalTimes)
+
+        if TOA_StdDev:
+            # The measurement noise can swap neighboring photons, so the
+            # measured times are sorted again
+            photonArrivalTimes = np.sort(
+                photonArrivalTimes +
+                np.random.normal(scale=TOA_StdDev, size=nPhotons)
+            )
+            photonColumns = {
+                't': {
+                    'value': photonArrivalTimes - timeOffset,
+                    'var': np.full(nPhotons, np.square(TOA_StdDev))
+                },
+                'name': self.name
+            }
+        else:
+            photonColumns = {
+                't': {'value': photonArrivalTimes - timeOffset},
+                'name': self.name
+            }
+
+        if attitude is not None:
+            if hasattr(spacecraft.dynamics, 'attitudeMatrix'):
+                photonColumns.update(
+                    self.generateArrivalVectors(
+                        attitudeMatrices=spacecraft.dynamics.attitudeMatrix(
+                            photonArrivalTimes
+                        ),
+                        AOA_StdDev=AOA_StdDev
                     )
-                    measurementDict = {
-                        't': {
-                            'value': newPhotonArrivalTime - timeOffset,
-                            'var': np.square(TOA_StdDev)
-                        },
-                        'name': self.name
-                    }
-                else:
-                    measurementDict = {
-                        't': {'value': newPhotonArrivalTime - timeOffset},
-                        'name': self.name
-                    }
-
-                if attitude is not None:
-                    measurementDict.update(
-                        self.generateArrivalVector(
-                            attitude(newPhotonArrivalTime),
-                            AOA_StdDev=AOA_StdDev)
+                )
+            else:
+                photonColumns.update(
+                    self.generateArrivalVectors(
+                        attitude(photonArrivalTimes),
+                        AOA_StdDev=AOA_StdDev
                     )
-                    # measurementDict = {
-                    #     't': {'value': newPhotonArrivalTime},
-                    #     'unitVec': {'value': unitVecMeas},
-                    #     'RA': {'value': RaMeas},
-                    #     'DEC': {'value': DecMeas},
-                    #     'name': self.name
-                    #     }
-                    
-                photonMeasurements.append(measurementDict)
-                
-            tLastCandidate = tNextCandidate
-            candidateIndex = candidateIndex + 1
+                )
+
+        photonBatch = PhotonBatch.fromColumns(photonColumns)
+        if columnar:
+            return photonBatch
+        return photonBatch.toList()
+
+    def generateArrivalTimesThinning(
+            self,
+            tMax,
+            t0=0,
+            rangeFunction=None
+    ):
+        r"""
+        Generate photon arrival times by thinning.
+
+        Candidate arrival times are drawn from a Poisson process at the peak
+        photon rate (:attr:`peakAmplitude`), and each candidate is accepted
+        with probability equal to the signal at that time (accounting for the
+        range of the spacecraft) divided by the peak rate.  All of the
+        candidates are drawn and tested at once, rather than one at a time.
+
+        Args:
+         tMax (float): Time at which to stop generating photons
+         t0 (float): Time at which to start generating photons
+         rangeFunction (function): Range of the observer along the pulsar unit vector as a function of time (optional)
+
+        Returns:
+         (numpy.array): Sorted photon arrival times
+        """
+        # Generate candidate arrival times in batches until tMax is reached
+        candidateTimeArray = []
+        tLastCandidate = t0
+        while tLastCandidate < tMax:
+            nCandidates = int((tMax - tLastCandidate) * self.peakAmplitude * 1.1) + 1
+            candidateBatch = tLastCandidate + np.cumsum(
+                np.random.exponential(1.0/self.peakAmplitude, nCandidates)
+            )
+            candidateTimeArray.append(candidateBatch)
+            tLastCandidate = candidateBatch[-1]
+        candidateTimeArray = np.concatenate(candidateTimeArray)
+        candidateTimeArray = candidateTimeArray[candidateTimeArray < tMax]
+        selectionVariableArray = np.random.uniform(0, 1, len(candidateTimeArray))
+
+        # Accept each candidate with probability equal to the normalized flux
+        # at the candidate time
+        if rangeFunction is not None:
+            rangeDeltaT = rangeFunction(candidateTimeArray) / self.speedOfLight()
+        else:
+            rangeDeltaT = 0
+        currentFluxNormalized = (
+            self.getSignal(candidateTimeArray + rangeDeltaT)/self.peakAmplitude
+        )
+        return candidateTimeArray[selectionVariableArray <= currentFluxNormalized]
+
+    def generateArrivalTimesInverseCDF(
+            self,
+            tMax,
+            t0=0,
+            rangeFunction=None,
+            spanLength=1.0,
+            rangeStep=1e-2
+    ):
+        r"""
+        Generate photon arrival times by inverting the integral of the profile.
+
+        Let :math:`\Psi(t) = \phi(t + \tau(t))` be the phase of the signal
+        received at time :math:`t`, where :math:`\tau(t)` is the range delay.
+        The interval :math:`[t_0, t_{max})` is divided into spans of length
+        spanLength.  Within each span, the number of pulsed photons is drawn
+        from a Poisson distribution, and each photon is placed by drawing a
+        uniform value of the cumulative profile integral (see
+        :meth:`phaseFractionIntegral`), inverting it to get phase (see
+        :meth:`inversePhaseFractionIntegral`), and solving
+        :math:`\Psi(t) = \Psi` for the time by Newton's method.
+
+        Drawing uniformly in the profile integral places photons with density
+        proportional to :math:`\lambda(\Psi) \dot{\Psi}(t)`, whereas
+        the signal is :math:`\lambda(\Psi(t))`.  To correct for the (small)
+        variation of :math:`\dot{\Psi}` due to the range rate and the
+        frequency derivatives, photons are drawn using the smallest value of
+        :math:`\dot{\Psi}` in each span, and kept with probability
+        :math:`\dot{\Psi}_{min} / \dot{\Psi}(t)`.  Nearly all photons
+        are kept, so the cost is proportional to the number of photons
+        generated rather than the number of candidates.  The unpulsed
+        photons (:attr:`backgroundCountRate`) are drawn uniformly in time.
+
+        Args:
+         tMax (float): Time at which to stop generating photons
+         t0 (float): Time at which to start generating photons
+         rangeFunction (function): Range of the observer along the pulsar unit vector as a function of time (optional)
+         spanLength (float): Length of the spans of time in which photons are drawn
+         rangeStep (float): Time step used to differentiate the range function
+
+        Returns:
+         (numpy.array): Sorted photon arrival times
+        """
+        if rangeFunction is None:
+            def rangeFunction(t):
+                return np.zeros_like(t)
+
+        def receivedPhase(t):
+            return self.getPhaseCycles(t + rangeFunction(t)/self.speedOfLight())
+
+        def receivedFrequency(t):
+            rangeRate = (
+                (rangeFunction(t + rangeStep) - rangeFunction(t - rangeStep)) /
+                (2 * rangeStep * self.speedOfLight())
+            )
+            return (
+                self.getFrequency(t + rangeFunction(t)/self.speedOfLight()) *
+                (1 + rangeRate)
+            )
+
+        nSpans = int(np.ceil((tMax - t0) / spanLength))
+        spanStart = t0 + (np.arange(nSpans) * spanLength)
+        spanStop = np.append(spanStart[1:], tMax)
+
+        cyclesStart, fractionStart = receivedPhase(spanStart)
+        cyclesStop, fractionStop = receivedPhase(spanStop)
+        integralStart = self.phaseFractionIntegral(fractionStart)
+        spanIntegral = (
+            (cyclesStop - cyclesStart) * self.singlePeriodIntegral[-1] +
+            self.phaseFractionIntegral(fractionStop) - integralStart
+        )
+        minFrequency = np.min(
+            [
+                receivedFrequency(spanStart),
+                receivedFrequency((spanStart + spanStop)/2),
+                receivedFrequency(spanStop)
+            ],
+            axis=0
+        )
+
+        # Draw the pulsed photons in phase, at the rate corresponding to the
+        # smallest frequency in each span
+        nSpanPhotons = np.random.poisson(
+            self.scaleFactor * spanIntegral /
+            (self.pulsarPeriod * minFrequency)
+        )
+        photonSpan = np.repeat(np.arange(nSpans), nSpanPhotons)
+        photonIntegral = (
+            integralStart[photonSpan] +
+            np.random.uniform(0, 1, len(photonSpan)) * spanIntegral[photonSpan]
+        )
+        cycleOffset = np.floor(photonIntegral / self.singlePeriodIntegral[-1])
+        targetCycles = cyclesStart[photonSpan] + cycleOffset
+        targetFraction = self.inversePhaseFractionIntegral(
+            photonIntegral - (cycleOffset * self.singlePeriodIntegral[-1])
+        )
+
+        # Map phase back to time using Newton's method, starting from the
+        # phase and frequency at the start of the span
+        photonTimes = (
+            spanStart[photonSpan] +
+            (
+                (targetCycles - cyclesStart[photonSpan]) +
+                (targetFraction - fractionStart[photonSpan])
+            ) / receivedFrequency(spanStart)[photonSpan]
+        )
+        for iteration in range(10):
+            photonCycles, photonFraction = receivedPhase(photonTimes)
+            photonFrequency = receivedFrequency(photonTimes)
+            timeCorrection = (
+                (photonCycles - targetCycles) +
+                (photonFraction - targetFraction)
+            ) / photonFrequency
+            photonTimes = photonTimes - timeCorrection
+            if (
+                    len(photonTimes) == 0 or
+                    np.max(np.abs(timeCorrection)) <=
+                    4 * np.spacing(np.max(np.abs(photonTimes)))
+            ):
+                break
+
+        # Correct for the variation of frequency within each span
+        keepPhoton = (
+            np.random.uniform(0, 1, len(photonTimes)) * photonFrequency <=
+            minFrequency[photonSpan]
+        )
+        photonTimes = photonTimes[keepPhoton]
+
+        # Unpulsed photons are uniformly distributed in time
+        if self.backgroundCountRate:
+            nBackgroundPhotons = np.random.poisson(
+                self.backgroundCountRate * (tMax - t0)
+            )
+            photonTimes = np.append(
+                photonTimes,
+                np.random.uniform(t0, tMax, nBackgroundPhotons)
+            )
+
+        photonTimes = photonTimes[(photonTimes >= t0) & (photonTimes < tMax)]
+        return np.sort(photonTimes)
+
+    def phaseFractionIntegral(
+            self,
+            phaseFraction
+    ):
+        r"""
+        Integral of the pulse profile from phase zero to the given phase
+        fraction.
+
+        The profile is linearly interpolated between samples, so its integral
+        is piecewise quadratic.  The integral is evaluated exactly, and agrees
+        with :attr:`singlePeriodIntegral` at the profile samples.
+
+        Args:
+         phaseFraction (float or numpy.array): Fractional phase, in [0, 1]
+
+        Returns:
+         (float or numpy.array): Integral of the profile over time from phase zero to phaseFraction
+        """
+        phaseStep = self.profileIndex[1]
+        binIndex = np.clip(
+            (np.asarray(phaseFraction) / phaseStep).astype(int),
+            0,
+            self.profileLen - 2
+        )
+        binPhase = phaseFraction - self.profileIndex[binIndex]
+        profileSlope = (
+            (self.profile[binIndex + 1] - self.profile[binIndex]) / phaseStep
+        )
+        return (
+            self.singlePeriodIntegral[binIndex] +
+            self.pulsarPeriod * (
+                self.profile[binIndex] * binPhase +
+                profileSlope * np.square(binPhase) / 2
+            )
+        )
+
+    def inversePhaseFractionIntegral(
+            self,
+            integral
+    ):
+        r"""
+        Inverse of :meth:`phaseFractionIntegral`.
+
+        Finds the profile bin containing the given integral value, and solves
+        the quadratic for the phase within the bin.
+
+        Args:
+         integral (float or numpy.array): Integral of the profile, between zero and the last value of :attr:`singlePeriodIntegral`
+
+        Returns:
+         (float or numpy.array): Fractional phase at which the integral of the profile reaches the given value
+        """
+        phaseStep = self.profileIndex[1]
+        binIndex = np.clip(
+            np.searchsorted(self.singlePeriodIntegral, integral, side='right') - 1,
+            0,
+            self.profileLen - 2
+        )
+        binIntegral = np.maximum(integral - self.singlePeriodIntegral[binIndex], 0)
+        linearTerm = self.pulsarPeriod * self.profile[binIndex]
+        quadraticTerm = (
+            self.pulsarPeriod *
+            (self.profile[binIndex + 1] - self.profile[binIndex]) /
+            (2 * phaseStep)
+        )
+        denominator = linearTerm + np.sqrt(
+            np.maximum(
+                np.square(linearTerm) + 4 * quadraticTerm * binIntegral, 0
+            )
+        )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            binPhase = np.where(
+                denominator > 0, 2 * binIntegral / denominator, 0
+            )
+        return self.profileIndex[binIndex] + np.minimum(binPhase, phaseStep)
 
-        return photonMeasurements
-    
     # @staticmethod
     # def hms2rad(h, m, s):
     #     hours = h + m / 60.0 + s / 3600.0
@@ -18,6 +18,7 @@ class PointSource(signalsource.SignalSource):
         self.__RA__ = RA
         self.__DEC__ = DEC
         self.__RaDec__ = {'RA': RA, 'DEC': DEC}
+        self.__unitVec__ = self.unitVec()
         self.attitudeStateName = attitudeStateName
         self.lastPDF = None
         self.extent = extent
@@ -30,6 +31,8 @@ class PointSource(signalsource.SignalSource):
             self,
             RaDec=None):
         if RaDec is None:
+            if hasattr(self, '__unitVec__'):
+                return self.__unitVec__.copy()
             RaDec = self.__RaDec__
         cosD = _np.cos(RaDec['DEC'])
         sinD = _np.sin(RaDec['DEC'])
@@ -142,9 +145,19 @@ class PointSource(signalsource.SignalSource):
             AOA_StdDev=None
     ):
         if hasattr(attitudeQ, '__len__'):
-            measurement = []
-            for attIndex in range(len(attitudeQ)):
-                measurement.append(self.generateArrivalVector(attitudeQ[attIndex]))
+            arrivalVectors = self.generateArrivalVectors(
+                attitudeQ, AOA_StdDev=AOA_StdDev
+            )
+            measurement = [
+                {
+                    key: {
+                        subKey: arrivalVectors[key][subKey][attIndex]
+                        for subKey in arrivalVectors[key]
+                    }
+                    for key in arrivalVectors
+                }
+                for attIndex in range(len(attitudeQ))
+            ]
         else:
             attitudeMatrix = attitudeQ.rotation_matrix.transpose()
             unitVecMeas = attitudeMatrix.dot(self.unitVec())
@@ -184,3 +197,75 @@ class PointSource(signalsource.SignalSource):
                 }
         return measurement
         
+
+    def generateArrivalVectors(
+            self,
+            attitudeQ=None,
+            AOA_StdDev=None,
+            attitudeMatrices=None
+    ):
+        r"""
+        Generate arrival vector measurements for a sequence of attitudes.
+
+        This is the batched counterpart of :meth:`generateArrivalVector`.  The
+        attitudes are given either as a list of quaternions, or (preferably,
+        since it avoids building a quaternion per photon) as an Nx3x3 stack of
+        attitude rotation matrices, such as returned by the attitudeMatrix
+        method of the dynamics objects.  The source unit vector is rotated
+        into each body frame at once, and the angle of arrival noise is drawn
+        for all of the photons together.
+
+        Args:
+         attitudeQ (list): Attitude quaternions, one per photon
+         AOA_StdDev (float): Angle of arrival standard deviation (optional)
+         attitudeMatrices (numpy.array): Nx3x3 stack of attitude rotation matrices, used in place of attitudeQ
+
+        Returns:
+         (dict): Columnar measurements "unitVec", "RA" and "DEC", with one entry per attitude
+        """
+        if attitudeMatrices is None:
+            if len(attitudeQ) > 0:
+                attitudeMatrices = _np.array(
+                    [q.rotation_matrix for q in attitudeQ]
+                )
+            else:
+                attitudeMatrices = _np.zeros([0, 3, 3])
+        attitudeMatrices = _np.reshape(attitudeMatrices, [-1, 3, 3])
+        nPhotons = len(attitudeMatrices)
+
+        # Transpose of each rotation matrix times the source unit vector
+        unitVecMeas = _np.einsum('nji,j->ni', attitudeMatrices, self.__unitVec__)
+        RaMeas, DecMeas = sg.unitVector2RaDec(unitVecMeas.transpose())
+
+        if AOA_StdDev:
+            if self.extent is None:
+                RaStdDev = AOA_StdDev
+                DecStdDev = AOA_StdDev
+            elif _np.isscalar(self.extent):
+                RaStdDev = AOA_StdDev + self.extent
+                DecStdDev = AOA_StdDev + self.extent
+            else:
+                RaStdDev = AOA_StdDev + _np.sqrt(self.extent[0, 0])
+                DecStdDev = AOA_StdDev + _np.sqrt(self.extent[1, 1])
+            RaMeas = RaMeas + _np.random.normal(scale=RaStdDev, size=nPhotons)
+            DecMeas = DecMeas + _np.random.normal(scale=DecStdDev, size=nPhotons)
+            measurement = {
+                'unitVec': {
+                    'value': sg.sidUnitVec(RaMeas, DecMeas).transpose()
+                },
+                'RA': {
+                    'value': RaMeas,
+                    'var': _np.full(nPhotons, _np.square(AOA_StdDev))
+                },
+                'DEC': {
+                    'value': DecMeas,
+                    'var': _np.full(nPhotons, _np.square(AOA_StdDev))
+                }
+            }
+        else:
+            measurement = {
+                'unitVec': {'value': unitVecMeas},
+                'RA': {'value': RaMeas},
+                'DEC': {'value': DecMeas}
+            }
+        return measurement
@@ -0,0 +1,248 @@
+## @file pointsourcecatalog.py
+# @brief This file contains a class which groups static point sources
+#
+# @details This file contains the PointSourceCatalog class, which stores the
+# unit vectors, extents and fluxes of a set of static point sources as arrays
+# so that the association probabilities of a measurement with every source in
+# the catalog can be computed at once.
+
+import numpy as np
+
+from . import pointsource
+from .. utils.photonBatch import PhotonBatch
+
+
+class PointSourceCatalog():
+    r"""
+    A group of static point sources with vectorized association probabilities.
+
+    The catalog stores the unit vectors, angular extents, fluxes and
+    time-of-arrival weights of its sources in arrays (one row per source).
+    :meth:`computeAssociationProbabilities` then evaluates the same
+    probability as each source's own computeAssociationProbability (see
+    :meth:`~modest.signals.staticxraypointsource.StaticXRayPointSource.computeAssociationProbability`)
+    for every source in the catalog with a handful of stacked matrix
+    operations, rather than building and inverting the measurement matrices
+    of each source in turn.
+
+    The individual source objects are kept, and remain addressable by name
+    (e.g. ``catalog['sourceName']``), so that the update for a particular
+    association can still be done by the source itself.
+
+    Only the unit vector measurement model is supported.
+
+    Args:
+     sources (list): List of static point source objects, e.g.
+      :class:`~modest.signals.staticxraypointsource.StaticXRayPointSource`
+     attitudeStateName (str): Name of the attitude substate used to compute
+      the predicted unit vectors.  If None, the attitude state name of the
+      first source is used.
+    """
+    def __init__(
+            self,
+            sources,
+            attitudeStateName=None
+    ):
+        if len(sources) == 0:
+            raise ValueError('A point source catalog must contain at least one source.')
+        if attitudeStateName is None:
+            attitudeStateName = sources[0].attitudeStateName
+
+        self.attitudeStateName = attitudeStateName
+        self.sourceNames = []
+        self.__sources__ = {}
+        for source in sources:
+            if not isinstance(source, pointsource.PointSource):
+                raise ValueError(
+                    'Source %s is not a point source.' % source.name
+                )
+            if not source.useUnitVector:
+                raise ValueError(
+                    ('Source %s does not use the unit vector measurement ' +
+                     'model, which is the only model supported by the catalog.')
+                    % source.name
+                )
+            if source.name in self.__sources__:
+                raise ValueError(
+                    'The name %s has already been used for a source in the catalog.'
+                    % source.name
+                )
+            self.sourceNames.append(source.name)
+            self.__sources__[source.name] = source
+
+        self.unitVectors = np.array([source.unitVec() for source in sources])
+        """
+        (numpy.ndarray) Nx3 array of the unit vectors to each source
+        """
+
+        self.extents = np.array(
+            [0.0 if source.extent is None else source.extent for source in sources]
+        )
+        """
+        (numpy.ndarray) Angular extent of each source
+        """
+
+        self.fluxes = np.array([source.flux for source in sources])
+        """
+        (numpy.ndarray) Photon flux of each source
+        """
+
+        self.TOAWeights = np.array(
+            [source.flux if source.useTOAprobability else 1.0 for source in sources]
+        )
+        """
+        (numpy.ndarray) Time of arrival probability of each source (see
+        :meth:`~modest.signals.poissonsource.StaticPoissonSource.computeAssociationProbability`)
+        """
+        return
+
+    def __len__(self):
+        return len(self.sourceNames)
+
+    def __contains__(self, name):
+        return name in self.__sources__
+
+    def __getitem__(self, name):
+        return self.__sources__[name]
+
+    def __iter__(self):
+        return iter(self.sourceNames)
+
+    def sources(self):
+        return [self.__sources__[name] for name in self.sourceNames]
+
+    def predictedUnitVectors(
+            self,
+            attitudeState
+    ):
+        r"""
+        Compute the unit vector to every source in the body frame.
+
+        Args:
+         attitudeState: The attitude substate, providing the estimated
+          attitude quaternion qHat
+
+        Returns:
+         (numpy.ndarray): Nx3 array of predicted unit vectors
+        """
+        estimatedAttitudeMatrix = attitudeState.qHat.rotation_matrix
+        # Rows of unitVectors times the attitude matrix are the unit vectors
+        # rotated by the transpose of the attitude matrix
+        return self.unitVectors.dot(estimatedAttitudeMatrix)
+
+    def computeAssociationProbabilities(
+            self,
+            measurement,
+            stateDict,
+            validationThreshold=0
+    ):
+        r"""
+        Compute the association probability of a measurement with each source.
+
+        The probabilities are computed the same way as by
+        :meth:`~modest.signals.pointsource.PointSource.computeAssociationProbability`
+        (multiplied by the time of arrival probability and flux, as in
+        :meth:`~modest.signals.staticxraypointsource.StaticXRayPointSource.computeAssociationProbability`),
+        but for all of the sources at once.  For each source :math:`s` the
+        innovation covariance is
+
+        .. math::
+           \mathbf{S}^{(s)} = [\mathbf{u}^{(s)}_B \times] \mathbf{P}_{\delta\theta}
+           [\mathbf{u}^{(s)}_B \times]^T +
+           (\sigma^2_{\alpha} + \epsilon_s^2) \mathbf{I}_{3 \times 3}
+
+        where :math:`\mathbf{u}^{(s)}_B` is the predicted unit vector to the
+        source in the body frame, :math:`\mathbf{P}_{\delta\theta}` is the
+        attitude error covariance and :math:`\epsilon_s` is the extent of the
+        source.
+
+        The measurement may either be a single measurement dict, or a
+        :class:`~modest.utils.photonBatch.PhotonBatch` (or dict of columns)
+        containing several measurements, in which case the probabilities of
+        every measurement are evaluated against the same prior attitude.
+
+        Args:
+         measurement: The measurement dict, or a batch of measurements
+         stateDict (dict): The substate dictionary of the filter (see
+          :attr:`~modest.modularfilter.ModularFilter.subStates`)
+         validationThreshold (float): Unused, kept for consistency with
+          the computeAssociationProbability functions of the sources
+
+        Returns:
+         (numpy.ndarray): Unnormalized association probability with each
+         source, in the order of :attr:`sourceNames`.  For a batch of M
+         measurements the array is MxN.
+        """
+        if isinstance(measurement, PhotonBatch):
+            measurement = measurement.toColumns()
+
+        if (
+                ('RA' not in measurement) or
+                ('DEC' not in measurement) or
+                (self.attitudeStateName not in stateDict)
+        ):
+            probability = np.ones(
+                np.shape(measurement['t']['value']) + (len(self),)
+            )
+            return probability * self.TOAWeights * self.fluxes
+
+        attitudeState = stateDict[self.attitudeStateName]['stateObject']
+        P = attitudeState.covariance().convertCovariance('covariance').value
+        attitudeErrorCovariance = P[0:3, 0:3]
+
+        RA = np.asarray(measurement['RA']['value'], dtype=float)
+        DEC = np.asarray(measurement['DEC']['value'], dtype=float)
+        angleVar = np.asarray(measurement['RA']['var'], dtype=float)
+        cosD = np.cos(DEC)
+        measuredUnitVectors = np.stack(
+            [cosD * np.cos(RA), cosD * np.sin(RA), np.sin(DEC)],
+            axis=-1
+        )
+        measuredUnitVectors = (
+            measuredUnitVectors /
+            np.linalg.norm(measuredUnitVectors, axis=-1)[..., np.newaxis]
+        )
+
+        uPred = self.predictedUnitVectors(attitudeState)
+
+        # Stack of skew symmetric matrices of the predicted unit vectors
+        skewMatrices = np.zeros([len(self), 3, 3])
+        skewMatrices[:, 0, 1] = -uPred[:, 2]
+        skewMatrices[:, 0, 2] = uPred[:, 1]
+        skewMatrices[:, 1, 0] = uPred[:, 2]
+        skewMatrices[:, 1, 2] = -uPred[:, 0]
+        skewMatrices[:, 2, 0] = -uPred[:, 1]
+        skewMatrices[:, 2, 1] = uPred[:, 0]
+
+        stateVariance = np.einsum(
+            'nij,jk,nlk->nil',
+            skewMatrices,
+            attitudeErrorCovariance,
+            skewMatrices
+        )
+
+        # Innovation covariance for each (measurement, source) pair
+        angleVar = angleVar[..., np.newaxis] + np.square(self.extents)
+        residualVariance = (
+            stateVariance +
+            angleVar[..., np.newaxis, np.newaxis] * np.eye(3)
+        )
+        dY = measuredUnitVectors[..., np.newaxis, :] - uPred
+
+        uniformProbability = 1/(4 * np.pi)
+        maxProb = 1/np.sqrt(
+            np.power(2 * np.pi, 3) * np.linalg.det(residualVariance)
+        )
+        expArg = -np.einsum(
+            '...i,...i->...',
+            dY,
+            np.linalg.solve(residualVariance, dY[..., np.newaxis])[..., 0]
+        )/2
+
+        probability = np.where(
+            expArg < -1e1, 0.0, maxProb * np.exp(expArg)
+        )
+        probability = np.where(
+            maxProb < uniformProbability, uniformProbability, probability
+        )
+        return probability * self.TOAWeights * self.fluxes
@@ -2,6 +2,7 @@ import numpy as np
 from math import isnan
 # from scipy.stats import multivariate_normal
 from . import signalsource
+from .. utils.photonBatch import PhotonBatch, mergePhotonBatches
 from abc import ABCMeta, abstractmethod
 
 
@@ -31,6 +32,129 @@ class PoissonSource(signalsource.SignalSource):
             probability = 1.0
         return probability
 
+    def generatePhotonChunks(
+            self,
+            t0=0,
+            tMax=None,
+            chunkLength=None,
+            chunkSize=None,
+            seed=None,
+            **arrivalArgs
+    ):
+        r"""
+        Generate photon arrivals as a stream of time-ordered chunks.
+
+        This is a generator counterpart to generatePhotonArrivals: rather than
+        generating all of the photons between t0 and tMax at once, photons are
+        generated one chunk at a time, as they are needed.  Since photon
+        arrivals are a Poisson process, the arrivals in consecutive intervals
+        of time are independent, so generating the photons chunk by chunk
+        gives the same distribution as generating them all at once.  This
+        allows simulations of any length (including unbounded, if tMax is
+        None) with bounded memory, and the filter can start processing photons
+        as soon as the first chunk is generated.
+
+        Chunks either cover a fixed length of time (chunkLength) or contain a
+        fixed number of photons (chunkSize).  In the latter case, photons are
+        generated in intervals expected to contain about chunkSize photons,
+        and photons left over from one interval are carried over to the next
+        chunk.
+
+        The random number generator state of the stream is kept separate from
+        the global numpy random state, so the photons generated do not depend
+        on what else uses the random number generator in between chunks.  If
+        no seed is given, the stream's seed is drawn from the global random
+        state.
+
+        If TOA_StdDev is given (directly, or through the detector of the
+        spacecraft), the measurement noise can move a photon across the
+        boundary between two intervals.  Photons measured less than 10
+        TOA_StdDev before the end of an interval are therefore held back and
+        merged with the photons of the next interval, so that the stream
+        stays in time order (a photon would have to be moved back by more
+        than 10 standard deviations to break it).
+
+        Args:
+         t0 (float): Time at which to start generating photons
+         tMax (float): Time at which to stop generating photons.  If None, photons are generated indefinitely.
+         chunkLength (float): Length of time covered by each chunk
+         chunkSize (int): Number of photons in each chunk (the last chunk before tMax may contain fewer)
+         seed (int): Seed for the random number generator of the stream (optional)
+         arrivalArgs: Additional arguments passed to generatePhotonArrivals (e.g. spacecraft, TOA_StdDev)
+
+        Returns:
+         (generator): Generator yielding :class:`~modest.utils.photonBatch.PhotonBatch` chunks
+        """
+        if (chunkLength is None) == (chunkSize is None):
+            raise ValueError(
+                'Must specify exactly one of chunkLength and chunkSize.'
+            )
+        if chunkLength is None:
+            chunkLength = chunkSize / self.flux
+
+        if seed is None:
+            seed = np.random.randint(0, 2**31 - 1)
+        streamRandomState = np.random.RandomState(seed).get_state()
+
+        TOA_StdDev = arrivalArgs.get('TOA_StdDev')
+        spacecraft = arrivalArgs.get('spacecraft')
+        if (
+                (TOA_StdDev is None) and
+                (spacecraft is not None) and
+                hasattr(spacecraft, 'detector')
+        ):
+            TOA_StdDev = spacecraft.detector.TOA_StdDev
+        timeOffset = arrivalArgs.get('timeOffset')
+        if not timeOffset:
+            timeOffset = 0
+
+        heldPhotons = None
+        leftoverPhotons = None
+        tStart = t0
+        while tMax is None or tStart < tMax:
+            tStop = tStart + chunkLength
+            if tMax is not None:
+                tStop = np.min([tStop, tMax])
+
+            # Generate the photons in this interval with the stream's random
+            # state, and then restore the global random state
+            globalRandomState = np.random.get_state()
+            np.random.set_state(streamRandomState)
+            photonBatch = self.generatePhotonArrivals(
+                tStop, t0=tStart, columnar=True, **arrivalArgs
+            )
+            streamRandomState = np.random.get_state()
+            np.random.set_state(globalRandomState)
+            tStart = tStop
+
+            if TOA_StdDev:
+                if heldPhotons is not None:
+                    photonBatch = mergePhotonBatches([heldPhotons, photonBatch])
+                if tMax is None or tStop < tMax:
+                    nReady = np.searchsorted(
+                        photonBatch.t,
+                        tStop - timeOffset - 10 * TOA_StdDev,
+                        side='right'
+                    )
+                    heldPhotons = photonBatch[nReady:]
+                    photonBatch = photonBatch[0:nReady]
+
+            if chunkSize is None:
+                yield photonBatch
+                continue
+
+            if leftoverPhotons is not None:
+                photonBatch = PhotonBatch.concatenate(
+                    [leftoverPhotons, photonBatch]
+                )
+            while len(photonBatch) >= chunkSize:
+                yield photonBatch[0:chunkSize]
+                photonBatch = photonBatch[chunkSize:]
+            leftoverPhotons = photonBatch
+
+        if leftoverPhotons is not None and len(leftoverPhotons) > 0:
+            yield leftoverPhotons
+
 
 class StaticPoissonSource(PoissonSource):
     def __init__(
@@ -60,35 +184,22 @@ class StaticPoissonSource(PoissonSource):
             tMax,
             t0=0
             ):
-        nCandidates = np.int((tMax - t0) * self.flux * 1.1)
+        r"""
+        Generate the times of Poisson events between t0 and tMax.
 
-        # print(nCandidates)
-        # Generate a batch of candidate arrival times (more efficient than generating on the fly)
-        arrivalTimeArray = np.random.exponential(1.0/self.flux, nCandidates)
+        The number of events is drawn from a Poisson distribution, and the
+        event times are then uniformly distributed over the interval (which
+        is equivalent to accumulating exponentially distributed gaps).
 
-        poissonEvents = []
+        Args:
+         tMax (float): Time at which to stop generating events
+         t0 (float): Time at which to start generating events
 
-        tLastEvent = t0
-        eventIndex = 0
-        
-        while tLastEvent < tMax:
-            # Draw the next arrival time and selection variable from our
-            # pre-generated arrays
-            if eventIndex < len(arrivalTimeArray):
-                nextEvent = arrivalTimeArray[eventIndex]
-            # If we run out, generate more on the fly
-            else:
-                nextEvent = np.random.exponential(1.0/self.flux)
-                # print('Generating on the fly!')
-            tNextEvent = (
-                tLastEvent +
-                nextEvent
-                )
-            if tNextEvent < tMax:
-                poissonEvents.append(tNextEvent)
-            tLastEvent = tNextEvent
-            eventIndex = eventIndex+1
-        return poissonEvents
+        Returns:
+         (numpy.array): Sorted event times
+        """
+        nEvents = np.random.poisson(self.flux * (tMax - t0))
+        return np.sort(np.random.uniform(t0, tMax, nEvents))
 
 class DynamicPoissonSource(PoissonSource):
     __metaclass__ = ABCMeta
@@ -138,10 +249,27 @@ class DynamicPoissonSource(PoissonSource):
         if self.correlationStateName in stateDict:
             state = stateDict[self.correlationStateName]['stateObject']
             state = state.getStateVector()
+        else:
+            # States that track several signals (e.g. CorrelationBank) are
+            # registered under their own name, so look for a state which
+            # tracks this signal
+            for stateName in stateDict:
+                stateObject = stateDict[stateName]['stateObject']
+                if (
+                        hasattr(stateObject, 'tracksSignal') and
+                        stateObject.tracksSignal(self)
+                ):
+                    state = stateObject.getStateVector()
+                    break
         #print('Current TDOA std: %.2e' %np.sqrt(state['TDOAVar']))
-        if 'TDOAVar' in state:
-            if not isnan(state['TDOAVar']):
-                measuredTVar = measurement['t']['var'] + state['TDOAVar']
+        if (state is not None) and ('TDOAVar' in state):
+            stateTDOAVar = state['TDOAVar']
+            # States that track several signals (e.g. CorrelationBank) store
+            # one TDOA variance per signal, indexed by signal ID
+            if 'signalIndex' in state:
+                stateTDOAVar = stateTDOAVar[state['signalIndex'][self.signalID()]]
+            if not isnan(stateTDOAVar):
+                measuredTVar = measurement['t']['var'] + stateTDOAVar
             else:
                 measuredTVar = measurement['t']['var']
                 # print('State TDOA var is Nan; excluding from TOA probability calculations')
@@ -22,6 +22,18 @@ class SignalSource():
     def signalID(self):
         return self.__signalID__
 
+    def refreshSignalID(self):
+        r"""
+        Gives the signal source a new signal ID.
+
+        Signal IDs are only unique within a run, so a signal source that was
+        pickled in another run (e.g. loaded from a cache) must be given a new
+        ID before it is used alongside other signal sources.
+        """
+        self.__signalID__ = SignalSource.nextSignalID
+        SignalSource.nextSignalID += 1
+        return
+
     def computeAssociationProbability(
             self,
             measurement,
@@ -12,6 +12,7 @@ from . import poissonsource
 from .. utils import spacegeometry as sg
 from .. utils import xrayphotons as xp
 from .. utils import physicalconstants as pc
+from .. utils.photonBatch import PhotonBatch
 
 
 class StaticXRayPointSource(
@@ -96,29 +97,48 @@ class StaticXRayPointSource(
             attitude=None,
             FOV=None,
             AOA_StdDev=None,
-            TOA_StdDev=None
+            TOA_StdDev=None,
+            columnar=False,
+            attitudeMatrix=None
     ):
+        # attitudeMatrix, if given, is a function returning the stack of
+        # attitude rotation matrices for an array of times (e.g. the
+        # attitudeMatrix method of the dynamics), and is used in place of
+        # attitude to generate the arrival vectors of all photons at once
         poissonEvents = self.generateEvents(tMax, t0=t0)
-        measurements = []
-        for event in poissonEvents:
-            if TOA_StdDev:
-                event = event + np.random.normal(scale=TOA_StdDev)
-                nextMeasurement = {
-                    't': {
-                        'value': event,
-                        'var': np.square(TOA_StdDev)
-                    },
-                    'name': self.name
-                }
-            else:
-                nextMeasurement = {
-                    't': {'value': event},
-                    'name': self.name
-                }
-                
-            if attitude is not None:
-                nextMeasurement.update(
-                    self.generateArrivalVector(attitude(event), AOA_StdDev)
-                    )
-            measurements.append(nextMeasurement)
-        return(measurements)
+        nEvents = len(poissonEvents)
+        if TOA_StdDev:
+            # The measurement noise can swap neighboring photons, so the
+            # measured times are sorted again
+            poissonEvents = np.sort(
+                poissonEvents + np.random.normal(scale=TOA_StdDev, size=nEvents)
+            )
+            photonColumns = {
+                't': {
+                    'value': poissonEvents,
+                    'var': np.full(nEvents, np.square(TOA_StdDev))
+                },
+                'name': self.name
+            }
+        else:
+            photonColumns = {
+                't': {'value': poissonEvents},
+                'name': self.name
+            }
+
+        if attitudeMatrix is not None:
+            photonColumns.update(
+                self.generateArrivalVectors(
+                    AOA_StdDev=AOA_StdDev,
+                    attitudeMatrices=attitudeMatrix(poissonEvents)
+                )
+            )
+        elif attitude is not None:
+            photonColumns.update(
+                self.generateArrivalVectors(attitude(poissonEvents), AOA_StdDev)
+            )
+
+        photonBatch = PhotonBatch.fromColumns(photonColumns)
+        if columnar:
+            return photonBatch
+        return(photonBatch.toList())
@@ -7,6 +7,7 @@ from . import poissonsource
 from .. utils import spacegeometry as sg
 from .. utils import xrayphotons as xp
 from .. utils import physicalconstants as pc
+from .. utils.photonBatch import PhotonBatch
 
 
 class UniformNoiseXRaySource(poissonsource.StaticPoissonSource):
@@ -76,47 +77,44 @@ class UniformNoiseXRaySource(poissonsource.StaticPoissonSource):
             attitude=None,
             FOV=None,
             AOA_StdDev=None,
-            TOA_StdDev=None
+            TOA_StdDev=None,
+            columnar=False
             ):
         poissonEvents = self.generateEvents(tMax, t0=t0)
-        arrivalVectors = self.generateUniformArrivalVectors(len(poissonEvents), FOV)
+        nEvents = len(poissonEvents)
+        arrivalVectors = self.generateUniformArrivalVectors(nEvents, FOV)
+        Ra, Dec = sg.unitVector2RaDec(arrivalVectors.transpose())
 
-        photonMeasurements = []
-        for photonIndex in range(len(poissonEvents)):
-            arrivalVector = arrivalVectors[photonIndex]
-            arrivalTime = poissonEvents[photonIndex]
-            
-            # Generate a uniformly distributed random arrival vector
-            Ra, Dec = sg.unitVector2RaDec(arrivalVector)
-            if TOA_StdDev:
-                tDict = {
-                    'value': arrivalTime + np.random.normal(scale=TOA_StdDev),
-                    'var': np.square(TOA_StdDev)
-                }
-            else:
-                tDict = {
-                    'value': arrivalTime
-                }
-
-            if AOA_StdDev:
-                RaDict = {'value': Ra, 'var': np.square(AOA_StdDev)}
-                DecDict = {'value': Dec, 'var': np.square(AOA_StdDev)}
-                
-            else:
-                RaDict = {'value': Ra}
-                DecDict = {'value': Dec}
-                
-            measurementDict = {
-                't': tDict,
-                'unitVec': {'value': arrivalVector},
-                'RA': RaDict,
-                'DEC': DecDict,
-                'name': 'background'
+        if TOA_StdDev:
+            tDict = {
+                'value': np.sort(
+                    poissonEvents + np.random.normal(scale=TOA_StdDev, size=nEvents)
+                ),
+                'var': np.full(nEvents, np.square(TOA_StdDev))
+            }
+        else:
+            tDict = {
+                'value': poissonEvents
             }
 
-            photonMeasurements.append(measurementDict)
-        
-        return photonMeasurements
+        if AOA_StdDev:
+            RaDict = {'value': Ra, 'var': np.full(nEvents, np.square(AOA_StdDev))}
+            DecDict = {'value': Dec, 'var': np.full(nEvents, np.square(AOA_StdDev))}
+        else:
+            RaDict = {'value': Ra}
+            DecDict = {'value': Dec}
+
+        photonBatch = PhotonBatch.fromColumns({
+            't': tDict,
+            'unitVec': {'value': arrivalVectors},
+            'RA': RaDict,
+            'DEC': DecDict,
+            'name': 'background'
+        })
+
+        if columnar:
+            return photonBatch
+        return photonBatch.toList()
     
     def generateUniformArrivalVectors(
             self,
@@ -1,9 +1,12 @@
 from astropy.io import fits
 from pint import UnitRegistry
 import numpy as np
-from scipy.interpolate import interp1d
+from scipy.interpolate import interp1d, CubicSpline
 import os
 import fnmatch
+import pickle
+import shutil
+import tempfile
 from .. import utils
 
 planetaryMasses = {
@@ -19,6 +22,248 @@ planetaryMasses = {
     'Neptune Barycenter': 1.024e26
 }
 
+def readTable(
+        fileList,
+        columns
+):
+    r"""
+    Reads and concatenates columns of the first table of a list of FITS
+    files, scaling each column by a conversion factor.
+
+    The files are opened memory-mapped, and the output arrays are sized once
+    from the row counts in the file headers.
+
+    Args:
+     fileList (list): Paths of the FITS files
+     columns (dict): Dictionary of (FITS column name, conversion factor) tuples, keyed by output name
+
+    Returns:
+     (dict): Dictionary of converted arrays, keyed by output name
+    """
+    rowCounts = [fits.getheader(tableFile, 1)['NAXIS2'] for tableFile in fileList]
+    table = {}
+    rowStart = 0
+    for tableFile, rowCount in zip(fileList, rowCounts):
+        with fits.open(tableFile, memmap=True) as tableHDUList:
+            tableData = tableHDUList[1].data
+            for outputName, (columnName, conversionFactor) in columns.items():
+                column = tableData.field(columnName)
+                if outputName not in table:
+                    table[outputName] = np.empty(
+                        (np.sum(rowCounts),) + column.shape[1:]
+                    )
+                table[outputName][rowStart:rowStart + rowCount] = (
+                    column * conversionFactor
+                )
+            del tableData
+        rowStart += rowCount
+    return table
+
+
+def observationCacheKey(
+        fileList,
+        detector,
+        loadOptions
+):
+    r"""
+    Key under which an observation is stored in the observation cache.
+
+    The key is made of the paths and modification times of the observation
+    files, the detector constants resolved from the user settings (see
+    :attr:`ChandraDetector.settingNames`), and the options used to load the
+    events, so the cache is rebuilt whenever one of those changes.
+
+    Args:
+     fileList (list): Paths of the events, aspect, gyro and ephemeris files
+     detector (ChandraDetector): Detector built from the user settings (the events need not be loaded)
+     loadOptions (dict): Keyword arguments used to load the events
+
+    Returns:
+     (tuple): The cache key
+    """
+    return (
+        tuple(
+            (os.path.abspath(fileName), os.path.getmtime(fileName))
+            for fileName in fileList
+        ),
+        tuple(
+            (settingName, repr(getattr(detector, settingName)))
+            for settingName in ChandraDetector.settingNames
+        ),
+        tuple(sorted(
+            (optionName, repr(optionValue))
+            for optionName, optionValue in loadOptions.items()
+        ))
+    )
+
+
+def saveObservationCache(
+        cacheDirectory,
+        cacheKey,
+        detector,
+        dynamics
+):
+    r"""
+    Writes the events and the aspect, gyro and ephemeris tables of an
+    observation to a cache directory.
+
+    Each array is stored as a separate .npy file so that it can be loaded
+    memory-mapped, and the remaining attributes of the detector and dynamics
+    objects are pickled in the file "observation.p", which is written last.
+    If the directory can't be written, the observation is simply not cached.
+
+    Other processes may have the arrays of an earlier cache memory-mapped, so
+    the arrays are never overwritten in place (truncating a mapped file
+    would crash those processes with SIGBUS).  Instead, each save writes its
+    arrays to a new subdirectory, and "observation.p", which names that
+    subdirectory, is swapped in atomically with os.replace.  The
+    subdirectory of the replaced cache is then removed; processes that have
+    its arrays mapped keep their (unlinked) files until they unmap them.
+
+    Args:
+     cacheDirectory (str): Directory of the cache
+     cacheKey (tuple): Key of the observation (see :func:`observationCacheKey`)
+     detector (ChandraDetector): Detector whose events are stored
+     dynamics (ChandraDynamics): Dynamics whose tables are stored
+    """
+    cacheArrays = {}
+    for eventKey, eventArray in detector.extractedPhotonEvents.items():
+        cacheArrays['events_%s' % eventKey] = eventArray
+    for photonKey, photonArray in detector.calibratedPhotonEvents.items():
+        cacheArrays['photons_%s' % photonKey] = photonArray
+    for tableName in ChandraDynamics.tableNames:
+        for columnName, column in getattr(dynamics, tableName).items():
+            cacheArrays['%s_%s' % (tableName, columnName)] = column
+
+    detectorAttributes = dict(detector.__dict__)
+    for arrayAttribute in ['extractedPhotonEvents', 'calibratedPhotonEvents']:
+        detectorAttributes[arrayAttribute] = list(detectorAttributes[arrayAttribute])
+
+    dynamicsAttributes = {
+        attributeName: attributeValue
+        for attributeName, attributeValue in dynamics.__dict__.items()
+        if not isinstance(attributeValue, (interp1d, CubicSpline))
+    }
+    for tableName in ChandraDynamics.tableNames:
+        dynamicsAttributes[tableName] = list(dynamicsAttributes[tableName])
+
+    metadataFile = os.path.join(cacheDirectory, 'observation.p')
+    temporaryFile = metadataFile + '.%i.tmp' % os.getpid()
+    arrayDirectory = None
+    try:
+        os.makedirs(cacheDirectory, exist_ok=True)
+        arrayDirectory = tempfile.mkdtemp(prefix='arrays.', dir=cacheDirectory)
+        for arrayName, cacheArray in cacheArrays.items():
+            np.save(os.path.join(arrayDirectory, arrayName + '.npy'), cacheArray)
+        with open(temporaryFile, 'wb') as metadataFileHandle:
+            pickle.dump(
+                {
+                    'cacheKey': cacheKey,
+                    'arrayDirectory': os.path.basename(arrayDirectory),
+                    'detector': detectorAttributes,
+                    'dynamics': dynamicsAttributes
+                },
+                metadataFileHandle,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+        oldArrayDirectory = cacheArrayDirectory(cacheDirectory)
+        os.replace(temporaryFile, metadataFile)
+    except OSError:
+        if os.path.isfile(temporaryFile):
+            os.remove(temporaryFile)
+        if arrayDirectory is not None:
+            shutil.rmtree(arrayDirectory, ignore_errors=True)
+        return
+    if oldArrayDirectory is not None:
+        shutil.rmtree(
+            os.path.join(cacheDirectory, oldArrayDirectory), ignore_errors=True
+        )
+    return
+
+
+def cacheArrayDirectory(
+        cacheDirectory
+):
+    r"""
+    Returns the name of the subdirectory holding the arrays of the current
+    observation cache (see :func:`saveObservationCache`).
+
+    Args:
+     cacheDirectory (str): Directory of the cache
+
+    Returns:
+     (str): Name of the array subdirectory, or None if there is no valid cache
+    """
+    try:
+        with open(os.path.join(cacheDirectory, 'observation.p'), 'rb') as metadataFileHandle:
+            return pickle.load(metadataFileHandle).get('arrayDirectory')
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def loadObservationCache(
+        cacheDirectory,
+        cacheKey
+):
+    r"""
+    Loads an observation from a cache directory written by
+    :func:`saveObservationCache`.
+
+    The arrays are memory-mapped read-only, so that processes loading the
+    same observation share them through the page cache.
+
+    Args:
+     cacheDirectory (str): Directory of the cache
+     cacheKey (tuple): Key of the observation (see :func:`observationCacheKey`)
+
+    Returns:
+     (tuple): The ChandraDetector and ChandraDynamics objects, or None if the cache doesn't exist or doesn't match the key
+    """
+    metadataFile = os.path.join(cacheDirectory, 'observation.p')
+    try:
+        with open(metadataFile, 'rb') as metadataFileHandle:
+            cacheContents = pickle.load(metadataFileHandle)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if (
+            cacheContents.get('cacheKey') != cacheKey or
+            'arrayDirectory' not in cacheContents
+    ):
+        return None
+    arrayDirectory = os.path.join(
+        cacheDirectory, cacheContents['arrayDirectory']
+    )
+
+    def loadArray(arrayName):
+        return np.load(
+            os.path.join(arrayDirectory, arrayName + '.npy'), mmap_mode='r'
+        )
+
+    try:
+        detector = ChandraDetector.__new__(ChandraDetector)
+        detector.__dict__.update(cacheContents['detector'])
+        detector.extractedPhotonEvents = {
+            eventKey: loadArray('events_%s' % eventKey)
+            for eventKey in cacheContents['detector']['extractedPhotonEvents']
+        }
+        detector.calibratedPhotonEvents = {
+            photonKey: loadArray('photons_%s' % photonKey)
+            for photonKey in cacheContents['detector']['calibratedPhotonEvents']
+        }
+
+        dynamics = ChandraDynamics.__new__(ChandraDynamics)
+        dynamics.__dict__.update(cacheContents['dynamics'])
+        for tableName in ChandraDynamics.tableNames:
+            setattr(dynamics, tableName, {
+                columnName: loadArray('%s_%s' % (tableName, columnName))
+                for columnName in cacheContents['dynamics'][tableName]
+            })
+    except (OSError, ValueError):
+        return None
+    dynamics.buildInterpolators()
+    return detector, dynamics
+
+
 class Chandra():
     def __init__(
             self,
@@ -28,8 +273,25 @@ class Chandra():
             # gyroFile,
             userData,
             ureg,
-            tStartOffset=0
+            tStartOffset=0,
+            filterEnergyRange=False,
+            timeRange=None,
+            maxAOA=None,
+            cacheDirectory=None,
+            ephemerisStep=60.0
     ):
+        r"""
+        If cacheDirectory is given, the events and the aspect, gyro and
+        ephemeris tables of the observation are loaded from the cache in that
+        directory (see :func:`loadObservationCache`).  If there is no cache,
+        or it was built from different files, detector settings or load
+        options, the observation is loaded from the FITS files and the cache
+        is written.
+
+        ephemerisStep is the time step (in seconds) of the table of planet
+        positions used by the dynamics (see
+        :meth:`ChandraDynamics.buildPlanetTable`).
+        """
 
         ##########################################################
         #
@@ -75,11 +337,36 @@ class Chandra():
                         gyroFileList.append(FITSDirectory + 'supporting/' + file)
                         
         
-        self.detector = ChandraDetector(
+        loadOptions = {
+            'filterEnergyRange': filterEnergyRange,
+            'timeRange': timeRange,
+            'maxAOA': maxAOA
+        }
+
+        # The detector settings are resolved before the events are loaded,
+        # so that they can be part of the cache key
+        detector = ChandraDetector(
             eventsFileList,
             userData,
-            ureg
+            ureg,
+            loadEvents=False,
+            **loadOptions
         )
+
+        observationCache = None
+        if cacheDirectory is not None:
+            cacheKey = observationCacheKey(
+                eventsFileList + aspectFileList + gyroFileList + ephemFileList,
+                detector,
+                dict(loadOptions, ephemerisStep=ephemerisStep)
+            )
+            observationCache = loadObservationCache(cacheDirectory, cacheKey)
+
+        if observationCache is not None:
+            self.detector, self.dynamics = observationCache
+        else:
+            detector.loadEvents(eventsFileList)
+            self.detector = detector
         
         # aspecthdulist = fits.open(aspectFileList[0])
         # self.aspectData = aspecthdulist[1]
@@ -90,27 +377,69 @@ class Chandra():
         # ephemhdulist = fits.open(ephemFileList[0])
         # self.ephemData = ephemhdulist[1]
 
-        self.tStart = self.detector.getPhotonMeasurement(0)['t']['value'] + tStartOffset
         self.tStart = self.detector.extractedPhotonEvents['Time'][0] + tStartOffset
-        
-        self.dynamics = ChandraDynamics(
-            ephemFileList,
-            aspectFileList,
-            gyroFileList,
-            userData,
-            ureg,
-            self.tStart
+
+        if observationCache is not None:
+            self.dynamics.tStart = self.tStart
+        else:
+            self.dynamics = ChandraDynamics(
+                ephemFileList,
+                aspectFileList,
+                gyroFileList,
+                userData,
+                ureg,
+                self.tStart,
+                ephemerisStep=ephemerisStep
             )
+            if cacheDirectory is not None:
+                saveObservationCache(
+                    cacheDirectory, cacheKey, self.detector, self.dynamics
+                )
             
             
 
 class ChandraDetector():
+    settingNames = [
+        'Name',
+        'photonXKey',
+        'photonYKey',
+        'photonEnergyKey',
+        'binsPerEnergy',
+        'energyIntercept',
+        'photonEnergyVar',
+        'timeConversionFactor',
+        'timeResolution',
+        'TOA_var',
+        'pixelResolutionX',
+        'pixelResolutionY',
+        'FOV',
+        'area',
+        'AOA_xVar',
+        'AOA_yVar',
+        'detectorOffsetX',
+        'detectorOffsetY',
+        'energyRange'
+    ]
+    """
+    Names of the detector constants resolved from the user settings, which
+    determine the calibrated events (see :func:`observationCacheKey`)
+    """
+
     def __init__(
             self,
             eventsFileList,
             userData,
-            ureg
+            ureg,
+            filterEnergyRange=False,
+            timeRange=None,
+            maxAOA=None,
+            loadEvents=True
     ):
+        r"""
+        If loadEvents is False, only the detector constants are resolved from
+        the user settings and the events header, and the events are loaded
+        later with :meth:`loadEvents`.
+        """
         self.eventsList = []
         self.photonEventsHeader = None
         # Import Detector Information
@@ -264,43 +593,180 @@ class ChandraDetector():
         self.energyRange = [self.lowerEnergy, self.upperEnergy]
         self.energyRangeKeV = [self.lowerEnergy, self.upperEnergy]
 
-        self.extractedPhotonEvents = {
-            self.photonXKey: [],
-            self.photonYKey: [],
-            self.photonEnergyKey: [],
-            'Time': []
-        }
+        self.timeRange = timeRange
+        """
+        Start and stop time of the events to load (optional)
+        """
 
-        for eventsFile in eventsFileList:
-            with fits.open(eventsFile) as photonHDUList: 
-                photonEvents = photonHDUList[1]
+        self.maxAOA = maxAOA
+        """
+        Largest angle of arrival (in radians, from the detector offset) of the
+        events to load (optional)
+        """
 
-                self.extractedPhotonEvents[self.photonXKey] = np.append(
-                    self.extractedPhotonEvents[self.photonXKey],
-                    photonEvents.data[self.photonXKey]
-                )
+        self.filterEnergyRange = filterEnergyRange
+        """
+        Determines whether events outside of :attr:`energyRange` are dropped
+        when the events are loaded
+        """
 
-                self.extractedPhotonEvents[self.photonYKey] = np.append(
-                    self.extractedPhotonEvents[self.photonYKey],
-                    photonEvents.data[self.photonYKey]
-                )
+        self.targetObject = self.photonEventsHeader['OBJECT']
 
-                self.extractedPhotonEvents[self.photonEnergyKey] = np.append(
-                    self.extractedPhotonEvents[self.photonEnergyKey],
-                    photonEvents.data[self.photonEnergyKey]
-                )
+        if loadEvents:
+            self.loadEvents(eventsFileList)
 
-                self.extractedPhotonEvents['Time'] = np.append(
-                    self.extractedPhotonEvents['Time'],
-                    photonEvents.data['Time']
-                )
+    def loadEvents(
+            self,
+            eventsFileList
+    ):
+        r"""
+        Loads and calibrates the events of the events files.
+
+        Args:
+         eventsFileList (list): Paths of the events files
+        """
+        self.extractedPhotonEvents = self.loadPhotonEvents(eventsFileList)
+
+        self.calibratedPhotonEvents = self.calibratePhotonEvents()
+        """
+        Arrival time, angles of arrival (in radians) and energy (in keV) of
+        each event
+        """
 
         self.photonEventCount = len(self.extractedPhotonEvents['Time'])
-        self.targetObject = self.photonEventsHeader['OBJECT']
         # photonHDUList.close()
 
         return
     
+    def loadPhotonEvents(
+            self,
+            eventsFileList
+    ):
+        r"""
+        Loads the photon events from a list of event files.
+
+        The event tables are opened memory-mapped, and only the position,
+        energy and time columns are read.  The events outside of
+        :attr:`energyRange` (if :attr:`filterEnergyRange` is set), outside of
+        :attr:`timeRange`, or further than :attr:`maxAOA` from the detector
+        offset are masked out as each file is read, and the remaining events
+        are copied into arrays which are sized once from the row counts in
+        the file headers.
+
+        Args:
+         eventsFileList (list): Paths of the event files
+
+        Returns:
+         (dict): Dictionary of event arrays, keyed by column name ("Time" for the arrival times)
+        """
+        eventKeys = [self.photonXKey, self.photonYKey, self.photonEnergyKey, 'Time']
+
+        maxEventCount = 0
+        for eventsFile in eventsFileList:
+            maxEventCount += fits.getheader(eventsFile, 1)['NAXIS2']
+
+        extractedPhotonEvents = {
+            eventKey: np.empty(maxEventCount) for eventKey in eventKeys
+        }
+
+        eventCount = 0
+        for eventsFile in eventsFileList:
+            with fits.open(eventsFile, memmap=True) as photonHDUList:
+                photonEvents = photonHDUList[1].data
+                eventColumns = {
+                    eventKey: photonEvents.field(eventKey)
+                    for eventKey in eventKeys
+                }
+                eventMask = self.photonEventMask(eventColumns)
+                nEvents = np.count_nonzero(eventMask)
+                for eventKey in eventKeys:
+                    extractedPhotonEvents[eventKey][
+                        eventCount:eventCount + nEvents
+                    ] = eventColumns[eventKey][eventMask]
+                eventCount += nEvents
+                del eventColumns, photonEvents
+
+        for eventKey in eventKeys:
+            extractedPhotonEvents[eventKey] = (
+                extractedPhotonEvents[eventKey][0:eventCount]
+            )
+        return extractedPhotonEvents
+
+    def photonEventMask(
+            self,
+            eventColumns
+    ):
+        r"""
+        Selects the events to be loaded.
+
+        Args:
+         eventColumns (dict): Dictionary of event arrays, keyed by column name
+
+        Returns:
+         (numpy.array): Boolean array which is True for the events to be kept
+        """
+        eventMask = np.ones(len(eventColumns['Time']), dtype=bool)
+        if self.filterEnergyRange:
+            energy = (
+                (eventColumns[self.photonEnergyKey] - self.energyIntercept) *
+                self.binsPerEnergy
+            )
+            eventMask &= (
+                (energy >= self.lowerEnergy) & (energy <= self.upperEnergy)
+            )
+        if self.timeRange is not None:
+            eventMask &= (
+                (eventColumns['Time'] >= self.timeRange[0]) &
+                (eventColumns['Time'] <= self.timeRange[1])
+            )
+        if self.maxAOA is not None:
+            RA = (
+                (eventColumns[self.photonXKey] - self.detectorOffsetX) *
+                self.pixelResolutionX
+            )
+            DEC = (
+                (eventColumns[self.photonYKey] - self.detectorOffsetY) *
+                self.pixelResolutionY
+            )
+            eventMask &= (np.square(RA) + np.square(DEC)) <= np.square(self.maxAOA)
+        return eventMask
+
+    def calibratePhotonEvents(
+            self,
+            start=None,
+            stop=None
+    ):
+        r"""
+        Converts a slice of the extracted events to photon measurements.
+
+        The event positions are converted to angles of arrival by removing
+        the detector offset and scaling by the pixel resolution, and the
+        energy channels are converted to keV.
+
+        Args:
+         start (int): Index of the first event (optional)
+         stop (int): Index after the last event (optional)
+
+        Returns:
+         (dict): Dictionary of arrays "t", "RA", "DEC" and "energy"
+        """
+        eventSlice = slice(start, stop)
+        return {
+            't': np.asarray(self.extractedPhotonEvents['Time'][eventSlice]),
+            'RA': -(
+                (self.extractedPhotonEvents[self.photonXKey][eventSlice] -
+                 self.detectorOffsetX) * self.pixelResolutionX
+            ),
+            'DEC': (
+                (self.extractedPhotonEvents[self.photonYKey][eventSlice] -
+                 self.detectorOffsetY) * self.pixelResolutionY
+            ),
+            'energy': (
+                (self.extractedPhotonEvents[self.photonEnergyKey][eventSlice] -
+                 self.energyIntercept) * self.binsPerEnergy
+            )
+        }
+
     def getPhotonMeasurement(
             self,
             index
@@ -337,9 +803,77 @@ class ChandraDetector():
             }
         }
         return photonMeasurementDict
-        
+
+    def getPhotonMeasurements(
+            self,
+            start=None,
+            stop=None
+    ):
+        r"""
+        Returns the photon measurements of a slice of the extracted events as
+        a :class:`~modest.utils.photonBatch.PhotonBatch`.
+
+        This is the batch counterpart of :meth:`getPhotonMeasurement`: the
+        columns of the batch are views of the calibrated event arrays (see
+        :meth:`calibratePhotonEvents`), and the measurement variances are the
+        same for every photon.
+
+        Args:
+         start (int): Index of the first event (optional)
+         stop (int): Index after the last event (optional)
+
+        Returns:
+         (PhotonBatch): The photon measurements
+        """
+        eventSlice = slice(start, stop)
+        return utils.PhotonBatch(
+            self.calibratedPhotonEvents['t'][eventSlice],
+            tVar=self.TOA_var,
+            RA=self.calibratedPhotonEvents['RA'][eventSlice],
+            RAVar=self.AOA_xVar,
+            DEC=self.calibratedPhotonEvents['DEC'][eventSlice],
+            DECVar=self.AOA_yVar,
+            energy=self.calibratedPhotonEvents['energy'][eventSlice],
+            energyVar=self.photonEnergyVar
+        )
+
+    def photonMeasurementChunks(
+            self,
+            chunkSize=10000,
+            start=0,
+            stop=None
+    ):
+        r"""
+        Iterates over the photon measurements in chunks of a fixed number of
+        photons.
+
+        The chunks can be passed directly to
+        :meth:`~modest.modularfilter.ModularFilter.measurementUpdateBatch`, or
+        merged with other photon streams by
+        :func:`~modest.utils.photonBatch.mergePhotonStreams`.
+
+        Args:
+         chunkSize (int): Number of photons in each chunk (the last chunk may contain fewer)
+         start (int): Index of the first event
+         stop (int): Index after the last event.  If None, iterates up to the last event.
+
+        Returns:
+         (generator): Generator yielding PhotonBatch chunks
+        """
+        if stop is None:
+            stop = self.photonEventCount
+        for chunkStart in range(start, stop, chunkSize):
+            yield self.getPhotonMeasurements(
+                chunkStart, np.min([chunkStart + chunkSize, stop])
+            )
+
 
 class ChandraDynamics():
+    tableNames = ['aspectTable', 'gyroTable', 'ephemerisTable', 'planetTable']
+    """
+    Names of the tables from which the interpolation functions are built
+    """
+
     def __init__(
             self,
             ephemFileList,
@@ -347,7 +881,8 @@ class ChandraDynamics():
             gyroFileList,
             userData,
             ureg,
-            tStart
+            tStart,
+            ephemerisStep=60.0
     ):
         self.planetList = ['Sun',
                            'Mercury',
@@ -361,6 +896,11 @@ class ChandraDynamics():
                            'Neptune Barycenter']
         
         self.tStart=tStart
+
+        self.ephemerisStep = ephemerisStep
+        """
+        Time step (in seconds) of the table of planet positions
+        """
         
         # Import data, starting with first file
         with fits.open(aspectFileList[0]) as aspecthdulist:
@@ -425,80 +965,148 @@ class ChandraDynamics():
         )
         self.eventTimeConversionFactor = self.ephemTimeUnits.to(ureg('day')).magnitude
 
-        aspectTime = []
-        aspectRoll = []
-        aspectDEC = []
-        aspectRA = []
-        
-        for aspectFile in aspectFileList:
-            with fits.open(aspectFile) as aspecthdulist:
-                aspectData = aspecthdulist[1].data
-            
-                aspectTime = np.append(aspectTime, aspectData['time'])
-            
-                aspectRoll = np.append(aspectRoll, aspectData['roll'])
-                aspectDEC = np.append(aspectDEC, aspectData['dec'])
-                aspectRA = np.append(aspectRA, aspectData['ra'])
-
-        gyroTime = []
-        gyroX = []
-        gyroY = []
-        gyroZ = []
-        for gyroFile in gyroFileList:
-            with fits.open(gyroFile) as gyrohdulist:
-                gyroData = gyrohdulist[1].data
-            
-                gyroTime = np.append(gyroTime, gyroData['time'])
-
-                gyroX = np.append(gyroX, gyroData['scratcor'][:,0])
-                gyroY = np.append(gyroY, gyroData['scratcor'][:,1])
-                gyroZ = np.append(gyroZ, gyroData['scratcor'][:,2])
-            
-        ephemTime = []
-        ephemX = []
-        ephemY = []
-        ephemZ = []
-
-        ephemVX = []
-        ephemVY = []
-        ephemVZ = []
-
-        for ephemFile in ephemFileList:
-            with fits.open(ephemFile) as ephemhdulist:
-                ephemData = ephemhdulist[1].data
-
-                ephemTime = np.append(ephemTime, ephemData['time'])
-                
-                ephemX = np.append(ephemX, ephemData['X'])
-                ephemY = np.append(ephemY, ephemData['Y'])
-                ephemZ = np.append(ephemZ, ephemData['Z'])
-
-                ephemVX = np.append(ephemVX, ephemData['VX'])
-                ephemVY = np.append(ephemVY, ephemData['VY'])
-                ephemVZ = np.append(ephemVZ, ephemData['VZ'])
-                
-        # Define a series of interpolation functions to access position,
-        # velocity, angles and angular velocity
-        self.chandraX = interp1d(ephemTime,ephemX)
-        self.chandraY = interp1d(ephemTime,ephemY)
-        self.chandraZ = interp1d(ephemTime,ephemZ)
-        
-        self.chandraVX = interp1d(ephemTime,ephemVX)
-        self.chandraVY = interp1d(ephemTime,ephemVY)
-        self.chandraVZ = interp1d(ephemTime,ephemVZ)
+        self.aspectTable = readTable(
+            aspectFileList,
+            {
+                'time': ('time', 1),
+                'roll': ('roll', self.recordedRollConversionFactor),
+                'DEC': ('dec', self.recordedDecConversionFactor),
+                'RA': ('ra', self.recordedRaConversionFactor)
+            }
+        )
+        """
+        Aspect solution (times, and roll, declination and right ascension in radians)
+        """
 
-        self.chandraRoll = interp1d(aspectTime, aspectRoll)
-        self.chandraDEC = interp1d(aspectTime, aspectDEC)
-        self.chandraRA = interp1d(aspectTime, aspectRA)
+        self.gyroTable = readTable(
+            gyroFileList,
+            {
+                'time': ('time', 1),
+                'omega': ('scratcor', self.gyroConversionFactor)
+            }
+        )
+        """
+        Gyro data (times, and angular velocity in radians per second)
+        """
 
-    
-        self.chandraOmegaX = interp1d(gyroTime,gyroX)
-        self.chandraOmegaY = interp1d(gyroTime,gyroY)
-        self.chandraOmegaZ = interp1d(gyroTime,gyroZ)
+        self.ephemerisTable = readTable(
+            ephemFileList,
+            {
+                'time': ('time', 1),
+                'X': ('X', self.posXConversionFactor),
+                'Y': ('Y', self.posYConversionFactor),
+                'Z': ('Z', self.posZConversionFactor),
+                'VX': ('VX', self.vXConversionFactor),
+                'VY': ('VY', self.vYConversionFactor),
+                'VZ': ('VZ', self.vZConversionFactor)
+            }
+        )
+        """
+        Ephemeris of the spacecraft relative to Earth (times, position in km
+        and velocity in km/s)
+        """
 
         self.timeObjType = type(self.chandraTimeToTimeScaleObj(self.tStart))
+
+        self.planetTable = self.buildPlanetTable()
+        """
+        Positions of the planets and velocity of Earth relative to the solar
+        system barycenter, tabulated over the span of the ephemeris (see
+        :meth:`buildPlanetTable`)
+        """
+
+        self.buildInterpolators()
         return
     
+    def buildInterpolators(self):
+        r"""
+        Builds the interpolation functions used to access position, velocity,
+        angles and angular velocity from the aspect, gyro and ephemeris
+        tables.
+
+        The tables are converted to radians, km and km/s when they are read,
+        so the interpolated values need no further conversion.
+        """
+        ephemTime = self.ephemerisTable['time']
+        self.chandraX = interp1d(ephemTime, self.ephemerisTable['X'])
+        self.chandraY = interp1d(ephemTime, self.ephemerisTable['Y'])
+        self.chandraZ = interp1d(ephemTime, self.ephemerisTable['Z'])
+
+        self.chandraVX = interp1d(ephemTime, self.ephemerisTable['VX'])
+        self.chandraVY = interp1d(ephemTime, self.ephemerisTable['VY'])
+        self.chandraVZ = interp1d(ephemTime, self.ephemerisTable['VZ'])
+
+        aspectTime = self.aspectTable['time']
+        self.chandraRoll = interp1d(aspectTime, self.aspectTable['roll'])
+        self.chandraDEC = interp1d(aspectTime, self.aspectTable['DEC'])
+        self.chandraRA = interp1d(aspectTime, self.aspectTable['RA'])
+
+        gyroTime = self.gyroTable['time']
+        self.chandraOmegaX = interp1d(gyroTime, self.gyroTable['omega'][:, 0])
+        self.chandraOmegaY = interp1d(gyroTime, self.gyroTable['omega'][:, 1])
+        self.chandraOmegaZ = interp1d(gyroTime, self.gyroTable['omega'][:, 2])
+
+        self.planetPositionSpline = CubicSpline(
+            self.planetTable['time'], self.planetTable['position'], axis=0
+        )
+        self.earthVelocitySpline = CubicSpline(
+            self.planetTable['time'], self.planetTable['earthVelocity'], axis=0
+        )
+        return
+
+    def buildPlanetTable(self):
+        r"""
+        Tabulates the positions of the planets in :attr:`planetList` and the
+        velocity of Earth, relative to the solar system barycenter.
+
+        The table covers the span of the spacecraft ephemeris (plus one step
+        on either side) at intervals of :attr:`ephemerisStep`, and is
+        computed with a single call to the planetary ephemeris for each body.
+        The positions and velocities at other times are interpolated with
+        cubic splines (see :meth:`planetPositions`), which avoids evaluating
+        the planetary ephemeris every time the position, velocity or
+        acceleration of the spacecraft is needed.
+
+        Returns:
+         (dict): Dictionary containing "time" (the table times), "position" (the planet positions in km, with shape (times, planets, 3)) and "earthVelocity" (the velocity of Earth in km/s, with shape (times, 3))
+        """
+        ephemTime = self.ephemerisTable['time']
+        tableTime = np.arange(
+            ephemTime[0] - self.ephemerisStep,
+            ephemTime[-1] + 2 * self.ephemerisStep,
+            self.ephemerisStep
+        )
+        timeObject = self.chandraTimeToTimeScaleObj(tableTime)
+
+        planetPosition = np.empty([len(tableTime), len(self.planetList), 3])
+        for planetIndex, planetName in enumerate(self.planetList):
+            planetPosition[:, planetIndex, :] = (
+                utils.spacegeometry.planets[planetName].at(timeObject).position.km.T
+            )
+        earthVelocity = (
+            utils.spacegeometry.earthObj.at(timeObject).velocity.km_per_s.T
+        )
+        return {
+            'time': tableTime,
+            'position': planetPosition,
+            'earthVelocity': earthVelocity
+        }
+
+    def planetPositions(
+            self,
+            t
+    ):
+        r"""
+        Interpolates the positions of the planets in :attr:`planetList`.
+
+        Args:
+         t (float or numpy.array): Chandra time(s)
+
+        Returns:
+         (numpy.array): Planet positions in km, with shape (planets, 3) for a single time, or (times, planets, 3) for an array of times
+        """
+        return self.planetPositionSpline(t)
+
     def chandraTimeToTimeScaleObj(
             self,
             chandraTime
@@ -518,15 +1126,13 @@ class ChandraDynamics():
             self,
             t
     ):
-        # if not isinstance(t,self.timeObjType):
-        tsObj = self.chandraTimeToTimeScaleObj(t)
-                      
-        earthPosition = utils.spacegeometry.earthObj.at(tsObj
-        ).position.km
-
-        chandraPositionX = self.chandraX(t) * self.posXConversionFactor
-        chandraPositionY = self.chandraY(t) * self.posYConversionFactor
-        chandraPositionZ = self.chandraZ(t) * self.posZConversionFactor
+        earthPosition = np.transpose(
+            self.planetPositions(t)[..., self.planetList.index('Earth'), :]
+        )
+
+        chandraPositionX = self.chandraX(t)
+        chandraPositionY = self.chandraY(t)
+        chandraPositionZ = self.chandraZ(t)
         
         chandraPostionSSB = (
             earthPosition +
@@ -538,15 +1144,11 @@ class ChandraDynamics():
             self,
             t
     ):
-        # if not isinstance(t,self.timeObjType):
-        tsObj = self.chandraTimeToTimeScaleObj(t)
-        earthVelocity = utils.spacegeometry.earthObj.at(
-            tsObj
-        ).velocity.km_per_s
+        earthVelocity = np.transpose(self.earthVelocitySpline(t))
         
-        chandraVelocityX = self.chandraVX(t) * self.vXConversionFactor
-        chandraVelocityY = self.chandraVY(t) * self.vYConversionFactor
-        chandraVelocityZ = self.chandraVZ(t) * self.vZConversionFactor
+        chandraVelocityX = self.chandraVX(t)
+        chandraVelocityY = self.chandraVY(t)
+        chandraVelocityZ = self.chandraVZ(t)
         
         chandraVelocitySSB = (
             earthVelocity +
@@ -565,9 +1167,9 @@ class ChandraDynamics():
                 attitudeArray.append(self.attitude(t[i],returnQ))
             return attitudeArray
         else:
-            roll = self.chandraRoll(t) * self.recordedRollConversionFactor
-            dec = -self.chandraDEC(t) * self.recordedDecConversionFactor
-            ra = self.chandraRA(t) * self.recordedRaConversionFactor
+            roll = self.chandraRoll(t)
+            dec = -self.chandraDEC(t)
+            ra = self.chandraRA(t)
 
         eulerAngles = [roll, dec, ra]
         if returnQ:
@@ -575,44 +1177,94 @@ class ChandraDynamics():
         else:
             return(eulerAngles)
 
+    def attitudeMatrix(
+            self,
+            t
+    ):
+        # Attitude rotation matrix (equal to attitude(t).rotation_matrix),
+        # or an Nx3x3 stack of rotation matrices for an array of N times
+        roll = self.chandraRoll(t)
+        dec = -self.chandraDEC(t)
+        ra = self.chandraRA(t)
+        return utils.euler2rotationMatrix([roll, dec, ra])
+
     def omega(
             self,
             t
     ):
-        omegaX = self.chandraOmegaX(t) * self.gyroConversionFactor
-        omegaY = self.chandraOmegaY(t) * self.gyroConversionFactor
-        omegaZ = self.chandraOmegaZ(t) * self.gyroConversionFactor
+        omegaX = self.chandraOmegaX(t)
+        omegaY = self.chandraOmegaY(t)
+        omegaZ = self.chandraOmegaZ(t)
         return [omegaX, omegaY, omegaZ]
 
     def acceleration(
             self,
             t
     ):
-        G = 6.67408e-11
-        position = self.position(t)
-        timeObject = self.chandraTimeToTimeScaleObj(t)
-        acceleration = np.zeros(3)
-        for planetName in self.planetList:
-
-            # Get the current position of the planet
-            planetPosition = (
-                utils.spacegeometry.planets[planetName].at(timeObject).position.km
-            )
+        r"""
+        Computes the gravitational acceleration of the spacecraft due to the
+        planets in :attr:`planetList`.
 
-            # Compute the distance between spacecraft and planet, and convert
-            # to meters
-            relativePosition = (planetPosition - position) * 1000.0
-            relativeRange = np.linalg.norm(relativePosition)
+        Args:
+         t (float or numpy.array): Chandra time(s)
 
-            # Compute these ahead of time to save computation
-            rangePowerMinus3 = np.power(relativeRange, -3)
+        Returns:
+         (numpy.array): Acceleration in km/s^2, with shape (3,) for a single time, or (3, times) for an array of times
+        """
+        relativePosition, GM = self.planetRelativePositions(t)
+        relativeRange = np.linalg.norm(relativePosition, axis=-1)
+        acceleration = np.sum(
+            (GM * np.power(relativeRange, -3))[..., np.newaxis] *
+            relativePosition,
+            axis=-2
+        ) / 1000.0
+        return np.transpose(acceleration)
 
-            # Compute the acceleration due to gravity contributed by the
-            # current planet, and add it to the overall acceleration vector
-            acceleration = (
-                acceleration +
-                (G * planetaryMasses[planetName] *
-                 rangePowerMinus3) * relativePosition / 1000.0
-            )
-        return acceleration
+    def gradient(
+            self,
+            t
+    ):
+        r"""
+        Computes the gradient of the gravitational acceleration of the
+        spacecraft with respect to its position (see
+        :func:`~modest.utils.spacegeometry.accelerationGradient`).
 
+        Args:
+         t (float or numpy.array): Chandra time(s)
+
+        Returns:
+         (numpy.array): Acceleration gradient in 1/s^2, with shape (3, 3) for a single time, or (times, 3, 3) for an array of times
+        """
+        relativePosition, GM = self.planetRelativePositions(t)
+        relativeRange = np.linalg.norm(relativePosition, axis=-1)
+        outerProduct = np.einsum(
+            '...pi,...pj->...pij', relativePosition, relativePosition
+        )
+        aGrad = (
+            3 * outerProduct * np.power(relativeRange, -5)[..., np.newaxis, np.newaxis] -
+            np.eye(3) * np.power(relativeRange, -3)[..., np.newaxis, np.newaxis]
+        )
+        return np.sum(GM[:, np.newaxis, np.newaxis] * aGrad, axis=-3)
+
+    def planetRelativePositions(
+            self,
+            t
+    ):
+        r"""
+        Computes the positions of the planets relative to the spacecraft.
+
+        Args:
+         t (float or numpy.array): Chandra time(s)
+
+        Returns:
+         (tuple): The relative positions in meters, with shape (planets, 3) for a single time or (times, planets, 3) for an array of times, and the gravitational parameter of each planet
+        """
+        G = 6.67408e-11
+        position = np.transpose(self.position(t))
+        relativePosition = (
+            self.planetPositions(t) - position[..., np.newaxis, :]
+        ) * 1000.0
+        GM = G * np.array(
+            [planetaryMasses[planetName] for planetName in self.planetList]
+        )
+        return relativePosition, GM
@@ -287,6 +287,21 @@ class SimulatedOrbitalDynamics():
             else:
                 return(eulerAngles)
 
+    def attitudeMatrix(
+            self,
+            t
+    ):
+        # Attitude rotation matrix (equal to attitude(t).rotation_matrix),
+        # or an Nx3x3 stack of rotation matrices for an array of N times.
+        # An empty array of times (e.g. a batch with no photons) gives an
+        # empty stack, without propagating the dynamics.
+        if not np.size(t):
+            return np.zeros([0, 3, 3])
+        self.forwardTimePropagation(np.max(t))
+        return utils.euler2rotationMatrix(
+            [self.attX(t), self.attY(t), self.attZ(t)]
+        )
+
     def initialAttitudeRotationMatrix(
             self
             ):
@@ -364,6 +379,19 @@ class SimulatedDynamics():
             else:
                 return(eulerAngles)
 
+    def attitudeMatrix(
+            self,
+            t
+    ):
+        # Attitude rotation matrix (equal to attitude(t).rotation_matrix),
+        # or an Nx3x3 stack of rotation matrices for an array of N times
+        t = np.asarray(t, dtype=float)
+        return utils.euler2rotationMatrix([
+            (t * self.angularVelocity[0]) + self.initialAttitude[0],
+            (t * self.angularVelocity[1]) + self.initialAttitude[1],
+            (t * self.angularVelocity[2]) + self.initialAttitude[2]
+        ])
+
     def initialAttitudeRotationMatrix(
             self
             ):
@@ -423,10 +451,12 @@ class SimulatedDynamics():
     ):
         def rangeFunction(t):
             return(
-                np.array([
-                    self.orbitAmplitude * np.cos(t/self.orbitPeriod),
-                    self.orbitAmplitude * np.sin(t/self.orbitPeriod),
-                    t * 0 
-                ]).dot(unitVector)
-            )            
+                unitVector.dot(
+                    np.array([
+                        self.orbitAmplitude * np.cos(t/self.orbitPeriod),
+                        self.orbitAmplitude * np.sin(t/self.orbitPeriod),
+                        t * 0
+                    ])
+                )
+            )
         return rangeFunction
@@ -1,10 +1,12 @@
 ## @file __init__.py Initialization file for the modest.substates package.
 from . correlationvector import CorrelationVector
+from . correlationbank import CorrelationBank
 from . attitude import Attitude
 from . substate import SubState
 
 # __all__ = [
 #     "CorrelationVector",
+#     "CorrelationBank",
 #     "Attitude",
 #     "SubState"
 # ]
@@ -0,0 +1,532 @@
+## @file correlationbank.py
+# This package contains the #CorrelationBank class
+
+import numpy as np
+from scipy.linalg import block_diag
+from . import substate
+from . correlationvector import CorrelationVector
+from .. utils import covarianceContainer
+
+## @class CorrelationBank
+# @brief CorrelationBank estimates the correlation vectors of several signals
+# at once, stacked into a single substate
+#
+# @details
+# Running one #CorrelationVector substate per pulsar means that every time
+# update rebuilds K sets of sinc matrices one at a time, and every photon
+# walks K substates.  #CorrelationBank holds all K correlation vectors in a
+# single state vector instead,
+#
+# \f[
+# \mathbf{x} = \begin{bmatrix} \mathbf{h}_1^T & \hdots & \mathbf{h}_K^T \end{bmatrix}^T
+# \f]
+#
+# so the time update matrices of all signals with the same filter order are
+# built in one batched call to CorrelationVector.circulantFLMatrices, and the
+# peak (TDOA) estimates of all signals are computed together after every
+# update.  Each signal keeps its own filter order, bin size and signal object;
+# signals with different filter orders are simply stored back-to-back
+# (ragged storage), and the batched operations are grouped by filter order.
+#
+# The time update and process noise are block diagonal, and a photon
+# associated with signal k only produces a measurement matrix for the slice
+# of signal k, so a photon from one pulsar only updates that pulsar's
+# correlation vector.
+#
+# The per-signal estimator is the same as #CorrelationVector with no internal
+# navigation filter: velocity (if any) comes from the dynamics dict,
+# otherwise #navProcessNoise drives the TDOA uncertainty.
+class CorrelationBank(substate.SubState):
+
+    ## @fun #__init__ initializes a bank of correlation vector estimators
+    #
+    # @param trueSignals A list of signal objects (e.g. PeriodicXRaySource)
+    # for which correlation vectors are estimated.  Each must have
+    # signalID(), unitVec(), signalIntegral() and peakAmplitude.
+    # @param filterOrder The number of taps in each correlation vector.
+    # Either a single value shared by all signals, or a list with one value
+    # per signal.
+    # @param dT The bin size of each correlation vector.  Either a single
+    # value or a list with one value per signal.
+    # @param t (optional) The initial time
+    # @param correlationVectors (optional) List of initial correlation
+    # vectors, one per signal.  Defaults to a flat vector at the peak
+    # amplitude of each signal.
+    # @param signalTDOA (optional) Initial TDOA estimate(s), scalar or list
+    # @param TDOAVar (optional) Initial TDOA variance(s), scalar or list
+    # @param aPriori (optional) Whether the initial estimate is a priori
+    # @param centerPeak (optional) Whether to keep each peak centered once
+    # peak lock has been reached
+    # @param processNoise (optional) Additional process noise added to the
+    # correlation vector taps
+    # @param measurementNoiseScaleFactor (optional) Scale factor applied to
+    # the measurement noise
+    # @param peakLockThreshold (optional) TDOA standard deviation (in bins)
+    # below which a signal is considered locked
+    # @param covarianceStorage (optional) 'covariance' or 'cholesky'
+    # @param navProcessNoise (optional) Process noise used to propagate the
+    # TDOA when no velocity is available
+    # @param velocityNoiseScaleFactor (optional) Scale factor on the
+    # velocity variance received in the dynamics dict
+    # @param storeLastStateVectors (optional) Length of state history to keep
+    def __init__(
+            self,
+            trueSignals,
+            filterOrder,
+            dT,
+            t=0,
+            correlationVectors=None,
+            signalTDOA=0,
+            TDOAVar=0,
+            aPriori=True,
+            centerPeak=True,
+            processNoise=1e-12,
+            measurementNoiseScaleFactor=1,
+            peakLockThreshold=1,
+            covarianceStorage='covariance',
+            navProcessNoise=1,
+            velocityNoiseScaleFactor=1,
+            storeLastStateVectors=0
+    ):
+        self.__trueSignals__ = list(trueSignals)
+        signalCount = len(self.__trueSignals__)
+        if signalCount == 0:
+            raise ValueError('CorrelationBank requires at least one signal')
+
+        ## @brief #__filterOrder__ contains the number of taps for each signal
+        self.__filterOrder__ = self.perSignalArray(filterOrder, signalCount, int)
+
+        ## @brief #__dT__ contains the bin size for each signal
+        self.__dT__ = self.perSignalArray(dT, signalCount, float)
+
+        self.__halfLength__ = np.ceil(self.__filterOrder__ / 2).astype(int)
+
+        self.__unitVecToSignal__ = np.array(
+            [signal.unitVec() for signal in self.__trueSignals__]
+        )
+        self.__peakAmplitude__ = np.array(
+            [signal.peakAmplitude for signal in self.__trueSignals__]
+        )
+
+        # Map signal ID to position in the bank, so the signal associated with
+        # a measurement can be found without searching
+        self.__signalIndex__ = {}
+        for signalIndex, signal in enumerate(self.__trueSignals__):
+            if signal.signalID() in self.__signalIndex__:
+                raise ValueError(
+                    'Signal %s was passed to CorrelationBank more than once'
+                    % signal.name
+                )
+            self.__signalIndex__[signal.signalID()] = signalIndex
+
+        # Slice of the stacked state vector that belongs to each signal
+        stopIndices = np.cumsum(self.__filterOrder__)
+        startIndices = stopIndices - self.__filterOrder__
+        self.__slices__ = [
+            slice(start, stop) for start, stop in zip(startIndices, stopIndices)
+        ]
+
+        # Group signals by filter order so that the time update and peak
+        # estimation can be done in one batch per group.  For each group,
+        # store the member signals and the state vector index of every tap.
+        self.__orderGroups__ = {}
+        for order in np.unique(self.__filterOrder__):
+            members = np.where(self.__filterOrder__ == order)[0]
+            self.__orderGroups__[order] = {
+                'members': members,
+                'stateIndices': startIndices[members][:, np.newaxis] + np.arange(order)
+            }
+
+        self.xAxis = [
+            np.arange(order) * binSize
+            for order, binSize in zip(self.__filterOrder__, self.__dT__)
+        ]
+
+        ## @brief #t The current time
+        self.t = t
+        self.aPriori = aPriori
+
+        if correlationVectors is None:
+            correlationVectors = [
+                np.ones(order) * amplitude * binSize
+                for order, amplitude, binSize in zip(
+                        self.__filterOrder__,
+                        self.__peakAmplitude__,
+                        self.__dT__
+                )
+            ]
+        stateVector = np.concatenate(
+            [np.array(vector, dtype=float) for vector in correlationVectors]
+        )
+        if len(stateVector) != stopIndices[-1]:
+            raise ValueError(
+                'Initial correlation vectors do not match filter orders'
+            )
+
+        # Initial covariance matches the default of CorrelationVector for
+        # each block
+        if covarianceStorage == 'covariance':
+            covarianceBlocks = [
+                np.eye(order) * np.square(amplitude * binSize)
+                for order, amplitude, binSize in zip(
+                        self.__filterOrder__,
+                        self.__peakAmplitude__,
+                        self.__dT__
+                )
+            ]
+        elif covarianceStorage == 'cholesky':
+            covarianceBlocks = [
+                np.eye(order) * amplitude * binSize
+                for order, amplitude, binSize in zip(
+                        self.__filterOrder__,
+                        self.__peakAmplitude__,
+                        self.__dT__
+                )
+            ]
+        else:
+            raise ValueError(
+                'Unrecougnized covariance storage method %s' % covarianceStorage
+            )
+        svCovariance = covarianceContainer(
+            block_diag(*covarianceBlocks),
+            covarianceStorage
+        )
+
+        ## @brief #signalTDOA contains the current TDOA estimate of each signal
+        self.signalTDOA = self.perSignalArray(signalTDOA, signalCount, float)
+
+        ## @brief #TDOAVar contains the variance of each TDOA estimate
+        self.TDOAVar = self.perSignalArray(TDOAVar, signalCount, float)
+
+        self.peakCenteringDT = np.zeros(signalCount)
+        self.peakOffsetFromCenter = np.zeros(signalCount)
+
+        ## @brief #peakLock indicates which signals have reached peak lock
+        self.peakLock = np.zeros(signalCount, dtype=bool)
+
+        self.centerPeak = centerPeak
+        self.processNoise = processNoise
+        self.measurementNoiseScaleFactor = measurementNoiseScaleFactor
+        self.peakLockThreshold = peakLockThreshold
+        self.navProcessNoise = navProcessNoise
+        self.velocityNoiseScaleFactor = velocityNoiseScaleFactor
+
+        self.stateVector = stateVector
+        super().__init__(
+            stateDimension=len(stateVector),
+            stateVectorHistory={
+                't': t,
+                'stateVector': stateVector,
+                'covariance': svCovariance,
+                'aPriori': aPriori,
+                'signalTDOA': np.copy(self.signalTDOA),
+                'TDOAVar': np.copy(self.TDOAVar),
+                'signalIndex': self.__signalIndex__,
+                'stateVectorID': -1
+            },
+            storeLastStateVectors=storeLastStateVectors
+        )
+        return
+
+    ##
+    # @name Mandatory SubState Functions
+    # @{
+
+    ## @fun #storeStateVector stores an updated estimate of the state vector,
+    # and re-estimates the TDOA of every signal in the bank
+    def storeStateVector(
+            self,
+            svDict
+    ):
+        self.t = svDict['t']
+        self.aPriori = svDict['aPriori']
+        self.stateVector = svDict['stateVector']
+
+        tdoaDict = self.estimateSignalTDOA_EK(
+            self.stateVector,
+            svDict['covariance']
+        )
+        newTDOAVar = tdoaDict['varTDOA'] * np.square(self.__dT__)
+
+        if not svDict['aPriori']:
+            newTDOA = tdoaDict['meanTDOA'] * self.__dT__ + self.peakCenteringDT
+            validTDOA = ~np.isnan(newTDOA) & ~np.isnan(newTDOAVar)
+            self.signalTDOA[validTDOA] = newTDOA[validTDOA]
+            self.TDOAVar[validTDOA] = newTDOAVar[validTDOA]
+
+            if self.centerPeak:
+                self.peakOffsetFromCenter = np.where(
+                    self.peakLock,
+                    tdoaDict['meanTDOA'] - self.__halfLength__ + 1,
+                    0
+                )
+            else:
+                self.peakOffsetFromCenter = np.zeros(len(self.__trueSignals__))
+        else:
+            self.TDOAVar = newTDOAVar
+            self.peakOffsetFromCenter = np.zeros(len(self.__trueSignals__))
+
+        svDict['signalTDOA'] = np.copy(self.signalTDOA)
+        svDict['TDOAVar'] = np.copy(self.TDOAVar)
+        svDict['signalIndex'] = self.__signalIndex__
+
+        self.updatePeakLock()
+        super().storeStateVector(svDict)
+        return
+
+    ## @fun #timeUpdate returns the block diagonal time update matrices for
+    # all the correlation vectors in the bank
+    #
+    # @param dT The amount of time elapsed over which the time update occurs
+    # @param dynamics A dictionary containing the dynamics for the time update
+    # (e.g. velocity)
+    def timeUpdate(
+            self,
+            dT,
+            dynamics=None
+    ):
+        indexDiff = dT / self.__dT__
+
+        if dynamics is not None and 'velocity' in dynamics:
+            velocity = dynamics['velocity']['value']
+            vVar = dynamics['velocity']['var'] * self.velocityNoiseScaleFactor
+
+            losVelocity = self.__unitVecToSignal__.dot(velocity)
+            losVelocityVar = np.einsum(
+                'ki,ij,kj->k',
+                self.__unitVecToSignal__,
+                vVar,
+                self.__unitVecToSignal__
+            )
+            peakShift = losVelocity * indexDiff / self.speedOfLight()
+            velocityTDOA = losVelocity * dT / self.speedOfLight()
+            Q = losVelocityVar * np.square(indexDiff / self.speedOfLight())
+            tdoaQ = losVelocityVar * np.square(dT / self.speedOfLight())
+        else:
+            peakShift = np.zeros(len(self.__trueSignals__))
+            velocityTDOA = np.zeros(len(self.__trueSignals__))
+            Q = self.navProcessNoise * np.power(indexDiff, 4)/4
+            tdoaQ = self.navProcessNoise * np.ones(len(self.__trueSignals__)) * np.power(dT, 4)/4
+
+        self.signalTDOA = self.signalTDOA + velocityTDOA
+        self.TDOAVar = self.TDOAVar + tdoaQ
+        self.peakCenteringDT = (
+            self.peakCenteringDT + velocityTDOA +
+            (self.peakOffsetFromCenter * self.__dT__)
+        )
+
+        F = np.zeros([self.__dimension__, self.__dimension__])
+        Qmat = np.zeros([self.__dimension__, self.__dimension__])
+
+        for order, group in self.__orderGroups__.items():
+            members = group['members']
+            FLDict = CorrelationVector.circulantFLMatrices(
+                order,
+                -self.peakOffsetFromCenter[members],
+                peakShift[members],
+                self.stateVector[group['stateIndices']]
+            )
+            for groupIndex, signalIndex in enumerate(members):
+                mySlice = self.__slices__[signalIndex]
+                L = FLDict['L'][groupIndex]
+                F[mySlice, mySlice] = FLDict['F'][groupIndex]
+                Qmat[mySlice, mySlice] = (
+                    np.outer(L, L) * Q[signalIndex] +
+                    np.eye(order) * self.processNoise * dT *
+                    np.square(
+                        self.__peakAmplitude__[signalIndex] *
+                        self.__dT__[signalIndex]
+                    )
+                )
+        return {'F': F, 'Q': Qmat}
+
+    ## @fun #getMeasurementMatrices returns the measurement matrices for a
+    # photon arrival from one of the signals in the bank
+    #
+    # @details The measurement matrix only covers the slice of the signal the
+    # photon is being associated with, so only that signal's correlation
+    # vector is updated.  Measurements from signals not in the bank return
+    # no inferred measurement.
+    def getMeasurementMatrices(
+            self,
+            measurement,
+            source=None
+    ):
+        if (
+                ('t' in measurement) and
+                (source is not None) and
+                (source.signalID() in self.__signalIndex__)
+        ):
+            signalIndex = self.__signalIndex__[source.signalID()]
+            measurementMatrices = self.getTOAMeasurementMatrices(
+                measurement,
+                signalIndex
+            )
+            HDict = {'correlationVector': measurementMatrices['H']}
+            RDict = {'correlationVector': measurementMatrices['R']}
+            dyDict = {'correlationVector': measurementMatrices['dY']}
+        else:
+            HDict = {'': None}
+            RDict = {'': None}
+            dyDict = {'': None}
+
+        measurementMatricesDict = {
+            'H': HDict,
+            'R': RDict,
+            'dY': dyDict
+        }
+        return measurementMatricesDict
+
+    ## @}
+
+    ## @{
+    # @name Functions Specific to #CorrelationBank
+
+    ## @fun #getTOAMeasurementMatrices computes the measurement matrices for
+    # a photon arrival from signal number signalIndex
+    def getTOAMeasurementMatrices(
+            self,
+            measurement,
+            signalIndex
+    ):
+        mySlice = self.__slices__[signalIndex]
+        filterOrder = self.__filterOrder__[signalIndex]
+        binSize = self.__dT__[signalIndex]
+        trueSignal = self.__trueSignals__[signalIndex]
+        corrVec = self.stateVector[mySlice]
+
+        timeVector = (
+            self.xAxis[signalIndex] +
+            measurement['t']['value'] +
+            self.peakCenteringDT[signalIndex]
+        )
+        halfDT = binSize/2.0
+        signalTimeHistory = np.zeros(filterOrder)
+        for timeIndex in range(filterOrder):
+            signalTimeHistory[timeIndex] = trueSignal.signalIntegral(
+                timeVector[timeIndex] - halfDT,
+                timeVector[timeIndex] + halfDT
+            )
+
+        H = np.zeros([filterOrder, self.__dimension__])
+        H[:, mySlice] = np.eye(filterOrder)
+
+        dY = signalTimeHistory - corrVec
+
+        R = (
+            np.eye(filterOrder) *
+            self.__peakAmplitude__[signalIndex] *
+            binSize *
+            np.dot(corrVec, corrVec) *
+            self.measurementNoiseScaleFactor
+        )
+        return {'H': H, 'dY': dY, 'R': R}
+
+    ## @fun #estimateSignalTDOA_EK estimates the peak location of every
+    # correlation vector in the bank
+    #
+    # @details This is the batched version of
+    # CorrelationVector.estimateSignalTDOA_EK.  For each signal, a quadratic
+    # is fit to the maximum tap and its two neighbors, and the variance of
+    # the peak location is computed from the Jacobian of the fit.  All
+    # signals with the same filter order are handled in one vectorized step.
+    #
+    # @param h The stacked state vector
+    # @param P The covariance container of the stacked state vector
+    #
+    # @returns A dict containing arrays of peak locations ("meanTDOA", in
+    # bins) and their variances ("varTDOA", in bins squared)
+    def estimateSignalTDOA_EK(self, h, P):
+        if P.form == 'covariance':
+            P = P.value
+        elif P.form == 'cholesky':
+            P = P.convertCovariance('covariance').value
+
+        meanTDOA = np.zeros(len(self.__trueSignals__))
+        varTDOA = np.zeros(len(self.__trueSignals__))
+        fitOffsets = np.arange(3)
+
+        for order, group in self.__orderGroups__.items():
+            stateIndices = group['stateIndices']
+            hGroup = h[stateIndices]
+
+            lowerBound = np.argmax(hGroup, axis=1) - 1
+            fitIndices = np.mod(lowerBound[:, np.newaxis] + fitOffsets, order)
+
+            slicedC = np.take_along_axis(hGroup, fitIndices, axis=1)
+            fitStateIndices = np.take_along_axis(stateIndices, fitIndices, axis=1)
+            slicedP = P[
+                fitStateIndices[:, :, np.newaxis],
+                fitStateIndices[:, np.newaxis, :]
+            ]
+
+            xVec = lowerBound[np.newaxis, :] + fitOffsets[:, np.newaxis]
+            jacobian = CorrelationVector.peakFinderJacobian(xVec, slicedC.T)
+
+            meanTDOA[group['members']] = CorrelationVector.peakFinder(xVec, slicedC.T)
+            varTDOA[group['members']] = np.einsum(
+                'im,mij,jm->m', jacobian, slicedP, jacobian
+            )
+
+        return {'meanTDOA': meanTDOA, 'varTDOA': varTDOA}
+
+    ## @fun #updatePeakLock updates the peak lock status of each signal based
+    # on its current TDOA standard deviation
+    def updatePeakLock(self):
+        tdoaSTD = np.sqrt(self.TDOAVar)
+        lockThreshold = self.peakLockThreshold * self.__dT__
+
+        newLock = (tdoaSTD < lockThreshold) & ~self.peakLock
+        lostLock = (tdoaSTD > (lockThreshold * 1.1)) & self.peakLock
+
+        for signalIndex in np.where(newLock)[0]:
+            print(
+                'Substate %s reached peak lock at time %s'
+                %(self.__trueSignals__[signalIndex].name, self.t)
+            )
+        for signalIndex in np.where(lostLock)[0]:
+            print(
+                'Substate %s lost peak lock at time %s'
+                %(self.__trueSignals__[signalIndex].name, self.t)
+            )
+        self.peakLock = (self.peakLock | newLock) & ~lostLock
+        self.peakOffsetFromCenter[lostLock] = 0
+        return
+
+    ## @fun #correlationVector returns the current correlation vector of a
+    # signal in the bank
+    #
+    # @param signal Either the signal object, or its index in the bank
+    def correlationVector(self, signal):
+        if not isinstance(signal, (int, np.integer)):
+            signal = self.__signalIndex__[signal.signalID()]
+        return self.stateVector[self.__slices__[signal]]
+
+    ## @fun #tracksSignal returns True if the signal is one of the signals in
+    # the bank
+    #
+    # @details Signal sources use this to find the bank when it is not
+    # registered under the name of their correlation state
+    def tracksSignal(self, signal):
+        return signal.signalID() in self.__signalIndex__
+
+    def speedOfLight(
+            self
+    ):
+        return (299792)
+
+    ## @fun #perSignalArray expands a scalar or list input to one value per
+    # signal
+    @staticmethod
+    def perSignalArray(value, signalCount, dtype):
+        valueArray = np.array(value, dtype=dtype)
+        if valueArray.ndim == 0:
+            valueArray = np.ones(signalCount, dtype=dtype) * valueArray
+        elif len(valueArray) != signalCount:
+            raise ValueError(
+                'Expected a scalar or %i values, received %i'
+                %(signalCount, len(valueArray))
+            )
+        return valueArray
+
+    ## @}
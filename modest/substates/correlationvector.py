@@ -629,7 +629,6 @@ class CorrelationVector(substate.SubState):
         # Initialize empty matricies
         F = np.zeros([filterOrder + self.navVectorLength, filterOrder+self.navVectorLength])
         
-        halfLength = self.__halfLength__
         indexDiff = dT/self.__dT__
         
         peakShift = self.stateVector[self.__filterOrder__] * indexDiff
@@ -667,49 +666,21 @@ class CorrelationVector(substate.SubState):
             
         self.peakCenteringDT = self.peakCenteringDT + (self.peakOffsetFromCenter*self.__dT__)
         
-        # Build arrays of indicies from which to form the sinc function
-
-        if np.mod(filterOrder, 2) == 0:
-            baseVec = (
-                np.linspace(
-                1 - halfLength,
-                    halfLength,
-                    filterOrder
-                )
-            )
+        # Build the circulant sinc matrix and the sinc derivative terms from
+        # the cached index tables, rather than rolling row by row
+        FLDict = self.circulantFLMatrices(filterOrder, FMatrixShift, peakShift, h)
+        currentDiff = FLDict['L']
 
-        else:
-            baseVec = (
-                np.linspace(
-                    1 - halfLength,
-                    halfLength - 1,
-                    filterOrder
+        F[0:filterOrder, 0:filterOrder] = FLDict['F']
+        F[0:filterOrder, filterOrder] = currentDiff * indexDiff
+        if self.navVectorLength > 1:
+            F[0:filterOrder, filterOrder+1] = currentDiff * np.power(indexDiff, 2)/2
+            if self.navVectorLength > 2:
+                F[0:filterOrder, filterOrder+2] = (
+                    currentDiff *
+                    self.stateVector[filterOrder] *
+                    np.power(indexDiff, 3)/6
                 )
-            )
-
-        # Compute the sinc function of the base vector
-        sincBase = np.sinc(baseVec + FMatrixShift)
-        diffBase = np.zeros_like(sincBase)
-
-        for i in range(len(baseVec)):
-            diffBase[i] = self.sincDiff(baseVec[i] + peakShift)
-
-        sincBase = np.roll(sincBase, 1 - int(halfLength))
-        diffBase = np.roll(diffBase, 1 - int(halfLength))
-
-        for i in range(len(sincBase)):
-            currentDiff = np.roll(diffBase, i).dot(h)
-            F[i, 0:filterOrder] = np.roll(sincBase, i)
-            F[i, filterOrder] = currentDiff * indexDiff
-            
-            if self.navVectorLength > 1:
-                F[i, filterOrder+1] = currentDiff * np.power(indexDiff, 2)/2
-                if self.navVectorLength > 2:
-                    F[i, filterOrder+2] = (
-                        currentDiff *
-                        self.stateVector[filterOrder] *
-                        np.power(indexDiff, 3)/6
-                    )
 
         L = np.zeros(filterOrder+self.navVectorLength)
         
@@ -744,18 +715,11 @@ class CorrelationVector(substate.SubState):
             L[filterOrder + 2] = dT
             
         
-        diffBase = np.zeros_like(sincBase)
-
-        for i in range(len(baseVec)):
-            diffBase[i] = self.sincDiff(baseVec[i])
-
-        diffBase = np.roll(diffBase, 1 - int(halfLength))
-        
-        for i in range(len(baseVec)):
-            L[i] = (
-                np.roll(diffBase, i).dot(h) *
-                np.power(indexDiff,self.navVectorLength+1)/factorial(self.navVectorLength+1)
-            )
+        baseVec, indices = self.circulantTables(filterOrder)
+        L[0:filterOrder] = (
+            self.sincDiffArray(baseVec)[indices].dot(h) *
+            np.power(indexDiff,self.navVectorLength+1)/factorial(self.navVectorLength+1)
+        )
         
         # # Setting L to zero for test purposes only
         # L = np.zeros(filterOrder+self.navVectorLength)
@@ -907,44 +871,14 @@ class CorrelationVector(substate.SubState):
             (self.peakOffsetFromCenter*self.__dT__)
         )
 
-        # Initialize empty matricies
-        F = np.zeros([self.__filterOrder__, self.__filterOrder__])
-        L = np.zeros([self.__filterOrder__, self.__filterOrder__])
-
-        # Build arrays of indicies from which to form the sinc function
-
-        if np.mod(self.__filterOrder__, 2) == 0:
-            baseVec = (
-                np.linspace(
-                    1 - self.__halfLength__,
-                    self.__halfLength__,
-                    self.__filterOrder__
-                )
-            )
-
-        else:
-            baseVec = (
-                np.linspace(
-                    1 - self.__halfLength__,
-                    self.__halfLength__ - 1,
-                    self.__filterOrder__
-                )
-            )
-
-        # Compute the sinc function of the base vector
-        sincBase = np.sinc(baseVec + FMatrixShift)
-        diffBase = np.zeros_like(sincBase)
-        
-        for i in range(len(baseVec)):
-            diffBase[i] = self.sincDiff(baseVec[i] + peakShift)
-            
-        sincBase = np.roll(sincBase, 1 - int(self.__halfLength__))
-        diffBase = np.roll(diffBase, 1 - int(self.__halfLength__))
-
-        for i in range(len(F)):
-            F[i] = np.roll(sincBase, i)
-            L[i] = np.roll(diffBase, i)
-        L = L.dot(h)
+        FLDict = self.circulantFLMatrices(
+            self.__filterOrder__,
+            FMatrixShift,
+            peakShift,
+            h
+        )
+        F = FLDict['F']
+        L = FLDict['L']
 
         # else:
         #     # If no velocity was included in dynamics, then do nothing during
@@ -962,47 +896,12 @@ class CorrelationVector(substate.SubState):
         return(timeUpdateDict)
 
     def buildFLMatrices(self, peakShift, h):
-        # Initialize empty matricies
-        F = np.zeros([self.__filterOrder__, self.__filterOrder__])
-        L = np.zeros([self.__filterOrder__, self.__filterOrder__])
-
-        # Build arrays of indicies from which to form the sinc function
-
-        if np.mod(self.__filterOrder__, 2) == 0:
-            baseVec = (
-                np.linspace(
-                    1 - self.__halfLength__,
-                    self.__halfLength__,
-                    self.__filterOrder__
-                )
-            )
-
-        else:
-            baseVec = (
-                np.linspace(
-                    1 - self.__halfLength__,
-                    self.__halfLength__ - 1,
-                    self.__filterOrder__
-                )
-            )
-
-        # Compute the sinc function of the base vector
-        sincBase = np.sinc(baseVec + peakShift)
-        diffBase = np.zeros_like(sincBase)
-
-        for i in range(len(baseVec)):
-            diffBase[i] = self.sincDiff(baseVec[i] + peakShift)
-            
-        sincBase = np.roll(sincBase, 1 - int(self.__halfLength__))
-        diffBase = np.roll(diffBase, 1 - int(self.__halfLength__))
-
-        for i in range(len(F)):
-            F[i] = np.roll(sincBase, i)
-            L[i] = np.roll(diffBase, i)
-
-        L = L.dot(h)
-
-        return {'F':F, 'L':L}
+        return self.circulantFLMatrices(
+            self.__filterOrder__,
+            peakShift,
+            peakShift,
+            h
+        )
 
     ## @}
     
@@ -1282,6 +1181,86 @@ class CorrelationVector(substate.SubState):
             # myDiff
         return myDiff
 
+    ## @fun #sincDiffArray is the array version of #sincDiff
+    #
+    # @details Evaluates #sincDiff elementwise over an array of any shape,
+    # using the same expression and the same treatment of zero.
+    @staticmethod
+    def sincDiffArray(x):
+        x = np.asarray(x, dtype=float)
+        myDiff = np.zeros_like(x)
+        nonZero = np.abs(x) >= 1e-100
+        piX = np.pi*x[nonZero]
+        myDiff[nonZero] = (
+            (piX*np.cos(piX) - np.sin(piX))/(np.pi * np.power(x[nonZero],2))
+        )
+        return myDiff
+
+    __circulantTables__ = {}
+
+    ## @fun #circulantTables returns the (cached) index tables used to build
+    # the circulant time update matrices
+    #
+    # @details The time update matrices are circulant: row i is the base
+    # vector rolled by i taps.  Rather than rolling the base vector once per
+    # row, the matrices are gathered in one step from an index table,
+    # where
+    #
+    # \f[
+    # \textrm{indices}_{i,j} = (j - i) \bmod N
+    # \f]
+    #
+    # so that baseVector[indices] is the same matrix as the row-by-row roll.
+    # The base vector of sinc arguments is returned already rolled by
+    # \f$1 - \textrm{halfLength}\f$.  Both depend only on the filter order,
+    # so they are computed once per filter order and shared by every
+    # correlation filter.
+    #
+    # @param filterOrder The number of taps in the correlation vector
+    #
+    # @returns A tuple containing the rolled base vector and the index table
+    @classmethod
+    def circulantTables(cls, filterOrder):
+        if filterOrder not in cls.__circulantTables__:
+            halfLength = int(np.ceil(filterOrder / 2))
+            if np.mod(filterOrder, 2) == 0:
+                baseVec = np.linspace(1 - halfLength, halfLength, filterOrder)
+            else:
+                baseVec = np.linspace(1 - halfLength, halfLength - 1, filterOrder)
+            baseVec = np.roll(baseVec, 1 - halfLength)
+
+            tapIndex = np.arange(filterOrder)
+            indices = np.mod(tapIndex[np.newaxis, :] - tapIndex[:, np.newaxis], filterOrder)
+            cls.__circulantTables__[filterOrder] = (baseVec, indices)
+        return cls.__circulantTables__[filterOrder]
+
+    ## @fun #circulantFLMatrices builds the sinc-interpolation matrix F and
+    # the shift-derivative vector L for one or more correlation vectors
+    #
+    # @details F is the circulant matrix of
+    # \f$\textrm{sinc}(\textrm{baseVec} + \textrm{FShift})\f$ and L is the
+    # circulant matrix of #sincDiff evaluated at
+    # \f$\textrm{baseVec} + \textrm{LShift}\f$, multiplied by the correlation
+    # vector h.  The shifts may be scalars, or arrays of length M in which
+    # case h is (M x N) and one set of matrices is built for each row.
+    #
+    # @param filterOrder The number of taps in the correlation vector(s)
+    # @param FShift Shift (in taps) applied in the sinc function of F
+    # @param LShift Shift (in taps) applied in the sinc derivative of L
+    # @param h The correlation vector(s)
+    #
+    # @returns A dict containing F, (N x N) or (M x N x N), and L, (N) or (M x N)
+    @classmethod
+    def circulantFLMatrices(cls, filterOrder, FShift, LShift, h):
+        baseVec, indices = cls.circulantTables(filterOrder)
+        FShift = np.asarray(FShift, dtype=float)[..., np.newaxis]
+        LShift = np.asarray(LShift, dtype=float)[..., np.newaxis]
+
+        F = np.sinc(baseVec + FShift)[..., indices]
+        LMatrix = cls.sincDiffArray(baseVec + LShift)[..., indices]
+        L = np.einsum('...ij,...j->...i', LMatrix, h)
+        return {'F': F, 'L': L}
+
 
     @staticmethod
     def quadraticFit(x, y):
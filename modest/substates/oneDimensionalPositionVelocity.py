@@ -151,3 +151,393 @@ class oneDPositionVelocity(substate.SubState):
             dyDict['artificialBiasMeas'] = -self.stateVector[2]
         return {'H': HDict, 'R': RDict, 'dY': dyDict}
 
+
+
+class oneDPositionVelocityFilter():
+    r"""
+    oneDPositionVelocityFilter is a lightweight, fixed-size replacement for a
+    :class:`~modest.modularfilter.ModularFilter` that contains a single
+    :class:`oneDPositionVelocity` substate.
+
+    The external internal navigation filter (INF) of
+    :class:`~modest.substates.correlationvector.CorrelationVector` is a
+    ModularFilter holding one 2-state (position, velocity) or 3-state
+    (position, velocity, bias) substate, and it is time and measurement
+    updated once per photon.  For a problem this small, nearly all of the
+    cost is in the general-purpose machinery of ModularFilter (assembling
+    dicts of measurement matrices, covariance containers, measurement ID
+    bookkeeping) rather than in the filter equations themselves.
+
+    This class performs the same EKF directly on the fixed-size state, with
+    the matrix products written out in closed form:
+
+    - The time update propagates the covariance element by element through
+      the (upper triangular) state transition matrix of
+      :class:`oneDPositionVelocity`.
+    - Each measurement ("position", "velocity", and the artificial bias
+      measurement, which is applied on every measurement update even when
+      the measurement dict is empty) is a scalar with a row of ones and
+      zeros as its measurement matrix.  Since the measurement noise is
+      uncorrelated, the measurements are processed one at a time, with the
+      scalar gain :math:`K = P h / (h^T P h + R)` and the covariance update
+      :math:`P^+ = P - (P h)(P h)^T / (h^T P h + R)`.
+
+    For 2x2 and 3x3 matrices, the per-call overhead of numpy outweighs the
+    arithmetic, so the state and covariance are held as Python floats during
+    the updates.  This is mathematically the same update as
+    :meth:`~modest.modularfilter.ModularFilter.computeUpdatedStateandCovariance`,
+    so the estimates agree with the nested ModularFilter to within rounding
+    error (though not bit for bit).
+
+    The state history is kept in preallocated ring arrays of length
+    storeLastStateVectors (or :attr:`defaultHistoryLength`), so the memory
+    used does not grow with the number of photons processed.
+
+    The object exposes the parts of the ModularFilter and
+    :class:`oneDPositionVelocity` interfaces that are used by
+    CorrelationVector: :meth:`timeUpdateEKF`, :meth:`measurementUpdateEKF`,
+    and ``subStates[objectID]['stateObject']``, which refers back to this
+    object and provides :attr:`currentPosition`, :attr:`currentVelocity`,
+    :attr:`positionVar`, :attr:`velocityVar` and :attr:`stateVectorHistory`.
+
+    Only the "covariance" storage form is supported.
+
+    Args:
+     objectID (str): Name of the one-dimensional object; used to build the dynamics key (objectID + "acceleration")
+     stateVectorHistory (dict): Initial state, in the same format as :class:`oneDPositionVelocity`
+     biasState (bool): Whether a bias state is included
+     artificialBiasMeas (bool): Whether the artificial zero-bias measurement is applied at each measurement update
+     biasStateTimeConstant (float): Time constant of the bias state
+     biasStateProcessNoiseVar (float): Process noise variance of the bias state
+     biasMeasVar (float): Variance of the artificial bias measurement
+     storeLastStateVectors (int): Length of state history to keep (zero keeps the last :attr:`defaultHistoryLength` states)
+     time (float): Starting time of the filter
+    """
+
+    defaultHistoryLength = 1000
+    """
+    (int) Length of the state history ring arrays if storeLastStateVectors is zero
+    """
+
+    def __init__(
+            self,
+            objectID,
+            stateVectorHistory,
+            biasState=True,
+            artificialBiasMeas=True,
+            biasStateTimeConstant=0.9,
+            biasStateProcessNoiseVar=1e-3,
+            biasMeasVar=1,
+            storeLastStateVectors=0,
+            time=0
+    ):
+        covariance = stateVectorHistory['covariance']
+        if not isinstance(covariance, covarianceContainer):
+            covariance = covarianceContainer(covariance, 'covariance')
+        if covariance.form != 'covariance':
+            raise ValueError(
+                'oneDPositionVelocityFilter only supports covariance storage'
+            )
+        stateVectorHistory['covariance'] = covariance
+
+        self.objectID = objectID
+        self.biasState = biasState
+        if biasState:
+            self.totalDimension = 3
+        else:
+            self.totalDimension = 2
+        if len(stateVectorHistory['stateVector']) != self.totalDimension:
+            raise ValueError(
+                "\"stateVector\" in stateVectorHistory must be of same length as state dimension"
+            )
+
+        self.artificialBiasMeas = artificialBiasMeas
+        self.biasStateProcessNoiseVar = biasStateProcessNoiseVar
+        self.biasStateTimeConstant = biasStateTimeConstant
+        self.artificialBiasMeasVar = biasMeasVar
+        self.storeLastStateVectors = storeLastStateVectors
+
+        ## @brief State vector and covariance, held as Python floats
+        self.__x__ = [float(x) for x in stateVectorHistory['stateVector']]
+        self.__P__ = [
+            [float(p) for p in PRow] for PRow in covariance.value
+        ]
+
+        self.positionVar = covariance.value[0, 0]
+        self.velocityVar = covariance.value[1, 1]
+        stateVectorHistory['positionStd'] = np.sqrt(self.positionVar)
+        stateVectorHistory['velocityStd'] = np.sqrt(self.velocityVar)
+        self.currentPosition = 0
+        self.currentVelocity = 0
+        self.currentBiasState = 0
+
+        # Measurement matrix rows, as lists of the state indices with a one
+        if biasState:
+            self.__measurementIndices__ = {'position': [0, 2], 'velocity': [1]}
+        else:
+            self.__measurementIndices__ = {'position': [0], 'velocity': [1]}
+
+        ## @brief Ring arrays holding the state history
+        if storeLastStateVectors > 0:
+            historyLength = storeLastStateVectors
+        else:
+            historyLength = self.defaultHistoryLength
+        self.__historyT__ = np.zeros(historyLength)
+        self.__historyStateVector__ = np.zeros([historyLength, self.totalDimension])
+        self.__historyCovariance__ = np.zeros(
+            [historyLength, self.totalDimension, self.totalDimension]
+        )
+        self.__historyAPriori__ = np.zeros(historyLength, dtype=bool)
+
+        self.tCurrent = time
+        self.lastStateVectorID = 0
+        self.__initialStateVector__ = stateVectorHistory
+        self.subStates = {
+            objectID: {
+                'index': slice(0, self.totalDimension),
+                'length': self.totalDimension,
+                'stateObject': self
+            }
+        }
+        return
+
+    def timeUpdateEKF(
+            self,
+            dT,
+            dynamics={}
+    ):
+        r"""
+        timeUpdateEKF performs the EKF time update over time interval dT.
+
+        Args:
+         dT (float): The amount of time over which the time-update is occuring
+         dynamics (dict): May contain the one-dimensional acceleration, keyed by objectID + "acceleration"
+
+        Returns:
+         numpy.array, numpy.array: The time-updated state vector and covariance
+        """
+        accelKey = self.objectID + 'acceleration'
+        if dynamics is not None and accelKey in dynamics:
+            acceleration = dynamics[accelKey]['value']
+            accVar = dynamics[accelKey]['var']
+        else:
+            acceleration = 0
+            accVar = 0
+
+        dT2 = dT * dT
+        x = self.__x__
+        P = self.__P__
+
+        # F P F^T + Q for F = [[1, dT], [0, 1]] in the position/velocity
+        # block, with Q = accVar [[dT^4/4, dT^3/2], [dT^3/2, dT^2]]
+        p01 = P[0][1] + dT * P[1][1]
+        p00 = P[0][0] + dT * (P[0][1] + p01) + accVar * dT2 * dT2 / 4
+        p01 = p01 + accVar * dT2 * dT / 2
+        p11 = P[1][1] + accVar * dT2
+
+        # The propagated state includes the acceleration term, but (as in
+        # oneDPositionVelocity) the reported position and velocity are those
+        # of the filter's F x
+        position = x[0] + dT * x[1]
+        velocity = x[1]
+
+        if self.biasState:
+            # The bias state decays by a factor of exp(-dT/tau)
+            decay = np.exp(-dT/self.biasStateTimeConstant)
+            p02 = decay * (P[0][2] + dT * P[1][2])
+            p12 = decay * P[1][2]
+            p22 = decay * decay * P[2][2] + self.biasStateProcessNoiseVar * dT2
+            self.__x__ = [position, velocity + acceleration * dT, decay * x[2]]
+            self.__P__ = [[p00, p01, p02], [p01, p11, p12], [p02, p12, p22]]
+        else:
+            self.__x__ = [position, velocity + acceleration * dT]
+            self.__P__ = [[p00, p01], [p01, p11]]
+
+        self.tCurrent = self.tCurrent + dT
+        self.storeStateVector(position, velocity, aPriori=True)
+        return (self.stateVector, self.covarianceMatrix)
+
+    def measurementUpdateEKF(
+            self,
+            measurement,
+            sourceName=''
+    ):
+        r"""
+        measurementUpdateEKF performs the EKF measurement update.
+
+        The measurement may contain "position" and/or "velocity".  If the
+        bias state and the artificial bias measurement are in use, the
+        artificial bias measurement is always applied, so an empty
+        measurement dict still updates the bias state.
+
+        Args:
+         measurement (dict): Dictionary containing the measured quantities
+         sourceName (str): Name of the signal source.  Not used; included for compatibility with ModularFilter.
+
+        Returns:
+         numpy.array, covarianceContainer: The measurement-updated state vector and covariance
+        """
+        for key in ['position', 'velocity']:
+            if key in measurement:
+                self.scalarMeasurementUpdate(
+                    self.__measurementIndices__[key],
+                    measurement[key]['value'],
+                    measurement[key]['var']
+                )
+        if self.biasState and self.artificialBiasMeas:
+            self.scalarMeasurementUpdate([2], 0, self.artificialBiasMeasVar)
+
+        if any([x != x for x in self.__x__]):
+            raise ValueError('Computed a NaN updated state vector')
+
+        self.storeStateVector(self.__x__[0], self.__x__[1], aPriori=False)
+        return (self.stateVector, self.covariance())
+
+    def scalarMeasurementUpdate(
+            self,
+            measurementIndices,
+            value,
+            var
+    ):
+        r"""
+        scalarMeasurementUpdate applies a scalar measurement to the state
+        vector and covariance.
+
+        The measurement matrix :math:`h` is a row with ones at
+        measurementIndices and zeros elsewhere, so :math:`P h` is a sum of
+        columns of :math:`P`.  The gain is :math:`K = P h / s` with
+        :math:`s = h^T P h + R`, and the updated covariance is
+        :math:`P - (P h)(P h)^T / s`, whose elements are computed once for
+        the upper triangle so that it stays exactly symmetric.
+
+        Args:
+         measurementIndices (list): State indices summed by the measurement
+         value (float): Measured value
+         var (float): Measurement variance
+        """
+        x = self.__x__
+        P = self.__P__
+        dimension = self.totalDimension
+
+        PH = [
+            sum([P[row][index] for index in measurementIndices])
+            for row in range(dimension)
+        ]
+        innovationVar = sum([PH[index] for index in measurementIndices]) + var
+        innovation = value - sum([x[index] for index in measurementIndices])
+
+        self.__x__ = [
+            x[row] + PH[row] * innovation / innovationVar
+            for row in range(dimension)
+        ]
+        PPlus = [[0.0] * dimension for row in range(dimension)]
+        for row in range(dimension):
+            for column in range(row, dimension):
+                PPlus[row][column] = PPlus[column][row] = (
+                    P[row][column] - PH[row] * PH[column] / innovationVar
+                )
+        self.__P__ = PPlus
+        return
+
+    def storeStateVector(self, position, velocity, aPriori):
+        r"""
+        storeStateVector updates the current position, velocity and bias
+        estimates and writes the state into the next slot of the history ring
+        arrays.
+        """
+        self.currentPosition = position
+        self.positionVar = self.__P__[0][0]
+        self.currentVelocity = velocity
+        self.velocityVar = self.__P__[1][1]
+        if self.biasState:
+            self.currentBiasState = self.__x__[2]
+
+        historyIndex = self.lastStateVectorID % len(self.__historyT__)
+        self.__historyT__[historyIndex] = self.tCurrent
+        self.__historyStateVector__[historyIndex] = self.__x__
+        self.__historyCovariance__[historyIndex] = self.__P__
+        self.__historyAPriori__[historyIndex] = aPriori
+        self.lastStateVectorID = self.lastStateVectorID + 1
+        return
+
+    def historyDict(self, stateVectorID):
+        r"""
+        historyDict returns a stored state from the history ring arrays, as a
+        dict in the same format as :class:`oneDPositionVelocity`.
+
+        Args:
+         stateVectorID (int): ID of the state (one for the first update); must be one of the last len(timeList) IDs
+
+        Returns:
+         dict: The stored state
+        """
+        historyIndex = (stateVectorID - 1) % len(self.__historyT__)
+        stateVector = np.copy(self.__historyStateVector__[historyIndex])
+        covariance = np.copy(self.__historyCovariance__[historyIndex])
+        svDict = {
+            'stateVector': stateVector,
+            'covariance': covarianceContainer(covariance, 'covariance'),
+            't': self.__historyT__[historyIndex],
+            'aPriori': bool(self.__historyAPriori__[historyIndex]),
+            'stateVectorID': stateVectorID,
+            'position': stateVector[0],
+            'velocity': stateVector[1],
+            'positionStd': np.sqrt(covariance[0, 0]),
+            'velocityStd': np.sqrt(covariance[1, 1])
+        }
+        if self.biasState:
+            svDict['biasState'] = stateVector[2]
+        else:
+            svDict['biasState'] = 0
+        return svDict
+
+    @property
+    def stateVectorHistory(self):
+        r"""
+        (list) The stored state history, oldest first, as a list of dicts in
+        the same format as :class:`oneDPositionVelocity`.  Before any update,
+        this is the initial state.
+        """
+        if self.lastStateVectorID == 0:
+            return [self.__initialStateVector__]
+        nStored = min(self.lastStateVectorID, len(self.__historyT__))
+        return [
+            self.historyDict(stateVectorID)
+            for stateVectorID in range(
+                self.lastStateVectorID - nStored + 1, self.lastStateVectorID + 1
+            )
+        ]
+
+    @property
+    def timeList(self):
+        r"""
+        (numpy.array) Times of the stored states, oldest first
+        """
+        historyLength = len(self.__historyT__)
+        nStored = min(self.lastStateVectorID, historyLength)
+        return self.__historyT__[
+            np.arange(self.lastStateVectorID - nStored, self.lastStateVectorID) %
+            historyLength
+        ]
+
+    def getStateVector(self):
+        if self.lastStateVectorID == 0:
+            return self.__initialStateVector__
+        return self.historyDict(self.lastStateVectorID)
+
+    @property
+    def stateVector(self):
+        r"""
+        (numpy.array) The current state vector
+        """
+        return np.array(self.__x__)
+
+    @property
+    def covarianceMatrix(self):
+        r"""
+        (numpy.array) The current covariance matrix
+        """
+        return np.array(self.__P__)
+
+    def covariance(self):
+        return covarianceContainer(self.covarianceMatrix, 'covariance')
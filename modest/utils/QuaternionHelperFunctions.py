@@ -22,6 +22,34 @@ def euler2quaternion(eulerAngles):
     return Quaternion([w,x,y,z])
 
 
+def euler2rotationMatrix(eulerAngles):
+    # Rotation matrix of the quaternion given by euler2quaternion, computed
+    # directly so that the euler angles may be arrays.  For arrays of N angles,
+    # an Nx3x3 stack of rotation matrices is returned.
+    roll = _np.asarray(eulerAngles[0], dtype=float)
+    pitch = _np.asarray(eulerAngles[1], dtype=float)
+    yaw = _np.asarray(eulerAngles[2], dtype=float)
+
+    cy = _np.cos(yaw * 0.5)
+    sy = _np.sin(yaw * 0.5)
+    cr = _np.cos(roll * 0.5)
+    sr = _np.sin(roll * 0.5)
+    cp = _np.cos(pitch * 0.5)
+    sp = _np.sin(pitch * 0.5)
+
+    w = cy * cr * cp + sy * sr * sp
+    x = cy * sr * cp - sy * cr * sp
+    y = cy * cr * sp + sy * sr * cp
+    z = sy * cr * cp - cy * sr * sp
+
+    rotationMatrix = _np.array([
+        [1 - 2*(y*y + z*z), 2*(x*y - w*z), 2*(x*z + w*y)],
+        [2*(x*y + w*z), 1 - 2*(x*x + z*z), 2*(y*z - w*x)],
+        [2*(x*z - w*y), 2*(y*z + w*x), 1 - 2*(x*x + y*y)]
+    ])
+    return _np.moveaxis(rotationMatrix, [0, 1], [-2, -1])
+
+
 def quaternion2euler(q):
     if isinstance(q,Quaternion):
         q = q.q
@@ -4,21 +4,31 @@
 
 from collections import namedtuple
 
-from . QuaternionHelperFunctions import euler2quaternion, quaternion2euler, eulerAngleDiff
+from . QuaternionHelperFunctions import euler2quaternion, quaternion2euler, eulerAngleDiff, euler2rotationMatrix
 from . accessPSC import chandraPSC_coneSearch, xamin_coneSearch
 # from . buildtraj import buildEnvironment, addParameterGroup, buildPulsarCorrelationSubstate
 # from . import buildtraj
-from . loadPulsarData import loadPulsarData
+from . loadPulsarData import loadPulsarData, PulsarDataCache
 from . covarianceUtils import covarianceContainer
 from . import mleTDOAEstimation
+from . import pulsarAcquisition
+from . import epochFolding
+from . photonBatch import PhotonBatch, mergePhotonBatches, mergePhotonStreams
 __all__ = [
     "euler2quaternion",
     "quaternion2euler",
     "eulerAngleDiff",
+    "euler2rotationMatrix",
     "accessPSC",
     "loadPulsarData",
+    "PulsarDataCache",
     "covarianceContainer",
-    "mleTDOAestimation"    
+    "mleTDOAestimation",
+    "pulsarAcquisition",
+    "epochFolding",
+    "PhotonBatch",
+    "mergePhotonBatches",
+    "mergePhotonStreams"
 ]
 
 
@@ -0,0 +1,167 @@
+## @file epochFolding.py
+# @brief Epoch folding of photon arrival times into pulse profiles.
+#
+# @details The functions in this file fold large sets of photon arrival times
+# with the phase model of a
+# @ref modest.signals.periodicxraysource.PeriodicXRaySource "PeriodicXRaySource"
+# into a histogram of pulse phase.  The resulting profile can be saved in a
+# format which can be loaded by
+# @ref modest.signals.periodicxraysource.PeriodicXRaySource.processProfile "processProfile".
+import numpy as np
+import multiprocessing as mp
+
+from . pulsarAcquisition import photonArrivalTimes
+from . photonBatch import PhotonBatch
+
+
+def foldProfile(
+        photons,
+        pulsarObject,
+        nBins=64,
+        weights=None,
+        energies=None,
+        energyRange=None,
+        rangeFunction=None,
+        chunkSize=1000000,
+        processes=1
+):
+    r"""
+    Folds photon arrival times into a histogram of pulse phase.
+
+    The phase of each photon is computed with the pulsar's phase model
+    (see :meth:`~modest.signals.periodicxraysource.PeriodicXRaySource.getPhaseCycles`),
+    and the photons are counted in nBins phase bins with ``np.bincount``.
+
+    If a range function is given, the arrival times are corrected to the
+    solar system barycenter before folding, i.e. photon k is folded at time
+    :math:`t_k + r(t_k)/c`, where :math:`r(t)` is the range of the detector
+    along the line of sight to the pulsar (as returned by e.g.
+    :meth:`~modest.spacecraft.simulation.SimulatedDynamics.getRangeFunction`).
+
+    The photons may be weighted, and may be selected by energy.  The photons
+    are processed in chunks, which may be spread across a pool of processes,
+    and the histograms of the chunks are summed.
+
+    Args:
+     photons: Photon arrival times, list of photon measurement dicts, or :class:`~modest.utils.photonBatch.PhotonBatch`
+     pulsarObject (PeriodicXRaySource): Pulsar whose phase model is used for folding
+     nBins (int): Number of phase bins
+     weights (numpy.array): Weight of each photon (optional)
+     energies (numpy.array): Energy of each photon, used with energyRange.  Taken from the batch if photons is a PhotonBatch.
+     energyRange (list): Lower and upper energy of the photons to include (optional)
+     rangeFunction (function): Range of the detector along the line of sight to the pulsar as a function of time (optional)
+     chunkSize (int): Number of photons folded at once
+     processes (int): Number of processes over which the chunks are split
+
+    Returns:
+     (dict): Dictionary containing "counts" (the weighted number of photons in each bin), "binEdges" (the phase at the edges of the bins), "profile" (the counts normalized by the mean count) and "nPhotons" (the number of photons folded)
+    """
+    if isinstance(photons, PhotonBatch):
+        if energies is None and energyRange is not None:
+            energies = photons.energy
+        arrivalTimes = photons.t
+    else:
+        arrivalTimes = photonArrivalTimes(photons)
+
+    photonMask = np.ones(len(arrivalTimes), dtype=bool)
+    if energyRange is not None:
+        if energies is None:
+            raise ValueError(
+                'Photon energies are required to select photons by energy.'
+            )
+        energies = np.asarray(energies)
+        photonMask = (energies >= energyRange[0]) & (energies <= energyRange[1])
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[photonMask]
+    arrivalTimes = arrivalTimes[photonMask]
+
+    # The range correction is applied here rather than by the workers, since
+    # range functions are generally closures, which can't be sent to other
+    # processes
+    if rangeFunction is not None:
+        arrivalTimes = (
+            arrivalTimes +
+            rangeFunction(arrivalTimes) / pulsarObject.speedOfLight()
+        )
+
+    chunkArguments = [
+        (
+            arrivalTimes[chunkStart:chunkStart + chunkSize],
+            None if weights is None else weights[chunkStart:chunkStart + chunkSize],
+            pulsarObject,
+            nBins
+        )
+        for chunkStart in range(0, len(arrivalTimes), chunkSize)
+    ]
+
+    if processes > 1 and len(chunkArguments) > 1:
+        myPool = mp.Pool(np.min([processes, len(chunkArguments)]))
+        chunkCounts = myPool.map(foldChunk, chunkArguments)
+        myPool.close()
+        myPool.join()
+    else:
+        chunkCounts = [foldChunk(arguments) for arguments in chunkArguments]
+
+    counts = np.zeros(nBins)
+    for chunkCount in chunkCounts:
+        counts = counts + chunkCount
+
+    meanCount = np.mean(counts)
+    if meanCount > 0:
+        profile = counts / meanCount
+    else:
+        profile = counts
+
+    return {
+        'counts': counts,
+        'binEdges': np.linspace(0, 1, nBins + 1),
+        'profile': profile,
+        'nPhotons': len(arrivalTimes)
+    }
+
+
+def foldChunk(chunkArguments):
+    r"""
+    Folds one chunk of photons into a histogram of pulse phase.
+
+    This is the unit of work of :func:`foldProfile`, and takes a single tuple
+    of arguments so that it can be used with
+    :meth:`multiprocessing.Pool.map`.
+
+    Args:
+     chunkArguments (tuple): (arrivalTimes, weights, pulsarObject, nBins)
+
+    Returns:
+     (numpy.array): Weighted number of photons in each phase bin
+    """
+    arrivalTimes, weights, pulsarObject, nBins = chunkArguments
+    phase = pulsarObject.getPhaseCycles(arrivalTimes)[1]
+    binIndex = np.minimum((phase * nBins).astype(int), nBins - 1)
+    return np.bincount(binIndex, weights=weights, minlength=nBins).astype(float)
+
+
+def saveProfile(
+        fileName,
+        foldResult
+):
+    r"""
+    Saves a folded profile as a text file.
+
+    The file has two columns: the phase at the center of each bin, and the
+    number of counts in the bin.  It can be passed directly as the profile
+    of a PeriodicXRaySource (which uses the last column of the file by
+    default, see
+    :meth:`~modest.signals.periodicxraysource.PeriodicXRaySource.processProfile`).
+
+    Args:
+     fileName (str): Path of the file to write
+     foldResult (dict): Folded profile, as returned by :func:`foldProfile`
+    """
+    binEdges = foldResult['binEdges']
+    binCenters = (binEdges[:-1] + binEdges[1:]) / 2
+    np.savetxt(
+        fileName,
+        np.column_stack([binCenters, foldResult['counts']]),
+        header='Folded profile of %i photons\nphase counts' % foldResult['nPhotons']
+    )
+    return
@@ -3,6 +3,10 @@ from .. import signals
 import numpy as np
 import os
 import sys
+import pickle
+import hashlib
+import fnmatch
+from collections.abc import Mapping
 
 
 def loadPulsarData(
@@ -13,17 +17,54 @@ def loadPulsarData(
         PARDir='PAR_files/',
         profileDir='profiles/',
         observatoryMJDREF=None,
-        energyRange=None #Should be in KEV for now
+        energyRange=None, #Should be in KEV for now
+        useCache=False,
+        cacheDirectory=None
 ):
+    r"""
+    Load the pulsars in a pulsar catalog as PeriodicXRaySource objects.
+
+    If useCache is True, the pulsars are returned in a
+    :class:`PulsarDataCache`, which builds each pulsar only when it is first
+    requested, and stores the parsed catalog and the built pulsars in
+    cacheDirectory so that later runs can skip reading the catalog, PAR files
+    and profiles.
+
+    Args:
+     detectorArea (float): Detector area used to scale the pulsar flux
+     loadPulsarNames (list): Names of the pulsars to load.  If None, all pulsars in the catalog are loaded.
+     pulsarDir (str): Directory containing the catalog, PAR files and profiles
+     pulsarCatalogFileName (str): Name of the catalog file
+     PARDir (str): Directory of the PAR files, relative to pulsarDir
+     profileDir (str): Directory of the profiles, relative to pulsarDir
+     observatoryMJDREF (float): Reference MJD of the observatory clock
+     energyRange (list): Energy range of the detector in KEV, used to convert energy flux to photon flux
+     useCache (bool): Determines whether the pulsars are loaded lazily through the cache
+     cacheDirectory (str): Directory of the cache.  Defaults to a directory for this catalog in the user cache directory (see :func:`defaultPulsarCacheDirectory`)
+
+    Returns:
+     (dict): Dictionary of PeriodicXRaySource objects, keyed by pulsar name
+    """
     if pulsarDir is None:
         pulsarDir = os.path.abspath(os.path.join(os.path.dirname(__file__), '.')) + '/'
-    if energyRange is None:
-        electronVoltPerPhoton = 6e3  # Electron-Volt x 10^3
-    else:
-        electronVoltPerPhoton = 1e3 * (energyRange[1] + energyRange[0])/2
-    electronVoltPerErg = 6.242e11
-    ergsPerElectronVolt = 1 / electronVoltPerErg
-    
+
+    if useCache:
+        if cacheDirectory is None:
+            cacheDirectory = defaultPulsarCacheDirectory(
+                pulsarDir + pulsarCatalogFileName
+            )
+        return PulsarDataCache(
+            cacheDirectory,
+            detectorArea=detectorArea,
+            loadPulsarNames=loadPulsarNames,
+            pulsarDir=pulsarDir,
+            pulsarCatalogFileName=pulsarCatalogFileName,
+            PARDir=PARDir,
+            profileDir=profileDir,
+            observatoryMJDREF=observatoryMJDREF,
+            energyRange=energyRange
+        )
+
     pulsarCatalog = pd.read_excel(pulsarDir + pulsarCatalogFileName)
 
     pulsarDict = {}
@@ -33,38 +74,332 @@ def loadPulsarData(
         pulsarName = pulsarRow['Name']
 
         if (loadPulsarNames is None) or (pulsarName in loadPulsarNames):
-            if not np.isnan(pulsarRow['Flux (erg/cm^2/s)']):
-                photonFlux = (
-                    pulsarRow['Flux (erg/cm^2/s)'] *
-                    electronVoltPerErg / electronVoltPerPhoton
-                ) 
-            else:
-                photonFlux = None
-                
-            if np.isnan(pulsarRow['useColumn']):
-                useColumn=None
-            else:
-                useColumn = pulsarRow['useColumn']
-
-            if not np.isnan(pulsarRow['Pulsed fraction']):
-                pulsedFraction = pulsarRow['Pulsed fraction']/100
-            else:
-                pulsedFraction = None
-            # print("Template string:")
-            # print(pulsarRow['Template'])
-            if isinstance(pulsarRow['Template'], str) or not np.isnan(pulsarRow['Template']):
-                template = pulsarDir + profileDir + pulsarRow['Template']
-            else:
-                template=None
-            
             pulsarDict[pulsarName] = signals.PeriodicXRaySource(
-                profile=template,
-                PARFile=pulsarDir + PARDir + pulsarRow['PARFile'],
-                avgPhotonFlux=photonFlux,
-                pulsedFraction=pulsedFraction,
-                name=pulsarName,
-                useProfileColumn=useColumn,
-                observatoryMJDREF=observatoryMJDREF,
-                detectorArea=detectorArea
+                **pulsarArguments(
+                    pulsarRow,
+                    detectorArea=detectorArea,
+                    pulsarDir=pulsarDir,
+                    PARDir=PARDir,
+                    profileDir=profileDir,
+                    observatoryMJDREF=observatoryMJDREF,
+                    energyRange=energyRange
+                )
             )
     return pulsarDict
+
+
+def defaultPulsarCacheDirectory(catalogFile):
+    r"""
+    Default cache directory of a pulsar catalog.
+
+    The cache is kept in the user cache directory ($XDG_CACHE_HOME, or
+    ~/.cache), rather than next to the catalog, which may be in the
+    (read-only or shared) package directory.  Each catalog gets its own
+    subdirectory, named from a hash of its path.
+
+    Args:
+     catalogFile (str): Path of the catalog file
+
+    Returns:
+     (str): The cache directory
+    """
+    userCacheDirectory = os.environ.get('XDG_CACHE_HOME')
+    if not userCacheDirectory:
+        userCacheDirectory = os.path.join(os.path.expanduser('~'), '.cache')
+    catalogFile = os.path.abspath(catalogFile)
+    return os.path.join(
+        userCacheDirectory,
+        'modest',
+        '%s-%s' % (
+            os.path.splitext(os.path.basename(catalogFile))[0],
+            hashlib.sha1(catalogFile.encode()).hexdigest()[0:12]
+        )
+    )
+
+
+def pulsarArguments(
+        pulsarRow,
+        detectorArea=1,
+        pulsarDir='',
+        PARDir='PAR_files/',
+        profileDir='profiles/',
+        observatoryMJDREF=None,
+        energyRange=None
+):
+    r"""
+    Build the PeriodicXRaySource arguments for one row of the pulsar catalog.
+
+    Args:
+     pulsarRow: Row of the pulsar catalog (a pandas Series or a dict)
+     See :func:`loadPulsarData` for the other arguments
+
+    Returns:
+     (dict): Keyword arguments for :class:`~modest.signals.periodicxraysource.PeriodicXRaySource`
+    """
+    if energyRange is None:
+        electronVoltPerPhoton = 6e3  # Electron-Volt x 10^3
+    else:
+        electronVoltPerPhoton = 1e3 * (energyRange[1] + energyRange[0])/2
+    electronVoltPerErg = 6.242e11
+    ergsPerElectronVolt = 1 / electronVoltPerErg
+
+    if not np.isnan(pulsarRow['Flux (erg/cm^2/s)']):
+        photonFlux = (
+            pulsarRow['Flux (erg/cm^2/s)'] *
+            electronVoltPerErg / electronVoltPerPhoton
+        )
+    else:
+        photonFlux = None
+
+    if np.isnan(pulsarRow['useColumn']):
+        useColumn=None
+    else:
+        useColumn = pulsarRow['useColumn']
+
+    if not np.isnan(pulsarRow['Pulsed fraction']):
+        pulsedFraction = pulsarRow['Pulsed fraction']/100
+    else:
+        pulsedFraction = None
+    # print("Template string:")
+    # print(pulsarRow['Template'])
+    if isinstance(pulsarRow['Template'], str) or not np.isnan(pulsarRow['Template']):
+        template = pulsarDir + profileDir + pulsarRow['Template']
+    else:
+        template=None
+
+    return {
+        'profile': template,
+        'PARFile': pulsarDir + PARDir + pulsarRow['PARFile'],
+        'avgPhotonFlux': photonFlux,
+        'pulsedFraction': pulsedFraction,
+        'name': pulsarRow['Name'],
+        'useProfileColumn': useColumn,
+        'observatoryMJDREF': observatoryMJDREF,
+        'detectorArea': detectorArea
+    }
+
+
+class PulsarDataCache(Mapping):
+    r"""
+    Read-only dictionary of pulsars which are built on demand and cached on
+    disk.
+
+    The cache directory holds the rows of the pulsar catalog (in the file
+    "catalog.p") and one file with a pickled PeriodicXRaySource for each
+    pulsar that has been requested, so that building a pulsar only writes
+    that pulsar's file.  The whole cache is discarded if the modification
+    time of the catalog file (or of the pulsar model source) has changed.
+    Each pulsar is stored under a key made of the paths and modification
+    times of its PAR file and profile, along with the arguments that affect
+    the model (detector area, energy range and observatory reference MJD),
+    so a pulsar is rebuilt whenever one of those changes.
+
+    Pulsars are built (or unpickled) only when first accessed, and the same
+    object is returned on later accesses.  Unpickled pulsars are given a new
+    signal ID (see
+    :meth:`~modest.signals.signalsource.SignalSource.refreshSignalID`).  If
+    the cache can't be written, the pulsars are simply not cached.
+
+    Args:
+     cacheDirectory (str): Directory of the cache
+     See :func:`loadPulsarData` for the other arguments
+    """
+    def __init__(
+            self,
+            cacheDirectory,
+            detectorArea=1,
+            loadPulsarNames=None,
+            pulsarDir='',
+            pulsarCatalogFileName='pulsarCatalog.xls',
+            PARDir='PAR_files/',
+            profileDir='profiles/',
+            observatoryMJDREF=None,
+            energyRange=None
+    ):
+        self.cacheDirectory = cacheDirectory
+        self.pulsarDir = pulsarDir
+        self.PARDir = PARDir
+        self.profileDir = profileDir
+        self.detectorArea = detectorArea
+        self.observatoryMJDREF = observatoryMJDREF
+        if energyRange is None:
+            self.energyRange = None
+        else:
+            self.energyRange = tuple(energyRange)
+
+        catalogFile = pulsarDir + pulsarCatalogFileName
+        catalogMTime = os.path.getmtime(catalogFile)
+
+        # Pickled pulsars built by an older version of the pulsar model are
+        # not reused
+        modelMTime = os.path.getmtime(signals.periodicxraysource.__file__)
+
+        catalogContents = self.loadCacheFile('catalog.p')
+        if (
+                (catalogContents is None) or
+                (catalogContents.get('catalogFile') != os.path.abspath(catalogFile)) or
+                (catalogContents.get('catalogMTime') != catalogMTime) or
+                (catalogContents.get('modelMTime') != modelMTime)
+        ):
+            pulsarCatalog = pd.read_excel(catalogFile)
+            catalogContents = {
+                'catalogFile': os.path.abspath(catalogFile),
+                'catalogMTime': catalogMTime,
+                'modelMTime': modelMTime,
+                'rows': [
+                    pulsarCatalog.iloc[pulsarIterator].to_dict()
+                    for pulsarIterator in range(len(pulsarCatalog))
+                ]
+            }
+            self.clearPulsarFiles()
+            self.saveCacheFile('catalog.p', catalogContents)
+
+        self.rows = {}
+        for pulsarRow in catalogContents['rows']:
+            if (loadPulsarNames is None) or (pulsarRow['Name'] in loadPulsarNames):
+                self.rows[pulsarRow['Name']] = pulsarRow
+
+        self.pulsars = {}
+        """
+        Pulsars which have already been built or loaded from the cache
+        """
+        return
+
+    def __getitem__(self, pulsarName):
+        if pulsarName in self.pulsars:
+            return self.pulsars[pulsarName]
+
+        pulsarArgs = pulsarArguments(
+            self.rows[pulsarName],
+            detectorArea=self.detectorArea,
+            pulsarDir=self.pulsarDir,
+            PARDir=self.PARDir,
+            profileDir=self.profileDir,
+            observatoryMJDREF=self.observatoryMJDREF,
+            energyRange=self.energyRange
+        )
+        pulsarKey = self.pulsarKey(pulsarArgs)
+        pulsarFileName = self.pulsarFileName(pulsarKey)
+
+        pulsarContents = self.loadCacheFile(pulsarFileName)
+        if (pulsarContents is not None) and (pulsarContents.get('pulsarKey') == pulsarKey):
+            pulsar = pulsarContents['pulsar']
+            pulsar.refreshSignalID()
+        else:
+            pulsar = signals.PeriodicXRaySource(**pulsarArgs)
+            self.saveCacheFile(
+                pulsarFileName, {'pulsarKey': pulsarKey, 'pulsar': pulsar}
+            )
+
+        self.pulsars[pulsarName] = pulsar
+        return pulsar
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def pulsarKey(
+            self,
+            pulsarArgs
+    ):
+        r"""
+        Key under which a pulsar is stored in the cache.
+
+        Args:
+         pulsarArgs (dict): Arguments used to build the pulsar (see :func:`pulsarArguments`)
+
+        Returns:
+         (tuple): The cache key
+        """
+        fileKeys = []
+        for fileName in [pulsarArgs['PARFile'], pulsarArgs['profile']]:
+            if fileName is None:
+                fileKeys.append(None)
+            else:
+                fileKeys.append(
+                    (os.path.abspath(fileName), os.path.getmtime(fileName))
+                )
+        return (
+            pulsarArgs['name'],
+            tuple(fileKeys),
+            pulsarArgs['avgPhotonFlux'],
+            pulsarArgs['pulsedFraction'],
+            pulsarArgs['useProfileColumn'],
+            self.detectorArea,
+            self.energyRange,
+            self.observatoryMJDREF
+        )
+
+    @staticmethod
+    def pulsarFileName(pulsarKey):
+        r"""
+        Name of the cache file of a pulsar, made from a hash of its key.
+
+        Args:
+         pulsarKey (tuple): Key of the pulsar (see :meth:`pulsarKey`)
+
+        Returns:
+         (str): The file name, relative to the cache directory
+        """
+        return 'pulsar.%s.p' % hashlib.sha1(repr(pulsarKey).encode()).hexdigest()
+
+    def clearPulsarFiles(self):
+        r"""
+        Remove the cached pulsars (when the catalog or model has changed).
+        """
+        try:
+            cacheFiles = os.listdir(self.cacheDirectory)
+        except OSError:
+            return
+        for cacheFileName in fnmatch.filter(cacheFiles, 'pulsar.*.p'):
+            try:
+                os.remove(os.path.join(self.cacheDirectory, cacheFileName))
+            except OSError:
+                pass
+        return
+
+    def loadCacheFile(self, cacheFileName):
+        r"""
+        Read a file from the cache directory.
+
+        Args:
+         cacheFileName (str): Name of the file, relative to the cache directory
+
+        Returns:
+         The unpickled file contents, or None if the file can't be read
+        """
+        try:
+            with open(os.path.join(self.cacheDirectory, cacheFileName), 'rb') as cacheFileHandle:
+                return pickle.load(cacheFileHandle)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def saveCacheFile(self, cacheFileName, cacheContents):
+        r"""
+        Write a file to the cache directory.
+
+        The contents are written to a temporary file which then replaces the
+        cache file, so that an interrupted write doesn't leave a corrupted
+        cache.
+
+        Args:
+         cacheFileName (str): Name of the file, relative to the cache directory
+         cacheContents: Object to be pickled
+        """
+        cacheFile = os.path.join(self.cacheDirectory, cacheFileName)
+        temporaryFile = cacheFile + '.%i.tmp' % os.getpid()
+        try:
+            os.makedirs(self.cacheDirectory, exist_ok=True)
+            with open(temporaryFile, 'wb') as cacheFileHandle:
+                pickle.dump(
+                    cacheContents,
+                    cacheFileHandle,
+                    protocol=pickle.HIGHEST_PROTOCOL
+                )
+            os.replace(temporaryFile, cacheFile)
+        except OSError:
+            if os.path.isfile(temporaryFile):
+                os.remove(temporaryFile)
+        return
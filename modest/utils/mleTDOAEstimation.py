@@ -1,46 +1,233 @@
 import numpy as np
+import multiprocessing as mp
+
+from . pulsarAcquisition import (
+    photonArrivalTimes,
+    foldPhotons,
+    phaseWindowIntegral,
+    circularCrossCorrelation
+)
+
 
 def estimateTDOA(
         photonMeasurements,
         pulsarObject,
         maxMLEResolution=None,
-        MLEBins=20
+        MLEBins=20,
+        chunkSize=None,
+        processes=1,
+        coarseBins=None
 ):
-    pulsarPeriod = pulsarObject.getPeriod(photonMeasurements[0]['t']['value'])
-    
+    r"""
+    Estimates the TDOA of a pulsar signal by maximizing the likelihood of a
+    set of photon arrival times.
+
+    The log-likelihood of a TDOA :math:`\tau` is evaluated as
+
+    .. math::
+        \sum_k \textrm{log} \Lambda(t_k + \tau, t_k + \tau + \Delta T)
+
+    where :math:`\Lambda` is the signal integral (see
+    :meth:`~modest.signals.periodicxraysource.PeriodicXRaySource.signalIntegral`)
+    and :math:`\Delta T` is the current grid resolution.  The search starts
+    with a grid of MLEBins offsets spanning one period, and is refined
+    by a factor of MLEBins about the maximum until the resolution is finer
+    than maxMLEResolution.  The estimate returned is the center of the
+    window :math:`[\tau, \tau + \Delta T]` of the last grid evaluated.
+
+    At each refinement level the likelihood of the whole grid is evaluated
+    with array operations (see :func:`gridLogLikelihood`), in chunks of
+    photons to bound the memory used.  The chunks may be spread across a
+    pool of processes.
+
+    If coarseBins is given, the first (coarse) stage of the search is
+    replaced by folding the photons into a histogram of coarseBins phase
+    bins and cross-correlating it (by FFT) with the log of the signal
+    integral over each bin (see :func:`foldedLogLikelihood`).  This costs a
+    single pass over the photons regardless of the number of bins.
+
+    Args:
+     photonMeasurements: Photon arrival times, or list of photon measurement dicts
+     pulsarObject (PeriodicXRaySource): The pulsar signal
+     maxMLEResolution (float): Resolution at which to stop refining the search, as a fraction of the pulsar period.  Defaults to 1/100.
+     MLEBins (int): Number of offsets in the grid at each refinement level
+     chunkSize (int): Number of photons for which the likelihood is evaluated at once.  By default, chunks are chosen to hold about a million photon-offset pairs.
+     processes (int): Number of processes over which the photon chunks are split
+     coarseBins (int): Number of phase bins of the FFT coarse stage (optional)
+
+    Returns:
+     (float): The maximum likelihood TDOA
+    """
+    arrivalTimes = photonArrivalTimes(photonMeasurements)
+    pulsarPeriod = pulsarObject.getPeriod(arrivalTimes[0])
+
     if not maxMLEResolution:
         maxMLEResolution = pulsarPeriod/100
     else:
         maxMLEResolution = pulsarPeriod * maxMLEResolution
 
-    currentTimeResolution = pulsarPeriod/MLEBins
-    tSearchLowerBound = 0
-    tSearchUpperBound = currentTimeResolution * (MLEBins-1)
+    if chunkSize is None:
+        chunkSize = int(np.max([1, np.power(2, 20) // MLEBins]))
+
+    if processes > 1:
+        myPool = mp.Pool(processes)
+    else:
+        myPool = None
+
+    if coarseBins:
+        coarseLikelihood = foldedLogLikelihood(
+            arrivalTimes, pulsarObject, coarseBins
+        )
+        coarseResolution = pulsarPeriod/coarseBins
+        maxLikelihoodTDOA = (
+            np.argmax(coarseLikelihood) * coarseResolution
+        )
+        # Folding moves each photon to the start of its phase bin, which
+        # offsets the coarse estimate by up to about a bin.  The first fine
+        # grid is therefore centered on the coarse estimate, and covers one
+        # coarse bin on either side of it.
+        currentTimeResolution = 2 * coarseResolution/MLEBins
+        tSearchLowerBound = maxLikelihoodTDOA - coarseResolution
+        tSearchUpperBound = tSearchLowerBound + (currentTimeResolution * (MLEBins-1))
+    else:
+        maxLikelihoodTDOA = 0
+        currentTimeResolution = pulsarPeriod/MLEBins
+        tSearchLowerBound = 0
+        tSearchUpperBound = currentTimeResolution * (MLEBins-1)
+
+    finalTimeResolution = 0
     while currentTimeResolution > maxMLEResolution:
         tSearchVector = np.linspace(tSearchLowerBound, tSearchUpperBound, MLEBins)
-        likelihoodVector = np.zeros(MLEBins)
-
-        for tSearchIndex in range(len(tSearchVector)):
-            currentTimeOffset = tSearchVector[tSearchIndex]
-            fluxValues = np.array([
-                pulsarObject.signalIntegral(
-                    photon['t']['value'] + currentTimeOffset,
-                    photon['t']['value'] + currentTimeResolution + currentTimeOffset
-                )
-                for photon in photonMeasurements
-            ])
-            likelihoodVector[tSearchIndex] = (
-                np.sum(
-                    np.log(fluxValues)
-                )
-            )
+        likelihoodVector = gridLogLikelihood(
+            arrivalTimes,
+            pulsarObject,
+            tSearchVector,
+            currentTimeResolution,
+            chunkSize=chunkSize,
+            pool=myPool
+        )
         myArgMax = np.argmax(likelihoodVector)
         maxLikelihoodTDOA = tSearchVector[myArgMax]
+        finalTimeResolution = currentTimeResolution
 
         currentTimeResolution = currentTimeResolution/MLEBins
 
         tSearchLowerBound = maxLikelihoodTDOA
         tSearchUpperBound = maxLikelihoodTDOA + (currentTimeResolution * (MLEBins-1))
 
-        
-    return maxLikelihoodTDOA
+    if myPool is not None:
+        myPool.close()
+        myPool.join()
+
+    # Each grid offset is the start of a window of width finalTimeResolution
+    # which contains the TDOA, so the estimate is the center of that window.
+    return maxLikelihoodTDOA + finalTimeResolution/2
+
+
+def gridLogLikelihood(
+        arrivalTimes,
+        pulsarObject,
+        timeOffsets,
+        windowLength,
+        chunkSize=None,
+        pool=None
+):
+    r"""
+    Evaluates the log-likelihood of a grid of TDOA hypotheses.
+
+    For each offset :math:`\tau_j`, the log-likelihood is the sum over the
+    photons of the log of the signal integral from :math:`t_k + \tau_j` to
+    :math:`t_k + \tau_j + \Delta T`.  The signal integral is evaluated for
+    all photon-offset pairs of a chunk of photons at once.
+
+    Args:
+     arrivalTimes (numpy.array): Photon arrival times
+     pulsarObject (PeriodicXRaySource): The pulsar signal
+     timeOffsets (numpy.array): TDOA hypotheses
+     windowLength (float): Length of the window over which the signal is integrated
+     chunkSize (int): Number of photons per chunk.  If None, all photons are evaluated at once.
+     pool (multiprocessing.Pool): Pool over which to spread the chunks (optional)
+
+    Returns:
+     (numpy.array): Log-likelihood of each offset
+    """
+    if chunkSize is None:
+        chunkSize = len(arrivalTimes)
+    chunkArguments = [
+        (
+            arrivalTimes[chunkStart:chunkStart + chunkSize],
+            pulsarObject,
+            timeOffsets,
+            windowLength
+        )
+        for chunkStart in range(0, len(arrivalTimes), chunkSize)
+    ]
+    if pool is not None and len(chunkArguments) > 1:
+        chunkLikelihoods = pool.map(chunkLogLikelihood, chunkArguments)
+    else:
+        chunkLikelihoods = [
+            chunkLogLikelihood(arguments) for arguments in chunkArguments
+        ]
+    return np.sum(chunkLikelihoods, axis=0)
+
+
+def chunkLogLikelihood(chunkArguments):
+    r"""
+    Evaluates the log-likelihood of a grid of TDOA hypotheses for one chunk
+    of photons.
+
+    This is the unit of work of :func:`gridLogLikelihood`, and takes a single
+    tuple of arguments so that it can be used with
+    :meth:`multiprocessing.Pool.map`.
+
+    Args:
+     chunkArguments (tuple): (arrivalTimes, pulsarObject, timeOffsets, windowLength)
+
+    Returns:
+     (numpy.array): Log-likelihood of each offset, summed over the photons of the chunk
+    """
+    arrivalTimes, pulsarObject, timeOffsets, windowLength = chunkArguments
+    windowStart = np.add.outer(arrivalTimes, timeOffsets).ravel()
+    fluxValues = pulsarObject.signalIntegral(
+        windowStart, windowStart + windowLength
+    )
+    return np.sum(
+        np.log(fluxValues).reshape(len(arrivalTimes), len(timeOffsets)),
+        axis=0
+    )
+
+
+def foldedLogLikelihood(
+        arrivalTimes,
+        pulsarObject,
+        nBins
+):
+    r"""
+    Approximates the log-likelihood of nBins TDOA hypotheses, evenly spaced
+    over one period, by FFT.
+
+    The photons are folded into a histogram :math:`h` of nBins phase bins
+    (see :func:`~modest.utils.pulsarAcquisition.foldPhotons`), and the
+    log-likelihood of the offset :math:`j P / N` is approximated by the
+    circular cross-correlation
+
+    .. math::
+        L_j = \sum_b h_b \textrm{log} \Lambda_{b + j}
+
+    where :math:`\Lambda_b` is the signal integral over phase bin :math:`b`.
+    This is the likelihood used by :func:`estimateTDOA`, with each photon
+    moved to the start of its phase bin.
+
+    Args:
+     arrivalTimes (numpy.array): Photon arrival times
+     pulsarObject (PeriodicXRaySource): The pulsar signal
+     nBins (int): Number of phase bins
+
+    Returns:
+     (numpy.array): Approximate log-likelihood of each offset
+    """
+    histogram = foldPhotons(arrivalTimes, pulsarObject, nBins)
+    binIntegral = phaseWindowIntegral(
+        pulsarObject, (np.arange(nBins) + 0.5) / nBins, 1.0/nBins
+    )
+    return circularCrossCorrelation(histogram, np.log(binIntegral))
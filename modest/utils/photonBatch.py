@@ -0,0 +1,466 @@
+## @file photonBatch.py
+# @brief This file contains the PhotonBatch class, a columnar container for
+# photon measurements.
+
+import heapq
+import numpy as np
+
+
+class PhotonBatch():
+    r"""
+    PhotonBatch stores a set of photon measurements as columns.
+
+    Individual photon measurements are passed to the filter as nested dicts,
+    e.g. ``{'t': {'value', 'var'}, 'RA': {...}, 'DEC': {...}, 'unitVec':
+    {...}, 'name': ...}``.  Building one dict per photon is slow and uses a
+    lot of memory for large numbers of photons, so PhotonBatch instead keeps
+    one contiguous array per measured quantity, with one entry per photon.
+
+    Slicing a PhotonBatch with a slice returns a batch whose columns are
+    views of the original columns (i.e. no data is copied).  Indexing a
+    PhotonBatch with an integer returns the measurement dict for that
+    photon, and iterating over a PhotonBatch yields the measurement dict for
+    each photon in turn, so a PhotonBatch can be used wherever a list of
+    photon measurements is expected.
+
+    Columns which were not measured are None.  Values that are the same for
+    every photon (e.g. the measurement variance) may be passed as scalars, and
+    are broadcast without copying.
+
+    Attributes
+    ----------
+     columns (dict): Dictionary of the photon columns, keyed by column name (see :attr:`columnKeys`)
+    """
+
+    columnKeys = {
+        't': ('t', 'value'),
+        'tVar': ('t', 'var'),
+        'RA': ('RA', 'value'),
+        'RAVar': ('RA', 'var'),
+        'DEC': ('DEC', 'value'),
+        'DECVar': ('DEC', 'var'),
+        'unitVec': ('unitVec', 'value'),
+        'energy': ('energy', 'value'),
+        'energyVar': ('energy', 'var'),
+        'name': ('name', None)
+    }
+    """
+    Keys of each column in the photon measurement dicts
+    """
+
+    def __init__(
+            self,
+            t,
+            tVar=None,
+            RA=None,
+            RAVar=None,
+            DEC=None,
+            DECVar=None,
+            unitVec=None,
+            energy=None,
+            energyVar=None,
+            name=None
+    ):
+        r"""
+        Args:
+         t (numpy.array): Photon arrival times
+         tVar (float or numpy.array): Arrival time variance
+         RA (numpy.array): Measured right ascension of each photon
+         RAVar (float or numpy.array): Right ascension variance
+         DEC (numpy.array): Measured declination of each photon
+         DECVar (float or numpy.array): Declination variance
+         unitVec (numpy.array): Measured unit vector of each photon (one row per photon)
+         energy (numpy.array): Measured photon energy
+         energyVar (float or numpy.array): Photon energy variance
+         name (str or numpy.array): Name of the source of each photon
+        """
+        t = np.asarray(t, dtype=float)
+        nPhotons = len(t)
+        self.columns = {'t': t}
+        for columnName, column in [
+                ('tVar', tVar),
+                ('RA', RA),
+                ('RAVar', RAVar),
+                ('DEC', DEC),
+                ('DECVar', DECVar),
+                ('unitVec', unitVec),
+                ('energy', energy),
+                ('energyVar', energyVar),
+        ]:
+            if column is not None:
+                column = np.asarray(column, dtype=float)
+                if columnName == 'unitVec':
+                    column = np.broadcast_to(column, (nPhotons, 3))
+                else:
+                    column = np.broadcast_to(column, (nPhotons,))
+            self.columns[columnName] = column
+
+        if name is not None:
+            if np.ndim(name) == 0:
+                nameColumn = np.empty(1, dtype=object)
+                nameColumn[0] = name
+                name = np.broadcast_to(nameColumn, (nPhotons,))
+            else:
+                name = np.asarray(name, dtype=object)
+        self.columns['name'] = name
+        return
+
+    @classmethod
+    def fromColumns(
+            cls,
+            photonColumns
+    ):
+        r"""
+        Build a PhotonBatch from columnar photon measurements.
+
+        Args:
+         photonColumns (dict): Photon measurements with the same nested structure as a single photon measurement dict, but with an array of values (one per photon) in place of each value
+
+        Returns:
+         (PhotonBatch): Batch containing the photons
+        """
+        columnArgs = {}
+        for columnName, (key, subKey) in cls.columnKeys.items():
+            if key not in photonColumns:
+                continue
+            if subKey is None:
+                columnArgs[columnName] = photonColumns[key]
+            elif subKey in photonColumns[key]:
+                columnArgs[columnName] = photonColumns[key][subKey]
+        return cls(**columnArgs)
+
+    @classmethod
+    def fromList(
+            cls,
+            photonList
+    ):
+        r"""
+        Build a PhotonBatch from a list of photon measurement dicts.
+
+        Quantities which are missing from some of the photons are stored as
+        NaN for those photons.
+
+        Args:
+         photonList (list): List of photon measurement dicts
+
+        Returns:
+         (PhotonBatch): Batch containing the photons
+        """
+        columnArgs = {}
+        for columnName, (key, subKey) in cls.columnKeys.items():
+            if not any(
+                    key in photon and (subKey is None or subKey in photon[key])
+                    for photon in photonList
+            ):
+                continue
+            if subKey is None:
+                columnArgs[columnName] = [
+                    photon.get(key) for photon in photonList
+                ]
+            elif columnName == 'unitVec':
+                columnArgs[columnName] = np.array([
+                    photon[key][subKey]
+                    if key in photon else np.full(3, np.nan)
+                    for photon in photonList
+                ]).reshape([len(photonList), 3])
+            else:
+                columnArgs[columnName] = [
+                    photon[key].get(subKey, np.nan)
+                    if key in photon else np.nan
+                    for photon in photonList
+                ]
+        if 't' not in columnArgs:
+            columnArgs['t'] = []
+        return cls(**columnArgs)
+
+    @classmethod
+    def concatenate(
+            cls,
+            batchList
+    ):
+        r"""
+        Concatenate several PhotonBatches into one.
+
+        Columns which are missing from some of the batches are stored as NaN
+        (or None, for the source name) for the photons of those batches.  The
+        result is not sorted; see :meth:`sort`.
+
+        Args:
+         batchList (list): List of PhotonBatch objects
+
+        Returns:
+         (PhotonBatch): Batch containing the photons of all of the batches
+        """
+        columnArgs = {}
+        for columnName in cls.columnKeys:
+            if all(batch.columns[columnName] is None for batch in batchList):
+                continue
+            columnParts = []
+            for batch in batchList:
+                column = batch.columns[columnName]
+                if column is None:
+                    if columnName == 'name':
+                        column = np.empty(len(batch), dtype=object)
+                    elif columnName == 'unitVec':
+                        column = np.full([len(batch), 3], np.nan)
+                    else:
+                        column = np.full(len(batch), np.nan)
+                columnParts.append(column)
+            columnArgs[columnName] = np.concatenate(columnParts)
+        if 't' not in columnArgs:
+            columnArgs['t'] = []
+        return cls(**columnArgs)
+
+    def __len__(self):
+        return len(self.columns['t'])
+
+    def __getitem__(
+            self,
+            index
+    ):
+        r"""
+        Index the batch.
+
+        An integer index returns the measurement dict for a single photon.
+        A slice returns a PhotonBatch whose columns are views of this batch's
+        columns.  An array of indices or a boolean mask returns a PhotonBatch
+        containing copies of the selected photons.
+        """
+        if np.ndim(index) == 0 and not isinstance(index, slice):
+            return self.photonDict(index)
+        return PhotonBatch(**{
+            columnName: (column[index] if column is not None else None)
+            for columnName, column in self.columns.items()
+        })
+
+    def __iter__(self):
+        for photonIndex in range(len(self)):
+            yield self.photonDict(photonIndex)
+
+    def photonDict(
+            self,
+            index
+    ):
+        r"""
+        Returns the measurement dict of a single photon.
+
+        Only the quantities which were measured for the photon (i.e. are not
+        None or NaN) are included.
+
+        Args:
+         index (int): Index of the photon
+
+        Returns:
+         (dict): Photon measurement dict
+        """
+        photon = {}
+        for columnName, (key, subKey) in self.columnKeys.items():
+            column = self.columns[columnName]
+            if column is None:
+                continue
+            value = column[index]
+            if subKey is None:
+                if value is not None:
+                    photon[key] = value
+            elif not np.any(np.isnan(value)):
+                if columnName == 'unitVec':
+                    value = np.array(value)
+                photon.setdefault(key, {})[subKey] = value
+        return photon
+
+    def toList(self):
+        r"""
+        Returns the photons as a list of measurement dicts.
+
+        The dicts are the same as those returned by :meth:`photonDict`, but
+        are built a whole column at a time.
+        """
+        keyValues = {}
+        for columnName, (key, subKey) in self.columnKeys.items():
+            column = self.columns[columnName]
+            if column is None:
+                continue
+            if subKey is None:
+                keyValues[key] = list(column)
+                continue
+            if columnName == 'unitVec':
+                missing = np.any(np.isnan(column), axis=1)
+                values = list(np.array(column))
+            else:
+                missing = np.isnan(column)
+                values = column.tolist()
+            for photonIndex in np.flatnonzero(missing):
+                values[photonIndex] = None
+            keyValues.setdefault(key, {})[subKey] = values
+
+        # Assemble the dicts of each key (e.g. {'value', 'var'}), and then
+        # the photon dicts, leaving out missing values
+        keyDicts = {}
+        for key, values in keyValues.items():
+            if not isinstance(values, dict):
+                keyDicts[key] = values
+                continue
+            subKeys = list(values.keys())
+            keyDicts[key] = [
+                {
+                    subKey: subValue
+                    for subKey, subValue in zip(subKeys, subValues)
+                    if subValue is not None
+                }
+                for subValues in zip(*values.values())
+            ]
+
+        if not keyDicts:
+            return [{} for photonIndex in range(len(self))]
+        keys = list(keyDicts.keys())
+        return [
+            {
+                key: value
+                for key, value in zip(keys, photonValues)
+                if value is not None and value != {}
+            }
+            for photonValues in zip(*keyDicts.values())
+        ]
+
+    def toColumns(self):
+        r"""
+        Returns the photons as a single nested dict of columns (the inverse of
+        :meth:`fromColumns`).
+        """
+        photonColumns = {}
+        for columnName, (key, subKey) in self.columnKeys.items():
+            column = self.columns[columnName]
+            if column is None:
+                continue
+            if subKey is None:
+                photonColumns[key] = column
+            else:
+                photonColumns.setdefault(key, {})[subKey] = column
+        return photonColumns
+
+    def sort(self):
+        r"""
+        Returns a copy of the batch sorted by arrival time.
+
+        The sort is stable, so photons with the same arrival time stay in the
+        same order.
+        """
+        return self[np.argsort(self.columns['t'], kind='mergesort')]
+
+    def __getattr__(
+            self,
+            columnName
+    ):
+        # Allows columns to be accessed as attributes, e.g. photonBatch.t
+        if columnName != 'columns' and columnName in self.columnKeys:
+            return self.columns[columnName]
+        raise AttributeError(
+            "'PhotonBatch' object has no attribute '%s'" % columnName
+        )
+
+
+def mergePhotonBatches(batchList):
+    r"""
+    Merge several time-ordered PhotonBatches into a single time-ordered
+    PhotonBatch.
+
+    The batches are concatenated and sorted at once with a stable sort, so
+    photons with the same arrival time keep the order of batchList.  The
+    source name of each photon is kept.
+
+    Args:
+     batchList (list): List of PhotonBatch objects (or lists of photon measurement dicts)
+
+    Returns:
+     (PhotonBatch): Time-ordered batch containing all of the photons
+    """
+    batchList = [
+        batch if isinstance(batch, PhotonBatch) else PhotonBatch.fromList(batch)
+        for batch in batchList
+    ]
+    return PhotonBatch.concatenate(batchList).sort()
+
+
+def mergePhotonStreams(photonSources):
+    r"""
+    Merge any number of time-ordered photon sources into a single
+    time-ordered stream of PhotonBatch chunks.
+
+    Each source may be a PhotonBatch, a list of photon measurement dicts, or
+    an iterator of PhotonBatch chunks (e.g. from
+    :meth:`~modest.signals.poissonsource.PoissonSource.generatePhotonChunks`).
+    The photons within each source must be in time order; a ValueError is
+    raised if a source is found to be out of order.
+
+    The sources are merged with a k-way merge: a heap holds the time of the
+    last photon currently buffered from each source.  The smallest of these
+    times is the latest time up to which photons can be emitted, since no
+    source can produce an earlier photon later on.  All buffered photons up
+    to that time are merged with :func:`mergePhotonBatches` and yielded as
+    one chunk, and the next chunk of the source whose buffer was used up is
+    read.  Only one chunk per source is held in memory at a time.
+
+    Args:
+     photonSources (list): List of photon sources
+
+    Returns:
+     (generator): Generator yielding time-ordered PhotonBatch chunks
+    """
+    photonStreams = []
+    for photonSource in photonSources:
+        if isinstance(photonSource, PhotonBatch):
+            photonStreams.append(iter([photonSource]))
+        elif isinstance(photonSource, list):
+            photonStreams.append(iter([PhotonBatch.fromList(photonSource)]))
+        else:
+            photonStreams.append(iter(photonSource))
+
+    lastTimes = [-np.inf] * len(photonStreams)
+
+    def nextChunk(streamIndex):
+        # Returns the next non-empty chunk of a stream, or None if the stream
+        # is exhausted.  The merge is only correct for time-ordered streams,
+        # so every chunk is checked before it is used.
+        for chunk in photonStreams[streamIndex]:
+            if len(chunk) > 0:
+                if (
+                        chunk.t[0] < lastTimes[streamIndex] or
+                        np.any(np.diff(chunk.t) < 0)
+                ):
+                    raise ValueError(
+                        'Photon source %i is not in time order; sort its '
+                        'photons before merging.' % streamIndex
+                    )
+                lastTimes[streamIndex] = chunk.t[-1]
+                return chunk
+        return None
+
+    buffers = [nextChunk(streamIndex) for streamIndex in range(len(photonStreams))]
+    streamHeap = [
+        (buffers[streamIndex].t[-1], streamIndex)
+        for streamIndex in range(len(buffers)) if buffers[streamIndex] is not None
+    ]
+    heapq.heapify(streamHeap)
+
+    while streamHeap:
+        mergeTime, streamIndex = heapq.heappop(streamHeap)
+
+        # Collect every buffered photon up to the merge time
+        mergeChunks = []
+        for bufferIndex in range(len(buffers)):
+            buffer = buffers[bufferIndex]
+            if buffer is None or len(buffer) == 0:
+                continue
+            nMerge = np.searchsorted(buffer.t, mergeTime, side='right')
+            if nMerge > 0:
+                mergeChunks.append(buffer[0:nMerge])
+                buffers[bufferIndex] = buffer[nMerge:]
+        if mergeChunks:
+            yield mergePhotonBatches(mergeChunks)
+
+        # The buffer of this stream is now empty; read its next chunk
+        buffers[streamIndex] = nextChunk(streamIndex)
+        if buffers[streamIndex] is not None:
+            heapq.heappush(
+                streamHeap, (buffers[streamIndex].t[-1], streamIndex)
+            )
@@ -0,0 +1,486 @@
+## @file pulsarAcquisition.py
+# @brief Batch acquisition of pulsar signals from a set of photon arrivals.
+#
+# @details Before it reaches peak lock, a
+# @ref modest.substates.correlationvector.CorrelationVector "CorrelationVector"
+# starts from a flat correlation vector and needs many photons to converge.
+# The functions in this file estimate the TDOA and the correlation vector
+# directly from a batch of photons, so that the filter can be initialized
+# close to lock.
+#
+# The photons are folded with the pulsar phase model into a histogram, and
+# the histogram is circularly cross-correlated (by FFT) with the expected
+# number of photons in each phase bin.  If the velocity is poorly known, the
+# folding is repeated over a grid of velocity hypotheses
+# (see acquireTDOAVelocity).
+import numpy as np
+import multiprocessing as mp
+
+
+def photonArrivalTimes(photons):
+    r"""
+    Returns an array of photon arrival times.
+
+    Args:
+     photons: Either an array of arrival times, or a list of photon measurement dicts (containing ['t']['value'])
+
+    Returns:
+     (numpy.array): Photon arrival times
+    """
+    if len(photons) > 0 and isinstance(photons[0], dict):
+        return np.array([photon['t']['value'] for photon in photons])
+    return np.asarray(photons, dtype=float)
+
+
+def foldPhotons(
+        arrivalTimes,
+        pulsarObject,
+        nBins,
+        velocity=0,
+        referenceTime=0
+):
+    r"""
+    Folds photon arrival times into a histogram of pulsar phase.
+
+    If a velocity is given, the arrival times are corrected for the change
+    in delay relative to the reference time, i.e. photon k is folded at
+    time :math:`t_k + v (t_k - t_{ref})`.
+
+    Args:
+     arrivalTimes (numpy.array): Photon arrival times
+     pulsarObject (PeriodicXRaySource): Pulsar whose phase model is used for folding
+     nBins (int): Number of phase bins
+     velocity (float): Velocity along the line of sight to the pulsar, as a fraction of the speed of light
+     referenceTime (float): Time at which the velocity correction is zero
+
+    Returns:
+     (numpy.array): Number of photons in each phase bin
+    """
+    if velocity != 0:
+        arrivalTimes = arrivalTimes + velocity * (arrivalTimes - referenceTime)
+    phase = pulsarObject.getPhaseCycles(arrivalTimes)[1]
+    binIndex = np.minimum((phase * nBins).astype(int), nBins - 1)
+    return np.bincount(binIndex, minlength=nBins)
+
+
+def phaseWindowIntegral(
+        pulsarObject,
+        phase,
+        phaseWidth
+):
+    r"""
+    Computes the integral of the pulsar signal over windows of phase.
+
+    This is the vectorized equivalent of calling
+    :meth:`~modest.signals.periodicxraysource.PeriodicXRaySource.signalIntegral`
+    over a window of width phaseWidth centered on each phase, computed from
+    the pulsar's :attr:`singlePeriodIntegral`.
+
+    Args:
+     pulsarObject (PeriodicXRaySource): Pulsar signal
+     phase (numpy.array): Center of each window, in cycles
+     phaseWidth (float): Width of the windows, in cycles
+
+    Returns:
+     (numpy.array): Expected number of photons in each window
+    """
+    def cumulativeIntegral(phi):
+        return (
+            np.floor(phi) * pulsarObject.singlePeriodIntegral[-1] +
+            np.interp(
+                np.mod(phi, 1.0),
+                pulsarObject.profileIndex,
+                pulsarObject.singlePeriodIntegral
+            )
+        )
+    integral = (
+        cumulativeIntegral(phase + phaseWidth/2) -
+        cumulativeIntegral(phase - phaseWidth/2)
+    ) * pulsarObject.scaleFactor
+    if pulsarObject.backgroundCountRate is not None:
+        integral = (
+            integral +
+            pulsarObject.backgroundCountRate * phaseWidth * pulsarObject.pulsarPeriod
+        )
+    return integral
+
+
+def circularCrossCorrelation(histogram, template):
+    r"""
+    Computes the circular cross-correlation c[j] = sum_b histogram[b] template[b+j] by FFT.
+    """
+    return np.fft.irfft(
+        np.conj(np.fft.rfft(histogram)) * np.fft.rfft(template),
+        len(histogram)
+    )
+
+
+def quadraticPeak(correlation):
+    r"""
+    Returns the (fractional) index of the maximum of a periodic sequence, by
+    fitting a quadratic to the largest value and its neighbors.
+    """
+    peakIndex = np.argmax(correlation)
+    yMinus = correlation[peakIndex - 1]
+    y0 = correlation[peakIndex]
+    yPlus = correlation[np.mod(peakIndex + 1, len(correlation))]
+    curvature = yMinus - 2*y0 + yPlus
+    if curvature < 0:
+        offset = 0.5 * (yMinus - yPlus) / curvature
+    else:
+        offset = 0
+    return peakIndex + offset
+
+
+def expectedPhaseCounts(
+        pulsarObject,
+        nBins,
+        nPhotons
+):
+    r"""
+    Returns the expected number of photons in each of nBins phase bins, out
+    of a total of nPhotons photons.
+    """
+    binCenters = (np.arange(nBins) + 0.5) / nBins
+    binTemplate = phaseWindowIntegral(pulsarObject, binCenters, 1.0/nBins)
+    return nPhotons * binTemplate / np.sum(binTemplate)
+
+
+def delayFisherInformation(
+        pulsarObject,
+        nBins
+):
+    r"""
+    Computes the Fisher information about the delay carried by a single
+    photon, from the expected photon counts in nBins phase bins.
+
+    The inverse of the Fisher information of all the photons is the
+    Cramer-Rao bound on the variance of the delay estimate.  Bins finer
+    than the resolution of the pulsar profile carry no additional
+    information (but would make the finite-difference derivative of the
+    counts grow without bound), so the number of bins is limited to the
+    number of profile intervals.
+
+    Args:
+     pulsarObject (PeriodicXRaySource): Pulsar signal
+     nBins (int): Number of phase bins
+
+    Returns:
+     (float): Fisher information per photon, in 1/s^2
+    """
+    nBins = np.min([nBins, pulsarObject.profileLen - 1])
+    expectedCounts = expectedPhaseCounts(pulsarObject, nBins, 1)
+    countDerivative = (
+        np.roll(expectedCounts, -1) - np.roll(expectedCounts, 1)
+    ) / 2
+    fisherInformation = np.sum(np.square(countDerivative) / expectedCounts)
+    return fisherInformation / np.square(pulsarObject.pulsarPeriod / nBins)
+
+
+def acquireTDOA(
+        photons,
+        pulsarObject,
+        nBins=1024,
+        filterOrder=None,
+        dT=None,
+        velocity=0,
+        referenceTime=None
+):
+    r"""
+    Estimates the TDOA of a pulsar signal from a batch of photons.
+
+    The photons are folded using
+    :meth:`~modest.signals.periodicxraysource.PeriodicXRaySource.getPhase`
+    into a histogram of nBins phase bins, and the histogram is
+    cross-correlated (by FFT) with the expected number of photons in each
+    bin.  The TDOA is the location of the correlation peak, refined by a
+    quadratic fit.  The TDOA variance is the Cramer-Rao bound for the number
+    of photons and the pulse profile, so it is only meaningful if the correct
+    peak was found.
+
+    If filterOrder and dT are given, the function also estimates the
+    correlation vector of a
+    :class:`~modest.substates.correlationvector.CorrelationVector` with
+    those parameters; i.e. for each tap the mean over the photons of the
+    signal integral that is measured by the filter, along with the variance
+    of that mean.
+
+    If the velocity along the line of sight to the pulsar is known, the
+    photons are folded taking it into account (see :func:`foldPhotons`), and
+    the TDOA is the delay at referenceTime.
+
+    Args:
+     photons: Photon arrival times, or list of photon measurement dicts
+     pulsarObject (PeriodicXRaySource): The pulsar being acquired
+     nBins (int): Number of phase bins used for folding
+     filterOrder (int): Number of taps in the correlation vector (optional)
+     dT (float): Tap spacing of the correlation vector (optional)
+     velocity (float): Velocity along the line of sight to the pulsar, as a fraction of the speed of light
+     referenceTime (float): Time at which the TDOA is estimated.  Defaults to the first photon arrival time.
+
+    Returns:
+     (dict): Dictionary containing "signalTDOA", "TDOAVar", "nPhotons", "correlation" (the correlation per photon, as a function of phase offset in bins), and if filterOrder was given, "correlationVector" and "correlationVectorCovariance"
+    """
+    arrivalTimes = photonArrivalTimes(photons)
+    nPhotons = len(arrivalTimes)
+    if nPhotons == 0:
+        raise ValueError('Pulsar acquisition requires at least one photon')
+
+    if referenceTime is None:
+        referenceTime = arrivalTimes[0]
+
+    pulsarPeriod = pulsarObject.getPeriod(referenceTime)
+    histogram = foldPhotons(
+        arrivalTimes, pulsarObject, nBins,
+        velocity=velocity, referenceTime=referenceTime
+    )
+    binCenters = (np.arange(nBins) + 0.5) / nBins
+
+    expectedCounts = expectedPhaseCounts(pulsarObject, nBins, nPhotons)
+
+    correlation = circularCrossCorrelation(histogram, expectedCounts)
+    peakBin = quadraticPeak(correlation)
+    signalTDOA = np.mod(peakBin / nBins, 1.0) * pulsarPeriod
+
+    TDOAVar = 1 / (delayFisherInformation(pulsarObject, nBins) * nPhotons)
+
+    acquisitionDict = {
+        'signalTDOA': signalTDOA,
+        'TDOAVar': TDOAVar,
+        'nPhotons': nPhotons,
+        'correlation': correlation / nPhotons
+    }
+
+    if filterOrder is not None:
+        if dT is None:
+            dT = pulsarPeriod / (filterOrder + 1)
+        # Each tap measures the integral of the signal over dT, centered on
+        # the tap delay; compute the mean (and mean square) of that
+        # measurement over the folded photons for every delay on the phase
+        # grid, then interpolate to the tap delays
+        tapTemplate = phaseWindowIntegral(
+            pulsarObject, binCenters, dT/pulsarPeriod
+        )
+        tapMean = circularCrossCorrelation(histogram, tapTemplate) / nPhotons
+        tapMeanSquare = circularCrossCorrelation(
+            histogram, np.square(tapTemplate)
+        ) / nPhotons
+
+        tapBins = np.arange(filterOrder) * dT * nBins / pulsarPeriod
+        gridBins = np.arange(nBins)
+        correlationVector = np.interp(tapBins, gridBins, tapMean, period=nBins)
+        tapMeanSquare = np.interp(
+            tapBins, gridBins, tapMeanSquare, period=nBins
+        )
+        # The variance of the tap estimates is floored at a small fraction of
+        # the spread of the tap template, so that no tap is treated as
+        # perfectly known
+        tapVariance = np.maximum(
+            tapMeanSquare - np.square(correlationVector),
+            np.var(tapTemplate) * 1e-2
+        ) / nPhotons
+
+        acquisitionDict['correlationVector'] = correlationVector
+        acquisitionDict['correlationVectorCovariance'] = np.diag(tapVariance)
+
+    return acquisitionDict
+
+
+def velocityTrialPeaks(trialArguments):
+    r"""
+    Folds the photons for each of a set of velocity trials, and returns the
+    height and location of the correlation peak for each trial.
+
+    This is the unit of work of :func:`acquireTDOAVelocity`, and takes a
+    single tuple of arguments so that it can be used with
+    :meth:`multiprocessing.Pool.map`.
+
+    Args:
+     trialArguments (tuple): (arrivalTimes, pulsarObject, expectedCounts, velocityTrials, referenceTime)
+
+    Returns:
+     (numpy.array, numpy.array): Height of the correlation peak, and (fractional) bin of the peak, for each velocity trial
+    """
+    (
+        arrivalTimes,
+        pulsarObject,
+        expectedCounts,
+        velocityTrials,
+        referenceTime
+    ) = trialArguments
+    nBins = len(expectedCounts)
+    templateFFT = np.fft.rfft(expectedCounts)
+
+    peakHeights = np.zeros(len(velocityTrials))
+    peakBins = np.zeros(len(velocityTrials))
+    for trialIndex in range(len(velocityTrials)):
+        histogram = foldPhotons(
+            arrivalTimes,
+            pulsarObject,
+            nBins,
+            velocity=velocityTrials[trialIndex],
+            referenceTime=referenceTime
+        )
+        correlation = np.fft.irfft(
+            np.conj(np.fft.rfft(histogram)) * templateFFT, nBins
+        )
+        peakBins[trialIndex] = quadraticPeak(correlation)
+        peakHeights[trialIndex] = np.max(correlation)
+    return peakHeights, peakBins
+
+
+def acquireTDOAVelocity(
+        photons,
+        pulsarObject,
+        velocity,
+        velocityStdDev,
+        nBins=1024,
+        searchStdDevs=3,
+        velocityStep=None,
+        filterOrder=None,
+        dT=None,
+        referenceTime=None,
+        processes=1
+):
+    r"""
+    Jointly estimates the TDOA and velocity of a pulsar signal from a batch
+    of photons.
+
+    If the velocity along the line of sight to the pulsar is poorly known,
+    folding the photons at a single velocity smears the pulse out.  This
+    function searches a grid of velocity hypotheses spanning searchStdDevs
+    standard deviations about the initial velocity estimate.  For each
+    velocity trial, the photons are folded (see :func:`foldPhotons`) and
+    cross-correlated by FFT with the pulse profile, giving the correlation
+    as a function of TDOA.  The best velocity is found by a quadratic fit of
+    the correlation peak heights about the largest one, and the TDOA (and
+    optionally the correlation vector) is then estimated at that velocity by
+    :func:`acquireTDOA`.
+
+    The covariance of the TDOA and velocity is the Cramer-Rao bound for a
+    delay that changes linearly with time, so the TDOA variance is larger
+    than the one computed by :func:`acquireTDOA` (which assumes the velocity
+    is known).
+
+    The velocity trials may be split across a pool of processes.  The
+    photons must span a nonzero time interval; otherwise a ValueError is
+    raised.
+
+    Args:
+     photons: Photon arrival times, or list of photon measurement dicts
+     pulsarObject (PeriodicXRaySource): The pulsar being acquired
+     velocity (float): Initial estimate of the velocity along the line of sight to the pulsar, as a fraction of the speed of light
+     velocityStdDev (float): Standard deviation of the initial velocity estimate
+     nBins (int): Number of phase bins used for folding
+     searchStdDevs (float): Number of standard deviations of velocity to search on either side of the initial estimate
+     velocityStep (float): Spacing of the velocity trials.  By default, the step is chosen so that the change in delay over the span of the photons is 1/32 of a pulsar period.
+     filterOrder (int): Number of taps in the correlation vector (optional)
+     dT (float): Tap spacing of the correlation vector (optional)
+     referenceTime (float): Time at which the TDOA is estimated.  Defaults to the first photon arrival time.
+     processes (int): Number of processes over which the velocity trials are split
+
+    Returns:
+     (dict): Dictionary containing the contents returned by :func:`acquireTDOA`, plus "velocity", "velocityVar", "TDOAVelocityCovariance" (2x2 covariance of TDOA and velocity), "velocityTrials" and "trialPeaks" (the correlation peak height for each velocity trial)
+    """
+    arrivalTimes = photonArrivalTimes(photons)
+    nPhotons = len(arrivalTimes)
+    if nPhotons == 0:
+        raise ValueError('Pulsar acquisition requires at least one photon')
+    if referenceTime is None:
+        referenceTime = arrivalTimes[0]
+
+    pulsarPeriod = pulsarObject.getPeriod(referenceTime)
+    timeSpan = np.max(arrivalTimes) - np.min(arrivalTimes)
+    if not timeSpan > 0:
+        # The delay at a single instant says nothing about how it changes
+        raise ValueError(
+            (
+                'Velocity acquisition requires photons spanning a nonzero ' +
+                'time interval (got %i photons spanning %g s).  Use ' +
+                'acquireTDOA with the prior velocity estimate instead.'
+            ) % (nPhotons, timeSpan)
+        )
+
+    if velocityStep is None:
+        velocityStep = pulsarPeriod / (32 * timeSpan)
+    nSideTrials = int(np.ceil(searchStdDevs * velocityStdDev / velocityStep))
+    velocityTrials = (
+        velocity + np.arange(-nSideTrials, nSideTrials + 1) * velocityStep
+    )
+
+    expectedCounts = expectedPhaseCounts(pulsarObject, nBins, nPhotons)
+
+    if processes > 1 and len(velocityTrials) > 1:
+        trialChunks = np.array_split(
+            velocityTrials, np.min([processes, len(velocityTrials)])
+        )
+        myPool = mp.Pool(len(trialChunks))
+        chunkResults = myPool.map(
+            velocityTrialPeaks,
+            [
+                (arrivalTimes, pulsarObject, expectedCounts, chunk, referenceTime)
+                for chunk in trialChunks
+            ]
+        )
+        myPool.close()
+        myPool.join()
+        trialPeaks = np.concatenate([result[0] for result in chunkResults])
+    else:
+        trialPeaks = velocityTrialPeaks(
+            (arrivalTimes, pulsarObject, expectedCounts, velocityTrials, referenceTime)
+        )[0]
+
+    # Cramer-Rao bound for a delay which changes linearly with time:
+    # tau(t) = tau_ref + v (t - t_ref)
+    timeOffsets = arrivalTimes - referenceTime
+    fisherMatrix = (
+        delayFisherInformation(pulsarObject, nBins) *
+        np.array([
+            [nPhotons, np.sum(timeOffsets)],
+            [np.sum(timeOffsets), np.sum(np.square(timeOffsets))]
+        ])
+    )
+    TDOAVelocityCovariance = np.linalg.inv(fisherMatrix)
+
+    # Refine the velocity about the best trial on successively finer grids,
+    # until the grid spacing is smaller than the velocity uncertainty.  The
+    # final estimate is from a quadratic fit of the peak heights about the
+    # best trial of the finest grid.
+    refineTrials = velocityTrials
+    refinePeaks = trialPeaks
+    refineStep = velocityStep
+    bestTrial = np.argmax(refinePeaks)
+    while refineStep > np.sqrt(TDOAVelocityCovariance[1, 1]):
+        refineStep = refineStep / 4
+        refineTrials = refineTrials[bestTrial] + np.arange(-4, 5) * refineStep
+        refinePeaks = velocityTrialPeaks(
+            (arrivalTimes, pulsarObject, expectedCounts, refineTrials, referenceTime)
+        )[0]
+        bestTrial = np.argmax(refinePeaks)
+
+    bestVelocity = refineTrials[bestTrial]
+    if 0 < bestTrial < len(refineTrials) - 1:
+        yMinus, y0, yPlus = refinePeaks[bestTrial - 1:bestTrial + 2]
+        curvature = yMinus - 2*y0 + yPlus
+        if curvature < 0:
+            bestVelocity = (
+                bestVelocity + 0.5 * (yMinus - yPlus) / curvature * refineStep
+            )
+
+    acquisitionDict = acquireTDOA(
+        arrivalTimes,
+        pulsarObject,
+        nBins=nBins,
+        filterOrder=filterOrder,
+        dT=dT,
+        velocity=bestVelocity,
+        referenceTime=referenceTime
+    )
+
+    acquisitionDict['TDOAVar'] = TDOAVelocityCovariance[0, 0]
+    acquisitionDict['velocity'] = bestVelocity
+    acquisitionDict['velocityVar'] = TDOAVelocityCovariance[1, 1]
+    acquisitionDict['TDOAVelocityCovariance'] = TDOAVelocityCovariance
+    acquisitionDict['velocityTrials'] = velocityTrials
+    acquisitionDict['trialPeaks'] = trialPeaks
+    return acquisitionDict
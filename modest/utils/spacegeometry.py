@@ -169,6 +169,8 @@ def dms2rad(d=None, m=None, s=None, dms=None):
     return np.pi * degrees / 180.0
 
 def unitVector2RaDec(unitVector):
+    # unitVector may also be a 3xN array of unit vectors, in which case arrays
+    # of RA and DEC are returned
     D = np.arcsin(unitVector[2])
     cosD = np.cos(D)
     cosRA = unitVector[0]/cosD
@@ -0,0 +1,412 @@
+import unittest
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from context import modest as md
+import numpy as np
+from astropy.io import fits
+from pint import UnitRegistry
+
+
+def unitValue(value, unit):
+    return SimpleNamespace(value=value, unit=unit)
+
+
+class Group(SimpleNamespace):
+    # Like a pypet group, the repr doesn't include the parameter values
+    def __repr__(self):
+        return 'Group'
+
+
+def writeEventsFile(fileName, eventColumns):
+    eventsHDU = fits.BinTableHDU.from_columns([
+        fits.Column(name='time', format='D', unit='s', array=eventColumns['time']),
+        fits.Column(name='x', format='E', unit='pixel', array=eventColumns['x']),
+        fits.Column(name='y', format='E', unit='pixel', array=eventColumns['y']),
+        fits.Column(name='pi', format='J', unit='chan', array=eventColumns['pi'])
+    ])
+    eventsHDU.header['DETNAM'] = 'ACIS-7'
+    eventsHDU.header['OBJECT'] = 'Test object'
+    fits.HDUList([fits.PrimaryHDU(), eventsHDU]).writeto(fileName)
+
+
+def detectorUserData():
+    return SimpleNamespace(detector=Group(
+        photonCoords=SimpleNamespace(
+            x=SimpleNamespace(value='x'), y=SimpleNamespace(value='y')
+        ),
+        energy=SimpleNamespace(
+            key='pi',
+            binPerEnergy=unitValue(14.6, 'electron_volt'),
+            intercept=0
+        ),
+        timeResolution=unitValue(3.2, 's'),
+        TOAstdev=SimpleNamespace(distribution='uniform'),
+        pixelResolution=unitValue(0.492, 'arcsec / pixel'),
+        FOV=unitValue(30, 'arcmin'),
+        area=unitValue(400, 'cm ** 2'),
+        AOAstdev=SimpleNamespace(distribution='uniform'),
+        offsets=SimpleNamespace(
+            x={'ACIS-7': unitValue(4096.5, 'pixel')},
+            y={'ACIS-7': unitValue(4096.5, 'pixel')}
+        ),
+        energyRange=SimpleNamespace(
+            lower=unitValue(2, 'kiloelectron_volt'),
+            upper=unitValue(10, 'kiloelectron_volt')
+        )
+    ))
+
+
+def writeTableFile(fileName, columns, header={}, primaryHeader={}):
+    tableHDU = fits.BinTableHDU.from_columns(columns)
+    for key, value in header.items():
+        tableHDU.header[key] = value
+    primaryHDU = fits.PrimaryHDU()
+    for key, value in primaryHeader.items():
+        primaryHDU.header[key] = value
+    fits.HDUList([primaryHDU, tableHDU]).writeto(fileName)
+
+
+class TestChandraDetector(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.ureg = UnitRegistry()
+        self.userData = detectorUserData()
+
+        np.random.seed(3)
+        self.eventsFileList = []
+        self.eventColumns = []
+        tStart = 1e8
+        for fileIndex in range(3):
+            nEvents = 500 + 100 * fileIndex
+            eventColumns = {
+                'time': tStart + np.sort(np.random.uniform(0, 1000, nEvents)),
+                'x': np.random.uniform(3500, 4700, nEvents).astype(np.float32),
+                'y': np.random.uniform(3500, 4700, nEvents).astype(np.float32),
+                'pi': np.random.randint(1, 1024, nEvents)
+            }
+            tStart = eventColumns['time'][-1]
+            fileName = os.path.join(self.directory, 'events%i_evt2.fits' % fileIndex)
+            writeEventsFile(fileName, eventColumns)
+            self.eventsFileList.append(fileName)
+            self.eventColumns.append(eventColumns)
+        self.allEvents = {
+            key: np.concatenate([columns[key] for columns in self.eventColumns])
+            for key in self.eventColumns[0]
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def detector(self, **kwargs):
+        return md.spacecraft.chandra.ChandraDetector(
+            self.eventsFileList, self.userData, self.ureg, **kwargs
+        )
+
+    def testLoadEvents(self):
+        detector = self.detector()
+        self.assertEqual(detector.photonEventCount, len(self.allEvents['time']))
+        np.testing.assert_array_equal(
+            detector.extractedPhotonEvents['Time'], self.allEvents['time']
+        )
+        np.testing.assert_array_equal(
+            detector.extractedPhotonEvents['x'], self.allEvents['x']
+        )
+        np.testing.assert_array_equal(
+            detector.extractedPhotonEvents['pi'], self.allEvents['pi']
+        )
+        self.assertEqual(detector.targetObject, 'Test object')
+
+        photon = detector.getPhotonMeasurement(10)
+        self.assertEqual(photon['t']['value'], self.allEvents['time'][10])
+        self.assertAlmostEqual(
+            photon['energy']['value'], self.allEvents['pi'][10] * 0.0146
+        )
+
+    def testFilterEvents(self):
+        timeRange = [1e8 + 300, 1e8 + 2000]
+        maxAOA = 2e-4
+        detector = self.detector(
+            filterEnergyRange=True, timeRange=timeRange, maxAOA=maxAOA
+        )
+
+        energy = self.allEvents['pi'] * 0.0146
+        RA = (self.allEvents['x'] - 4096.5) * detector.pixelResolutionX
+        DEC = (self.allEvents['y'] - 4096.5) * detector.pixelResolutionY
+        expectedMask = (
+            (energy >= 2) & (energy <= 10) &
+            (self.allEvents['time'] >= timeRange[0]) &
+            (self.allEvents['time'] <= timeRange[1]) &
+            (np.sqrt(np.square(RA) + np.square(DEC)) <= maxAOA)
+        )
+        self.assertGreater(np.count_nonzero(expectedMask), 0)
+        self.assertEqual(detector.photonEventCount, np.count_nonzero(expectedMask))
+        np.testing.assert_array_equal(
+            detector.extractedPhotonEvents['Time'],
+            self.allEvents['time'][expectedMask]
+        )
+        np.testing.assert_array_equal(
+            detector.extractedPhotonEvents['y'], self.allEvents['y'][expectedMask]
+        )
+
+
+    def testPhotonMeasurements(self):
+        detector = self.detector()
+        photonBatch = detector.getPhotonMeasurements(100, 300)
+        self.assertEqual(len(photonBatch), 200)
+        for batchIndex in [0, 57, 199]:
+            self.assertEqual(
+                photonBatch[batchIndex],
+                detector.getPhotonMeasurement(100 + batchIndex)
+            )
+
+        chunks = list(detector.photonMeasurementChunks(chunkSize=256))
+        self.assertEqual(
+            [len(chunk) for chunk in chunks],
+            [256] * 7 + [detector.photonEventCount - 7 * 256]
+        )
+        np.testing.assert_array_equal(
+            np.concatenate([chunk.RA for chunk in chunks]),
+            detector.getPhotonMeasurements().RA
+        )
+        self.assertEqual(
+            [len(chunk) for chunk in detector.photonMeasurementChunks(100, 50, 300)],
+            [100, 100, 50]
+        )
+
+
+class TestChandraObservationCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.ureg = UnitRegistry()
+        self.userData = detectorUserData()
+        self.userData.filesAndDirs = SimpleNamespace(
+            observationID=SimpleNamespace(value=1234),
+            baseDirectory=SimpleNamespace(value=self.directory + '/'),
+            chandraDirectory=SimpleNamespace(value='chandra/')
+        )
+        observationDirectory = os.path.join(self.directory, 'chandra', '01234')
+        os.makedirs(os.path.join(observationDirectory, 'primary'))
+        os.makedirs(os.path.join(observationDirectory, 'supporting'))
+
+        np.random.seed(4)
+        nEvents = 1000
+        writeEventsFile(
+            os.path.join(observationDirectory, 'primary', 'obs_evt2.fits'),
+            {
+                'time': 1e8 + np.sort(np.random.uniform(0, 1000, nEvents)),
+                'x': np.random.uniform(3500, 4700, nEvents).astype(np.float32),
+                'y': np.random.uniform(3500, 4700, nEvents).astype(np.float32),
+                'pi': np.random.randint(1, 1024, nEvents)
+            }
+        )
+
+        tableTime = np.linspace(1e8 - 100, 1e8 + 1100, 301)
+        writeTableFile(
+            os.path.join(observationDirectory, 'primary', 'obs_asol1.fits'),
+            [
+                fits.Column(name='time', format='D', unit='s', array=tableTime),
+                fits.Column(name='ra', format='D', unit='deg', array=np.linspace(10, 10.1, 301)),
+                fits.Column(name='dec', format='D', unit='deg', array=np.linspace(-5, -5.1, 301)),
+                fits.Column(name='roll', format='D', unit='deg', array=np.linspace(30, 31, 301))
+            ]
+        )
+        writeTableFile(
+            os.path.join(observationDirectory, 'supporting', 'obs_gdat1.fits'),
+            [
+                fits.Column(name='time', format='D', unit='s', array=tableTime),
+                fits.Column(
+                    name='scratcor', format='3D', unit='arcsec / s',
+                    array=np.random.normal(size=[301, 3])
+                )
+            ]
+        )
+        writeTableFile(
+            os.path.join(observationDirectory, 'primary', 'obs_eph1.fits'),
+            [fits.Column(name='time', format='D', unit='s', array=tableTime)] +
+            [
+                fits.Column(
+                    name=columnName, format='D', unit=unit,
+                    array=np.random.uniform(-1e8, 1e8, 301)
+                )
+                for columnName, unit in [
+                    ('X', 'm'), ('Y', 'm'), ('Z', 'm'),
+                    ('Vx', 'm/s'), ('Vy', 'm/s'), ('Vz', 'm/s')
+                ]
+            ],
+            header={'MJDREF': 50814.0, 'TIMEZERO': 0.0},
+            primaryHeader={'TIMEUNIT': 's'}
+        )
+        self.cacheDirectory = os.path.join(self.directory, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testObservationCache(self):
+        chandra = md.spacecraft.Chandra(self.userData, self.ureg)
+        self.assertFalse(os.path.isdir(self.cacheDirectory))
+
+        # The first load writes the cache, and the second reads it
+        md.spacecraft.Chandra(
+            self.userData, self.ureg, cacheDirectory=self.cacheDirectory
+        )
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.cacheDirectory, 'observation.p'))
+        )
+        cachedChandra = md.spacecraft.Chandra(
+            self.userData, self.ureg, cacheDirectory=self.cacheDirectory
+        )
+        self.assertIsInstance(
+            cachedChandra.detector.extractedPhotonEvents['Time'], np.memmap
+        )
+
+        self.assertEqual(cachedChandra.tStart, chandra.tStart)
+        self.assertEqual(
+            cachedChandra.detector.photonEventCount,
+            chandra.detector.photonEventCount
+        )
+        for photonKey in ['t', 'RA', 'DEC', 'energy']:
+            np.testing.assert_array_equal(
+                cachedChandra.detector.calibratedPhotonEvents[photonKey],
+                chandra.detector.calibratedPhotonEvents[photonKey]
+            )
+        self.assertEqual(
+            cachedChandra.detector.getPhotonMeasurement(5),
+            chandra.detector.getPhotonMeasurement(5)
+        )
+
+        t = np.linspace(1e8, 1e8 + 1000, 7)
+        np.testing.assert_array_equal(
+            cachedChandra.dynamics.omega(t), chandra.dynamics.omega(t)
+        )
+        np.testing.assert_array_equal(
+            cachedChandra.dynamics.attitudeMatrix(t),
+            chandra.dynamics.attitudeMatrix(t)
+        )
+        np.testing.assert_array_equal(
+            cachedChandra.dynamics.acceleration(t),
+            chandra.dynamics.acceleration(t)
+        )
+        np.testing.assert_allclose(
+            chandra.dynamics.chandraRA(1e8 - 100), 10 * np.pi / 180
+        )
+        np.testing.assert_allclose(
+            chandra.dynamics.chandraVX(t[0]),
+            chandra.dynamics.ephemerisTable['VX'][25],
+        )
+
+        # Different load options don't use the cache
+        filteredChandra = md.spacecraft.Chandra(
+            self.userData, self.ureg,
+            cacheDirectory=self.cacheDirectory,
+            filterEnergyRange=True
+        )
+        self.assertNotIsInstance(
+            filteredChandra.detector.extractedPhotonEvents['Time'], np.memmap
+        )
+        self.assertLess(
+            filteredChandra.detector.photonEventCount,
+            chandra.detector.photonEventCount
+        )
+
+        # Replacing the cache doesn't touch the arrays mapped by the earlier
+        # load, and the arrays of the replaced cache are removed
+        np.testing.assert_array_equal(
+            cachedChandra.detector.calibratedPhotonEvents['t'],
+            chandra.detector.calibratedPhotonEvents['t']
+        )
+        self.assertEqual(
+            len([
+                fileName for fileName in os.listdir(self.cacheDirectory)
+                if fileName.startswith('arrays.')
+            ]),
+            1
+        )
+        self.assertIsInstance(
+            md.spacecraft.Chandra(
+                self.userData, self.ureg,
+                cacheDirectory=self.cacheDirectory,
+                filterEnergyRange=True
+            ).detector.extractedPhotonEvents['Time'],
+            np.memmap
+        )
+
+        # Different detector settings don't use the cache either
+        self.userData.detector.energy.binPerEnergy = unitValue(7.3, 'electron_volt')
+        rebinnedChandra = md.spacecraft.Chandra(
+            self.userData, self.ureg,
+            cacheDirectory=self.cacheDirectory,
+            filterEnergyRange=True
+        )
+        self.assertNotIsInstance(
+            rebinnedChandra.detector.extractedPhotonEvents['Time'], np.memmap
+        )
+        self.assertEqual(rebinnedChandra.detector.binsPerEnergy, 7.3e-3)
+
+    def testPlanetTable(self):
+        dynamics = md.spacecraft.Chandra(self.userData, self.ureg).dynamics
+        spacegeometry = md.utils.spacegeometry
+        t = np.linspace(1e8 - 50, 1e8 + 1050, 5)
+        timeObject = dynamics.chandraTimeToTimeScaleObj(t)
+
+        chandraPosition = np.array([
+            dynamics.chandraX(t), dynamics.chandraY(t), dynamics.chandraZ(t)
+        ])
+        np.testing.assert_allclose(
+            dynamics.position(t),
+            spacegeometry.earthObj.at(timeObject).position.km + chandraPosition,
+            rtol=0, atol=1e-2
+        )
+        chandraVelocity = np.array([
+            dynamics.chandraVX(t), dynamics.chandraVY(t), dynamics.chandraVZ(t)
+        ])
+        np.testing.assert_allclose(
+            dynamics.velocity(t),
+            spacegeometry.earthObj.at(timeObject).velocity.km_per_s + chandraVelocity,
+            rtol=1e-8
+        )
+        np.testing.assert_array_equal(dynamics.position(t[1]), dynamics.position(t)[:, 1])
+
+        # Times are converted to a single float Julian date, which limits the
+        # direct evaluation of the ephemeris to about 1 m
+        G = 6.67408e-11
+        for timeIndex in range(len(t)):
+            position = dynamics.position(t[timeIndex])
+            expectedAcceleration = np.zeros(3)
+            expectedGradient = np.zeros([3, 3])
+            for planetName in dynamics.planetList:
+                GM = G * md.spacecraft.chandra.planetaryMasses[planetName]
+                relativePosition = (
+                    spacegeometry.planets[planetName].at(
+                        dynamics.chandraTimeToTimeScaleObj(t[timeIndex])
+                    ).position.km - position
+                ) * 1000.0
+                relativeRange = np.linalg.norm(relativePosition)
+                expectedAcceleration += (
+                    GM * relativePosition / np.power(relativeRange, 3) / 1000.0
+                )
+                expectedGradient += GM * (
+                    3 * np.outer(relativePosition, relativePosition) /
+                    np.power(relativeRange, 5) -
+                    np.eye(3) / np.power(relativeRange, 3)
+                )
+            np.testing.assert_allclose(
+                dynamics.acceleration(t[timeIndex]), expectedAcceleration,
+                rtol=0, atol=1e-7 * np.linalg.norm(expectedAcceleration)
+            )
+            np.testing.assert_allclose(
+                dynamics.acceleration(t)[:, timeIndex], expectedAcceleration,
+                rtol=0, atol=1e-7 * np.linalg.norm(expectedAcceleration)
+            )
+            np.testing.assert_allclose(
+                dynamics.gradient(t)[timeIndex], expectedGradient,
+                rtol=0, atol=1e-7 * np.linalg.norm(expectedGradient)
+            )
+            np.testing.assert_allclose(
+                dynamics.gradient(t[timeIndex]), expectedGradient,
+                rtol=0, atol=1e-7 * np.linalg.norm(expectedGradient)
+            )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+import os
+from context import modest as md
+import numpy as np
+
+profileFile = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    'pulsarData/profiles/B1821-24.txt'
+)
+
+
+def buildPulsar(name, period, RA, DEC, flux):
+    return md.signals.PeriodicXRaySource(
+        profile=profileFile,
+        avgPhotonFlux=flux,
+        pulsedFraction=0.8,
+        phaseDerivatives={0: 0, 1: 1.0/period},
+        RA=RA,
+        DEC=DEC,
+        name=name
+    )
+
+
+class TestCorrelationBank(unittest.TestCase):
+    def setUp(self):
+        self.pulsars = [
+            buildPulsar('A', 0.00305, 1.0, 0.3, 5.0),
+            buildPulsar('B', 0.0041, 2.0, -0.5, 3.0)
+        ]
+        self.filterOrders = [25, 30]
+        self.dT = [
+            pulsar.pulsarPeriod/(order + 1)
+            for pulsar, order in zip(self.pulsars, self.filterOrders)
+        ]
+
+    def testMatchesIndividualCorrelationVectors(self):
+        # A bank of K signals should give the same estimates as K separate
+        # CorrelationVector substates
+        separateFilter = md.ModularFilter()
+        correlationVectors = []
+        for pulsar, order, dT in zip(self.pulsars, self.filterOrders, self.dT):
+            correlationVectors.append(
+                md.substates.CorrelationVector(
+                    pulsar, order, dT,
+                    processNoise=1e-10,
+                    velocityNoiseScaleFactor=1
+                )
+            )
+            separateFilter.addStates(pulsar.name, correlationVectors[-1])
+            separateFilter.addSignalSource(pulsar.name, pulsar)
+
+        bankFilter = md.ModularFilter()
+        bank = md.substates.CorrelationBank(
+            self.pulsars, self.filterOrders, self.dT, processNoise=1e-10
+        )
+        bankFilter.addStates('bank', bank)
+        for pulsar in self.pulsars:
+            bankFilter.addSignalSource(pulsar.name, pulsar)
+
+        np.random.seed(0)
+        dynamics = {
+            'velocity': {'value': np.array([3., -2., 1.]), 'var': np.eye(3)*0.1}
+        }
+        t = 0
+        for photonIndex in range(100):
+            dT = np.random.exponential(0.01)
+            t = t + dT
+            source = self.pulsars[photonIndex % 2].name
+            for myFilter in [separateFilter, bankFilter]:
+                myFilter.timeUpdateEKF(dT, dynamics=dynamics)
+                myFilter.measurementUpdateEKF(
+                    {'t': {'value': t, 'var': 1e-12}}, source
+                )
+
+        np.testing.assert_allclose(
+            bankFilter.getGlobalStateVector(),
+            separateFilter.getGlobalStateVector(),
+            rtol=1e-9
+        )
+        np.testing.assert_allclose(
+            bank.signalTDOA,
+            [vector.signalTDOA for vector in correlationVectors],
+            rtol=1e-9
+        )
+        np.testing.assert_allclose(
+            bank.TDOAVar,
+            [vector.TDOAVar for vector in correlationVectors],
+            rtol=1e-9
+        )
+
+    def testOnlyAssociatedSliceIsUpdated(self):
+        bankFilter = md.ModularFilter()
+        bank = md.substates.CorrelationBank(
+            self.pulsars, self.filterOrders, self.dT
+        )
+        bankFilter.addStates('bank', bank)
+        bankFilter.addSignalSource('A', self.pulsars[0])
+
+        bankFilter.timeUpdateEKF(1e-3)
+        before = np.copy(bank.correlationVector(self.pulsars[1]))
+        bankFilter.measurementUpdateEKF({'t': {'value': 1e-3, 'var': 1e-12}}, 'A')
+
+        np.testing.assert_array_equal(
+            bank.correlationVector(self.pulsars[1]), before
+        )
+        self.assertFalse(
+            np.allclose(
+                bank.correlationVector(0),
+                bank.stateVectorHistory[-2]['stateVector'][0:25]
+            )
+        )
+
+
+    def testJPDAF(self):
+        # The sources find the bank's TDOA variance even though the bank is
+        # not registered under their correlation state name
+        bankFilter = md.ModularFilter()
+        bank = md.substates.CorrelationBank(
+            self.pulsars, self.filterOrders, self.dT, TDOAVar=1e-8
+        )
+        bankFilter.addStates('bank', bank)
+        bankFilter.addSignalSource(
+            'background', md.signals.UniformNoiseXRaySource(photonFlux=1.0)
+        )
+        for pulsar in self.pulsars:
+            bankFilter.addSignalSource(pulsar.name, pulsar)
+
+        measurement = {'t': {'value': 1e-3, 'var': 1e-12}}
+        stateDict = bankFilter.subStates
+        self.assertNotEqual(
+            self.pulsars[0].computeAssociationProbability(measurement, stateDict),
+            self.pulsars[0].computeAssociationProbability(measurement, {})
+        )
+
+        bankFilter.timeUpdateEKF(1e-3)
+        before = np.copy(bank.getStateVector()['stateVector'])
+        bankFilter.measurementUpdateJPDAF(measurement)
+        self.assertFalse(
+            np.allclose(bank.getStateVector()['stateVector'], before)
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+## Benchmark of the deep internal navigation filter time update matrices.
+#
+# Compares CorrelationVector.buildDeepTimeUpdateMatrices against a
+# row-by-row np.roll construction of the same matrices, for a range of filter
+# orders, and checks that both give the same F and L.
+import timeit
+from context import modest as md
+import numpy as np
+
+profile = 'pulsarData/profiles/B1821-24.txt'
+pulsarPeriod = 0.00305
+
+myPulsar = md.signals.PeriodicXRaySource(
+    profile=profile,
+    avgPhotonFlux=5.0,
+    pulsedFraction=0.8,
+    phaseDerivatives={0: 0, 1: 1.0/pulsarPeriod},
+    RA=1.0,
+    DEC=0.3,
+    name='benchmark'
+)
+
+
+def rolledDeepFL(correlation, filterOrder, dT, h):
+    # Reference construction: one np.roll per row, one sincDiff call per tap
+    binSize = correlation.xAxis[1]
+    indexDiff = dT/binSize
+    v = correlation.stateVector[filterOrder]
+    peakShift = v * indexDiff
+    halfLength = int(np.ceil(filterOrder/2))
+    if np.mod(filterOrder, 2) == 0:
+        baseVec = np.linspace(1 - halfLength, halfLength, filterOrder)
+    else:
+        baseVec = np.linspace(1 - halfLength, halfLength - 1, filterOrder)
+    sincBase = np.roll(np.sinc(baseVec), 1 - halfLength)
+    diffBase = np.roll(
+        [correlation.sincDiff(x + peakShift) for x in baseVec], 1 - halfLength
+    )
+    diffBase0 = np.roll(
+        [correlation.sincDiff(x) for x in baseVec], 1 - halfLength
+    )
+    F = np.zeros([filterOrder + 1, filterOrder + 1])
+    L = np.zeros(filterOrder + 1)
+    for i in range(filterOrder):
+        F[i, 0:filterOrder] = np.roll(sincBase, i)
+        F[i, filterOrder] = np.roll(diffBase, i).dot(h) * indexDiff
+        L[i] = np.roll(diffBase0, i).dot(h) * np.square(indexDiff)/2
+    F[filterOrder, filterOrder] = 1
+    L[filterOrder] = dT
+    return F, L
+
+
+print('filterOrder    roll (ms)    vectorized (ms)    speedup')
+for filterOrder in [25, 50, 100, 200, 400]:
+    correlation = md.substates.CorrelationVector(
+        myPulsar,
+        filterOrder,
+        pulsarPeriod/(filterOrder + 1),
+        internalNavFilter='deep',
+        vInitial={'value': 1e-6, 'var': 1e-10}
+    )
+    h = np.random.uniform(size=filterOrder)
+    dT = 1e-3
+
+    FRef, LRef = rolledDeepFL(correlation, filterOrder, dT, h)
+    FLDict = correlation.buildDeepTimeUpdateMatrices(dT, None, h)
+    np.testing.assert_allclose(FLDict['F'], FRef, rtol=1e-10, atol=1e-14)
+    np.testing.assert_allclose(FLDict['L'], LRef, rtol=1e-10, atol=1e-14)
+
+    nRuns = 20
+    rollTime = timeit.timeit(
+        lambda: rolledDeepFL(correlation, filterOrder, dT, h), number=nRuns
+    ) / nRuns
+    vectorTime = timeit.timeit(
+        lambda: correlation.buildDeepTimeUpdateMatrices(dT, None, h),
+        number=nRuns
+    ) / nRuns
+    print(
+        '%11i    %9.3f    %15.3f    %7.1fx'
+        % (filterOrder, rollTime*1e3, vectorTime*1e3, rollTime/vectorTime)
+    )
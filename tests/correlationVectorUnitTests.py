@@ -0,0 +1,73 @@
+import unittest
+import os
+from context import modest as md
+import numpy as np
+
+profileFile = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    'pulsarData/profiles/B1821-24.txt'
+)
+
+
+class TestCorrelationVector(unittest.TestCase):
+    def setUp(self):
+        self.pulsar = md.signals.PeriodicXRaySource(
+            profile=profileFile,
+            avgPhotonFlux=20.0,
+            pulsedFraction=0.8,
+            phaseDerivatives={0: 0, 1: 1.0/0.00305},
+            RA=1.0,
+            DEC=0.3,
+            name='A'
+        )
+        self.trueTDOA = 0.0011
+
+        # Photon arrival times generated by thinning
+        np.random.seed(3)
+        tMax = 40
+        candidates = np.cumsum(
+            np.random.exponential(
+                1/self.pulsar.peakAmplitude,
+                int(tMax * self.pulsar.peakAmplitude * 1.2)
+            )
+        )
+        candidates = candidates[candidates < tMax]
+        signal = np.array(
+            [self.pulsar.getSignal(t + self.trueTDOA) for t in candidates]
+        )
+        self.arrivalTimes = candidates[
+            np.random.uniform(size=len(candidates)) <
+            signal/self.pulsar.peakAmplitude
+        ]
+
+    def testPeakLock(self):
+        correlation = md.substates.CorrelationVector(
+            self.pulsar,
+            40,
+            self.pulsar.pulsarPeriod/41,
+            navProcessNoise=1e-20,
+            velocityNoiseScaleFactor=1
+        )
+        myFilter = md.ModularFilter()
+        myFilter.addStates('A', correlation)
+        myFilter.addSignalSource('A', self.pulsar)
+
+        lastT = 0
+        for t in self.arrivalTimes:
+            myFilter.timeUpdateEKF(t - lastT)
+            lastT = t
+            myFilter.measurementUpdateEKF({'t': {'value': t, 'var': 1e-12}}, 'A')
+
+        # The filter should reach peak lock on the true TDOA (modulo one
+        # pulsar period)
+        self.assertTrue(correlation.peakLock)
+        self.assertLess(
+            np.abs(
+                np.mod(correlation.signalTDOA, self.pulsar.pulsarPeriod) -
+                self.trueTDOA
+            ),
+            10 * np.sqrt(correlation.TDOAVar)
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+import os
+import tempfile
+from context import modest as md
+import numpy as np
+
+profileFile = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    'pulsarData/profiles/B1821-24.txt'
+)
+
+
+class TestEpochFolding(unittest.TestCase):
+    def setUp(self):
+        self.pulsar = md.signals.PeriodicXRaySource(
+            profile=profileFile,
+            avgPhotonFlux=20.0,
+            pulsedFraction=0.8,
+            phaseDerivatives={0: 0.1, 1: 1.0/0.00305, 2: -1e-9},
+            RA=1.0,
+            DEC=0.3,
+            name='A'
+        )
+
+        def rangeFunction(t):
+            return 3000.0 * np.sin(t/30.0)
+        self.rangeFunction = rangeFunction
+
+        np.random.seed(7)
+        self.tMax = 300
+        self.arrivalTimes = self.pulsar.generateArrivalTimesInverseCDF(
+            self.tMax, rangeFunction=rangeFunction
+        )
+
+    def testFoldProfile(self):
+        nBins = 32
+        foldResult = md.utils.epochFolding.foldProfile(
+            self.arrivalTimes,
+            self.pulsar,
+            nBins=nBins,
+            rangeFunction=self.rangeFunction
+        )
+        self.assertEqual(foldResult['nPhotons'], len(self.arrivalTimes))
+        self.assertEqual(np.sum(foldResult['counts']), len(self.arrivalTimes))
+
+        expectedCounts = (
+            np.diff(self.pulsar.phaseFractionIntegral(foldResult['binEdges'])) *
+            self.pulsar.scaleFactor * self.tMax / self.pulsar.pulsarPeriod +
+            self.pulsar.backgroundCountRate * self.tMax / nBins
+        )
+        chiSquare = np.sum(
+            np.square(foldResult['counts'] - expectedCounts)/expectedCounts
+        )
+        self.assertLess(chiSquare, 70)
+
+        # Chunks spread over processes give the same histogram
+        pooledResult = md.utils.epochFolding.foldProfile(
+            self.arrivalTimes,
+            self.pulsar,
+            nBins=nBins,
+            rangeFunction=self.rangeFunction,
+            chunkSize=1000,
+            processes=2
+        )
+        np.testing.assert_array_equal(
+            pooledResult['counts'], foldResult['counts']
+        )
+
+    def testWeightsAndEnergy(self):
+        energies = np.random.uniform(0, 10, len(self.arrivalTimes))
+        photonBatch = md.utils.PhotonBatch.fromColumns({
+            't': {'value': self.arrivalTimes},
+            'energy': {'value': energies}
+        })
+        energyResult = md.utils.epochFolding.foldProfile(
+            photonBatch, self.pulsar, nBins=16, energyRange=[2, 5]
+        )
+        weightResult = md.utils.epochFolding.foldProfile(
+            self.arrivalTimes,
+            self.pulsar,
+            nBins=16,
+            weights=(energies >= 2) & (energies <= 5)
+        )
+        np.testing.assert_array_equal(
+            energyResult['counts'], weightResult['counts']
+        )
+        self.assertEqual(
+            energyResult['nPhotons'], np.sum((energies >= 2) & (energies <= 5))
+        )
+        with self.assertRaises(ValueError):
+            md.utils.epochFolding.foldProfile(
+                self.arrivalTimes, self.pulsar, energyRange=[2, 5]
+            )
+
+    def testSaveProfile(self):
+        foldResult = md.utils.epochFolding.foldProfile(
+            self.arrivalTimes,
+            self.pulsar,
+            nBins=64,
+            rangeFunction=self.rangeFunction
+        )
+        tempDir = tempfile.mkdtemp()
+        fileName = os.path.join(tempDir, 'foldedProfile.txt')
+        md.utils.epochFolding.saveProfile(fileName, foldResult)
+
+        foldedPulsar = md.signals.PeriodicXRaySource(
+            profile=fileName,
+            avgPhotonFlux=20.0,
+            pulsedFraction=0.8,
+            phaseDerivatives={0: 0, 1: 1.0/0.00305},
+            name='folded',
+            RA=1.0,
+            DEC=0.3,
+            movePeakToZero=False
+        )
+        counts = foldResult['counts']
+        np.testing.assert_allclose(
+            foldedPulsar.profile[:-1],
+            (counts - np.min(counts))/(np.max(counts) - np.min(counts))
+        )
+        os.remove(fileName)
+        os.rmdir(tempDir)
+
+
+if __name__ == '__main__':
+    unittest.main()
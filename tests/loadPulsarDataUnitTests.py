@@ -0,0 +1,118 @@
+import unittest
+import os
+import shutil
+import tempfile
+from context import modest as md
+import numpy as np
+
+pulsarDataDir = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    'pulsarData'
+)
+
+
+class TestLoadPulsarData(unittest.TestCase):
+    def setUp(self):
+        # Work on a copy of the pulsar data, with the cache in a temporary
+        # directory
+        self.tempDir = tempfile.mkdtemp()
+        self.pulsarDir = os.path.join(self.tempDir, 'pulsarData') + '/'
+        shutil.copytree(pulsarDataDir, self.pulsarDir)
+        self.cacheDirectory = os.path.join(self.tempDir, 'cache')
+
+    def pulsarFiles(self):
+        return sorted([
+            fileName for fileName in os.listdir(self.cacheDirectory)
+            if fileName.startswith('pulsar.')
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def testPulsarCache(self):
+        pulsarDict = md.utils.loadPulsarData(
+            pulsarDir=self.pulsarDir, detectorArea=100
+        )
+        cachedDict = md.utils.loadPulsarData(
+            pulsarDir=self.pulsarDir, detectorArea=100, useCache=True,
+            cacheDirectory=self.cacheDirectory
+        )
+        self.assertEqual(sorted(cachedDict), sorted(pulsarDict))
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.cacheDirectory, 'catalog.p'))
+        )
+
+        # Pulsars are only built when requested
+        self.assertEqual(len(cachedDict.pulsars), 0)
+        self.assertEqual(self.pulsarFiles(), [])
+        pulsar = cachedDict['B1821-24']
+        self.assertIs(cachedDict['B1821-24'], pulsar)
+        self.assertEqual(list(cachedDict.pulsars), ['B1821-24'])
+        self.assertEqual(len(self.pulsarFiles()), 1)
+
+        # A second load reads the pulsar from the cache
+        reloadedDict = md.utils.loadPulsarData(
+            pulsarDir=self.pulsarDir, detectorArea=100, useCache=True,
+            cacheDirectory=self.cacheDirectory
+        )
+        reloadedPulsar = reloadedDict['B1821-24']
+        self.assertNotEqual(reloadedPulsar.signalID(), pulsar.signalID())
+
+        t = np.random.uniform(0, 100, 100)
+        for otherPulsar in [pulsar, reloadedPulsar]:
+            np.testing.assert_array_equal(
+                otherPulsar.getSignal(t), pulsarDict['B1821-24'].getSignal(t)
+            )
+            self.assertEqual(otherPulsar.RaDec(), pulsarDict['B1821-24'].RaDec())
+            self.assertEqual(otherPulsar.flux, pulsarDict['B1821-24'].flux)
+
+        # A different detector area gives a different pulsar
+        # Building another pulsar only writes that pulsar's file
+        pulsarFile = os.path.join(self.cacheDirectory, self.pulsarFiles()[0])
+        pulsarFileMTime = os.stat(pulsarFile).st_mtime_ns
+        otherAreaPulsar = md.utils.loadPulsarData(
+            pulsarDir=self.pulsarDir, detectorArea=1, useCache=True,
+            cacheDirectory=self.cacheDirectory
+        )['B1821-24']
+        self.assertAlmostEqual(otherAreaPulsar.flux * 100, pulsar.flux)
+        self.assertEqual(len(self.pulsarFiles()), 2)
+        self.assertEqual(os.stat(pulsarFile).st_mtime_ns, pulsarFileMTime)
+
+        # Only the requested names are loaded
+        namedDict = md.utils.loadPulsarData(
+            pulsarDir=self.pulsarDir,
+            loadPulsarNames=['B1937+21'],
+            useCache=True,
+            cacheDirectory=self.cacheDirectory
+        )
+        self.assertEqual(list(namedDict), ['B1937+21'])
+
+    def testDefaultCacheDirectory(self):
+        # By default the cache is in the user cache directory, not next to
+        # the catalog
+        userCacheDirectory = os.path.join(self.tempDir, 'userCache')
+        oldCacheHome = os.environ.get('XDG_CACHE_HOME')
+        os.environ['XDG_CACHE_HOME'] = userCacheDirectory
+        try:
+            cachedDict = md.utils.loadPulsarData(
+                pulsarDir=self.pulsarDir, useCache=True
+            )
+        finally:
+            if oldCacheHome is None:
+                del os.environ['XDG_CACHE_HOME']
+            else:
+                os.environ['XDG_CACHE_HOME'] = oldCacheHome
+        self.assertEqual(
+            os.path.dirname(cachedDict.cacheDirectory),
+            os.path.join(userCacheDirectory, 'modest')
+        )
+        self.assertTrue(
+            os.path.isfile(os.path.join(cachedDict.cacheDirectory, 'catalog.p'))
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.pulsarDir)), sorted(os.listdir(pulsarDataDir))
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
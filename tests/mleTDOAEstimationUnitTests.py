@@ -0,0 +1,99 @@
+import unittest
+import os
+from context import modest as md
+import numpy as np
+
+profileFile = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    'pulsarData/profiles/B1821-24.txt'
+)
+
+
+class TestMLETDOAEstimation(unittest.TestCase):
+    def setUp(self):
+        self.pulsar = md.signals.PeriodicXRaySource(
+            profile=profileFile,
+            avgPhotonFlux=20.0,
+            pulsedFraction=0.8,
+            phaseDerivatives={0: 0, 1: 1.0/0.00305},
+            RA=1.0,
+            DEC=0.3,
+            name='A'
+        )
+        self.trueTDOA = 0.0011
+
+        # Photon arrival times generated by thinning
+        np.random.seed(6)
+        tMax = 100
+        candidates = np.cumsum(
+            np.random.exponential(
+                1/self.pulsar.peakAmplitude,
+                int(tMax * self.pulsar.peakAmplitude * 1.2)
+            )
+        )
+        candidates = candidates[candidates < tMax]
+        self.arrivalTimes = candidates[
+            np.random.uniform(size=len(candidates)) <
+            self.pulsar.getSignal(candidates + self.trueTDOA) /
+            self.pulsar.peakAmplitude
+        ]
+
+    def testGridLikelihood(self):
+        timeOffsets = np.linspace(0, self.pulsar.pulsarPeriod, 7)
+        windowLength = self.pulsar.pulsarPeriod/20
+        photons = self.arrivalTimes[0:100]
+        expectedLikelihood = [
+            np.sum(np.log([
+                self.pulsar.signalIntegral(t + offset, t + offset + windowLength)
+                for t in photons
+            ]))
+            for offset in timeOffsets
+        ]
+        np.testing.assert_allclose(
+            md.utils.mleTDOAEstimation.gridLogLikelihood(
+                photons, self.pulsar, timeOffsets, windowLength, chunkSize=30
+            ),
+            expectedLikelihood,
+            rtol=1e-10
+        )
+
+    def testEstimateTDOA(self):
+        maxMLEResolution = 1.0/1000
+        tolerance = 3 * maxMLEResolution * self.pulsar.pulsarPeriod
+        estimate = md.utils.mleTDOAEstimation.estimateTDOA(
+            self.arrivalTimes, self.pulsar, maxMLEResolution=maxMLEResolution
+        )
+        self.assertLess(np.abs(estimate - self.trueTDOA), tolerance)
+
+        # Photon measurement dicts, small chunks and a process pool all give
+        # the same estimate
+        photons = [{'t': {'value': t}} for t in self.arrivalTimes]
+        self.assertEqual(
+            md.utils.mleTDOAEstimation.estimateTDOA(
+                photons, self.pulsar, maxMLEResolution=maxMLEResolution
+            ),
+            estimate
+        )
+        self.assertEqual(
+            md.utils.mleTDOAEstimation.estimateTDOA(
+                self.arrivalTimes,
+                self.pulsar,
+                maxMLEResolution=maxMLEResolution,
+                chunkSize=500,
+                processes=2
+            ),
+            estimate
+        )
+
+        # FFT coarse stage, which should not bias the estimate
+        for coarseBins in [16, 64]:
+            coarseEstimate = md.utils.mleTDOAEstimation.estimateTDOA(
+                self.arrivalTimes,
+                self.pulsar,
+                maxMLEResolution=maxMLEResolution,
+                coarseBins=coarseBins
+            )
+            self.assertLess(np.abs(coarseEstimate - self.trueTDOA), tolerance)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+import unittest
+import os
+from context import modest as md
+import numpy as np
+
+profileFile = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    'pulsarData/profiles/B1821-24.txt'
+)
+
+
+def initialState(biasState):
+    if biasState:
+        return {
+            't': 0,
+            'stateVector': np.array([0.0, 1e-3, 0.0]),
+            'covariance': np.diag([1e-4, 1e-6, 1e-4]),
+            'aPriori': True,
+            'stateVectorID': -1
+        }
+    return {
+        't': 0,
+        'stateVector': np.array([0.0, 1e-3]),
+        'covariance': np.diag([1e-4, 1e-6]),
+        'aPriori': True,
+        'stateVectorID': -1
+    }
+
+
+def buildModularFilter(biasState):
+    myFilter = md.ModularFilter()
+    myFilter.addStates(
+        'oneDPositionVelocity',
+        md.substates.oneDimensionalPositionVelocity.oneDPositionVelocity(
+            'oneDPositionVelocity',
+            initialState(biasState),
+            biasState=biasState,
+            biasStateTimeConstant=0.5,
+            biasStateProcessNoiseVar=1e-6,
+        )
+    )
+    myFilter.addSignalSource(
+        'oneDPositionVelocity',
+        md.signals.oneDimensionalObject.oneDObjectMeasurement(
+            'oneDPositionVelocity'
+        )
+    )
+    myFilter.addSignalSource('', None)
+    return myFilter
+
+
+def buildKernel(biasState):
+    return md.substates.oneDimensionalPositionVelocity.oneDPositionVelocityFilter(
+        'oneDPositionVelocity',
+        initialState(biasState),
+        biasState=biasState,
+        biasStateTimeConstant=0.5,
+        biasStateProcessNoiseVar=1e-6,
+    )
+
+
+class TestOneDPositionVelocityFilter(unittest.TestCase):
+    def compareFilters(self, biasState):
+        myFilter = buildModularFilter(biasState)
+        kernel = buildKernel(biasState)
+        navState = myFilter.subStates['oneDPositionVelocity']['stateObject']
+        kernelState = kernel.subStates['oneDPositionVelocity']['stateObject']
+
+        np.random.seed(1)
+        for step in range(200):
+            dT = np.random.exponential(0.01)
+            dynamics = {
+                'oneDPositionVelocityacceleration': {
+                    'value': np.random.normal(scale=1e-3), 'var': 1e-8
+                }
+            }
+            myFilter.timeUpdateEKF(dT, dynamics=dynamics)
+            kernel.timeUpdateEKF(dT, dynamics=dynamics)
+
+            if step % 3 == 0:
+                measurement = {
+                    'position': {
+                        'value': np.random.normal(scale=1e-2), 'var': 1e-4
+                    }
+                }
+                sourceName = 'oneDPositionVelocity'
+            elif step % 3 == 1:
+                measurement = {
+                    'position': {
+                        'value': np.random.normal(scale=1e-2), 'var': 1e-4
+                    },
+                    'velocity': {
+                        'value': np.random.normal(scale=1e-3), 'var': 1e-6
+                    }
+                }
+                sourceName = 'oneDPositionVelocity'
+            else:
+                # Only the artificial bias measurement (if any) is applied
+                measurement = {}
+                sourceName = ''
+            myFilter.measurementUpdateEKF(dict(measurement), sourceName)
+            kernel.measurementUpdateEKF(dict(measurement), sourceName)
+
+            # The closed-form updates agree with the generic matrix form to
+            # within rounding error
+            np.testing.assert_allclose(
+                kernel.getStateVector()['stateVector'],
+                myFilter.getGlobalStateVector(),
+                rtol=1e-9, atol=1e-15
+            )
+            np.testing.assert_allclose(
+                kernel.covariance().value,
+                myFilter.covarianceMatrix.value,
+                rtol=1e-9, atol=1e-20
+            )
+            np.testing.assert_allclose(
+                [
+                    kernelState.currentPosition, kernelState.currentVelocity,
+                    kernelState.positionVar, kernelState.velocityVar
+                ],
+                [
+                    navState.currentPosition, navState.currentVelocity,
+                    navState.positionVar, navState.velocityVar
+                ],
+                rtol=1e-9, atol=1e-15
+            )
+        self.assertEqual(kernel.tCurrent, myFilter.tCurrent)
+
+    def testMatchesModularFilter(self):
+        self.compareFilters(True)
+
+    def testMatchesModularFilterNoBias(self):
+        self.compareFilters(False)
+
+    def testHistoryRing(self):
+        # The history is kept in fixed-length ring arrays
+        kernel = md.substates.oneDimensionalPositionVelocity.oneDPositionVelocityFilter(
+            'oneDPositionVelocity',
+            initialState(True),
+            storeLastStateVectors=5
+        )
+        self.assertEqual(len(kernel.stateVectorHistory), 1)
+        for step in range(4):
+            kernel.timeUpdateEKF(0.1)
+            kernel.measurementUpdateEKF(
+                {'position': {'value': 0.01 * step, 'var': 1e-4}}
+            )
+        history = kernel.stateVectorHistory
+        self.assertEqual(len(history), 5)
+        self.assertEqual(
+            [svDict['stateVectorID'] for svDict in history], [4, 5, 6, 7, 8]
+        )
+        self.assertEqual(
+            [svDict['aPriori'] for svDict in history],
+            [False, True, False, True, False]
+        )
+        np.testing.assert_allclose(kernel.timeList, [0.2, 0.3, 0.3, 0.4, 0.4])
+        np.testing.assert_array_equal(
+            history[-1]['stateVector'], kernel.stateVector
+        )
+        self.assertEqual(history[-1]['position'], kernel.currentPosition)
+        np.testing.assert_array_equal(
+            history[-1]['covariance'].value, kernel.covariance().value
+        )
+
+    def testCorrelationVectorINF(self):
+        # A correlation vector using the kernel as its internal navigation
+        # filter should give the same estimates as one using a ModularFilter
+        pulsar = md.signals.PeriodicXRaySource(
+            profile=profileFile,
+            avgPhotonFlux=5.0,
+            pulsedFraction=0.8,
+            phaseDerivatives={0: 0, 1: 1.0/0.00305},
+            RA=1.0,
+            DEC=0.3,
+            name='A'
+        )
+        correlationVectors = []
+        filters = []
+        for internalNavFilter in [buildModularFilter(True), buildKernel(True)]:
+            correlation = md.substates.CorrelationVector(
+                pulsar,
+                25,
+                pulsar.pulsarPeriod/26,
+                internalNavFilter=internalNavFilter,
+                tdoaStdDevThreshold=1,
+                velStdDevThreshold=1,
+                tdoaNoiseScaleFactor=1,
+                velocityNoiseScaleFactor=1
+            )
+            myFilter = md.ModularFilter()
+            myFilter.addStates('A', correlation)
+            myFilter.addSignalSource('A', pulsar)
+            correlationVectors.append(correlation)
+            filters.append(myFilter)
+
+        # The correlation vector and its INF feed back on each other, so
+        # rounding differences between the two INFs grow from photon to
+        # photon; the comparison is over a short run of photons
+        np.random.seed(2)
+        arrivalTimes = pulsar.generatePhotonArrivals(30, columnar=True).t
+        t = 0
+        for photonIndex in range(30):
+            dT = arrivalTimes[photonIndex] - t
+            t = arrivalTimes[photonIndex]
+            for myFilter in filters:
+                myFilter.timeUpdateEKF(dT)
+                myFilter.measurementUpdateEKF(
+                    {'t': {'value': t, 'var': 1e-12}}, 'A'
+                )
+
+            np.testing.assert_allclose(
+                filters[1].getGlobalStateVector(),
+                filters[0].getGlobalStateVector(),
+                rtol=1e-6, atol=1e-12
+            )
+            self.assertAlmostEqual(
+                correlationVectors[1].signalTDOA,
+                correlationVectors[0].signalTDOA,
+                places=9
+            )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,377 @@
+import unittest
+import os
+from context import modest as md
+import numpy as np
+
+profileFile = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    'pulsarData/profiles/B1821-24.txt'
+)
+
+
+class TestPeriodicXRaySource(unittest.TestCase):
+    def setUp(self):
+        self.pulsar = md.signals.PeriodicXRaySource(
+            profile=profileFile,
+            avgPhotonFlux=20.0,
+            pulsedFraction=0.8,
+            phaseDerivatives={0: 0.1, 1: 1.0/0.00305, 2: -1e-9, 3: 1e-15},
+            RA=1.0,
+            DEC=0.3,
+            name='A'
+        )
+        np.random.seed(0)
+        self.times = np.random.uniform(0, 1000, 500)
+
+    def testPhaseModel(self):
+        # Horner evaluation should match the Taylor series of the phase
+        # derivatives
+        t = self.times
+        expectedPhase = 0.1 + t/0.00305 - 1e-9*np.square(t)/2 + 1e-15*np.power(t, 3)/6
+        np.testing.assert_allclose(self.pulsar.getPhase(t), expectedPhase, rtol=1e-14)
+        expectedFrequency = 1/0.00305 - 1e-9*t + 1e-15*np.square(t)/2
+        np.testing.assert_allclose(
+            self.pulsar.getFrequency(t), expectedFrequency, rtol=1e-14
+        )
+
+    def testArraysMatchScalars(self):
+        t = self.times
+        tVar = np.concatenate([
+            np.zeros(100),
+            np.power(10, np.random.uniform(-14, -3, 400))
+        ])
+        np.random.shuffle(tVar)
+        dT = np.random.uniform(0, 0.01, len(t))
+
+        np.testing.assert_array_equal(
+            self.pulsar.getPhase(t), [self.pulsar.getPhase(x) for x in t]
+        )
+        np.testing.assert_array_equal(
+            self.pulsar.getSignal(t), [self.pulsar.getSignal(x) for x in t]
+        )
+        np.testing.assert_array_equal(
+            self.pulsar.getSignal(t, tVar),
+            [self.pulsar.getSignal(x, v) for x, v in zip(t, tVar)]
+        )
+        np.testing.assert_array_equal(
+            self.pulsar.signalIntegral(t, t + dT),
+            [self.pulsar.signalIntegral(x, x + d) for x, d in zip(t, dT)]
+        )
+        self.assertTrue(np.isscalar(self.pulsar.getSignal(t[0], tVar[0])))
+        self.assertTrue(np.isscalar(self.pulsar.signalIntegral(t[0], t[1])))
+
+    def testInterpolateProfile(self):
+        # The uniform grid lookup should agree with a search-based
+        # interpolation of the profile and its integral
+        phaseFraction = np.concatenate([
+            np.random.uniform(0, 1, 1000), self.pulsar.profileIndex
+        ])
+        np.testing.assert_allclose(
+            self.pulsar.interpolateProfile(phaseFraction),
+            np.interp(phaseFraction, self.pulsar.profileIndex, self.pulsar.profile),
+            rtol=1e-12, atol=1e-15
+        )
+        np.testing.assert_allclose(
+            self.pulsar.interpolateProfile(phaseFraction, integral=True),
+            np.interp(
+                phaseFraction,
+                self.pulsar.profileIndex,
+                self.pulsar.singlePeriodIntegral
+            ),
+            rtol=1e-12, atol=1e-15
+        )
+        np.testing.assert_array_equal(
+            self.pulsar.interpolateProfile(phaseFraction),
+            [self.pulsar.interpolateProfile(x) for x in phaseFraction]
+        )
+
+    def testFourierProfile(self):
+        fourierPulsar = md.signals.PeriodicXRaySource(
+            profile=profileFile,
+            avgPhotonFlux=20.0,
+            pulsedFraction=0.8,
+            phaseDerivatives={0: 0.1, 1: 1.0/0.00305, 2: -1e-9, 3: 1e-15},
+            RA=1.0,
+            DEC=0.3,
+            name='A',
+            profileHarmonics=256
+        )
+        t = self.times[0:50]
+        dT = np.random.uniform(0, 0.01, len(t))
+        peak = self.pulsar.peakAmplitude
+
+        # The series converges to the linearly interpolated profile
+        np.testing.assert_allclose(
+            fourierPulsar.fourierSignal(t), self.pulsar.getSignal(t),
+            atol=0.03 * peak
+        )
+        np.testing.assert_allclose(
+            fourierPulsar.fourierSignalIntegral(t, t + dT),
+            self.pulsar.signalIntegral(t, t + dT),
+            atol=1e-4 * peak
+        )
+        np.testing.assert_allclose(
+            fourierPulsar.fourierSignalIntegral(t, t + 3.2),
+            self.pulsar.signalIntegral(t, t + 3.2),
+            rtol=1e-6
+        )
+        derivativeStep = 1e-8
+        np.testing.assert_allclose(
+            fourierPulsar.fourierSignalDerivative(t),
+            (fourierPulsar.fourierSignal(t + derivativeStep) -
+             fourierPulsar.fourierSignal(t - derivativeStep)) /
+            (2 * derivativeStep),
+            rtol=1e-4, atol=1e-4 * peak / self.pulsar.pulsarPeriod
+        )
+
+        # Expected signal under normally distributed time, compared with a
+        # numerical convolution of the signal with the normal distribution
+        tSigma = 0.2 * self.pulsar.pulsarPeriod
+        tOffset = np.linspace(-6 * tSigma, 6 * tSigma, 2001)
+        weights = np.exp(-np.square(tOffset) / (2 * np.square(tSigma)))
+        weights = weights / np.sum(weights)
+        expectedSignal = [
+            np.sum(weights * self.pulsar.getSignal(tk + tOffset)) for tk in t
+        ]
+        np.testing.assert_allclose(
+            fourierPulsar.getSignal(t, np.square(tSigma)), expectedSignal,
+            atol=1e-3 * peak
+        )
+        np.testing.assert_array_equal(
+            fourierPulsar.getSignal(t, np.square(tSigma)),
+            fourierPulsar.fourierSignal(t, np.square(tSigma))
+        )
+        self.assertAlmostEqual(fourierPulsar.getSignal(t[0], 1.0), 20.0)
+        self.assertTrue(np.isscalar(fourierPulsar.getSignal(t[0], 1e-8)))
+
+    def testFourierSignalPositive(self):
+        # A few harmonics can't resolve the narrow pulse of B1957+20, and the
+        # truncated series rings below zero.  The expected signal must still
+        # never drop below the background rate.
+        pulsarArgs = {
+            'profile': os.path.join(os.path.dirname(profileFile), 'B1957+20.txt'),
+            'avgPhotonFlux': 20.0,
+            'pulsedFraction': 0.8,
+            'phaseDerivatives': {0: 0, 1: 1.0/0.0016},
+            'RA': 1.0,
+            'DEC': 0.3,
+            'name': 'B'
+        }
+        narrowPulsar = md.signals.PeriodicXRaySource(
+            profileHarmonics=4, **pulsarArgs
+        )
+        sampledPulsar = md.signals.PeriodicXRaySource(**pulsarArgs)
+        period = narrowPulsar.pulsarPeriod
+        t = np.linspace(0, period, 2001)
+        background = narrowPulsar.backgroundCountRate
+        self.assertTrue(np.all(narrowPulsar.fourierSignal(t) >= background))
+        for tSigma in [1e-6, 0.01, 0.05, 0.1, 0.3]:
+            self.assertTrue(np.all(
+                narrowPulsar.getSignal(t, np.square(tSigma * period)) >=
+                background
+            ))
+            self.assertTrue(np.all(
+                narrowPulsar.fourierSignal(t, np.square(tSigma * period)) >=
+                background
+            ))
+
+        # Below the resolution of the series, the sampled profile is used
+        np.testing.assert_array_equal(
+            narrowPulsar.getSignal(t, 1e-12), sampledPulsar.getSignal(t, 1e-12)
+        )
+        mixedVar = np.where(t < period/2, 1e-12, np.square(0.3 * period))
+        np.testing.assert_array_equal(
+            narrowPulsar.getSignal(t, mixedVar),
+            np.where(
+                t < period/2,
+                sampledPulsar.getSignal(t, mixedVar),
+                narrowPulsar.fourierSignal(t, mixedVar)
+            )
+        )
+
+    def testPhaseCache(self):
+        from fractions import Fraction
+        phaseDerivatives = {0: 0.1, 1: 327.40566, 2: -1.7e-13, 3: 1e-24}
+        cachedPulsar = md.signals.PeriodicXRaySource(
+            profile=profileFile,
+            avgPhotonFlux=20.0,
+            pulsedFraction=0.8,
+            phaseDerivatives=phaseDerivatives,
+            RA=1.0,
+            DEC=0.3,
+            name='A',
+            phaseCacheSpan=100.0
+        )
+        # Times long after the phase epoch, where the fractional part of the
+        # phase polynomial loses precision when evaluated directly
+        t = np.sort(np.random.uniform(3e8, 3e8 + 86400, 200))
+
+        def exactFractionalPhase(x):
+            phase = sum(
+                Fraction(coefficient) * Fraction(float(x))**order
+                for order, coefficient in
+                enumerate(cachedPulsar.phaseCoefficients[::-1])
+            )
+            return float(phase - int(phase))
+
+        expectedPhase = np.array([exactFractionalPhase(x) for x in t])
+        integerCycles, fractionalPhase = cachedPulsar.getPhaseCycles(t)
+        phaseError = np.mod(fractionalPhase - expectedPhase + 0.5, 1) - 0.5
+        self.assertLess(np.max(np.abs(phaseError)), 1e-9)
+        self.assertTrue(np.all(fractionalPhase >= 0))
+        self.assertTrue(np.all(fractionalPhase < 1))
+
+        # Only the segments containing the requested times are built
+        self.assertEqual(
+            len(cachedPulsar.phaseSegments),
+            len(np.unique(np.floor(t/100.0)))
+        )
+
+        # Arrays and scalars use the same segments
+        scalarCycles = [cachedPulsar.getPhaseCycles(x) for x in t]
+        np.testing.assert_array_equal(
+            integerCycles, [cycles for cycles, _ in scalarCycles]
+        )
+        np.testing.assert_array_equal(
+            fractionalPhase, [fraction for _, fraction in scalarCycles]
+        )
+
+        # Distant times don't build the segments in between
+        cachedPulsar.getPhaseCycles(np.array([t[0], 1e12]))
+        self.assertEqual(
+            len(cachedPulsar.phaseSegments),
+            len(np.unique(np.floor(t/100.0))) + 1
+        )
+
+    def testGeneratePhotonArrivals(self):
+        class Dynamics():
+            def getRangeFunction(self, unitVector, tFinal):
+                def rangeFunction(t):
+                    return 100.0 * np.sin(t/50.0)
+                return rangeFunction
+
+            def attitude(self, t):
+                return [md.utils.euler2quaternion([0.1, 0.2, tk/100.0]) for tk in t]
+
+        class Detector():
+            TOA_StdDev = 1e-6
+            AOA_StdDev = 1e-4
+            FOV = 1.0
+
+        class Spacecraft():
+            dynamics = Dynamics()
+            detector = Detector()
+
+        np.random.seed(1)
+        photonBatch = self.pulsar.generatePhotonArrivals(
+            200, spacecraft=Spacecraft(), columnar=True
+        )
+        arrivalTimes = photonBatch.t
+        nPhotons = len(photonBatch)
+        self.assertLess(
+            np.abs(nPhotons - (200 * self.pulsar.flux)),
+            5 * np.sqrt(200 * self.pulsar.flux)
+        )
+        self.assertTrue(np.all(np.diff(arrivalTimes) > -1e-5))
+        self.assertTrue(np.all(photonBatch.tVar == 1e-12))
+        self.assertEqual(photonBatch.unitVec.shape, (nPhotons, 3))
+        self.assertEqual(photonBatch.name[0], 'A')
+
+        # Arrival vectors are the source unit vector in the body frame
+        photonIndex = nPhotons // 2
+        bodyUnitVec = (
+            Spacecraft.dynamics.attitude([arrivalTimes[photonIndex]])[0]
+            .rotation_matrix.transpose().dot(self.pulsar.unitVec())
+        )
+        np.testing.assert_allclose(
+            photonBatch.unitVec[photonIndex], bodyUnitVec, atol=1e-3
+        )
+
+        # The dict-list output holds the same photons
+        photonList = photonBatch.toList()
+        self.assertEqual(len(photonList), nPhotons)
+        self.assertEqual(photonList[photonIndex]['t']['value'], arrivalTimes[photonIndex])
+        self.assertEqual(
+            photonList[photonIndex]['RA']['value'], photonBatch.RA[photonIndex]
+        )
+        self.assertEqual(photonList[photonIndex]['RA']['var'], 1e-8)
+        self.assertEqual(photonList[photonIndex]['name'], 'A')
+
+    def testGenerateNoPhotons(self):
+        class UserData(dict):
+            __getattr__ = dict.__getitem__
+
+        class Spacecraft():
+            dynamics = md.spacecraft.simulation.SimulatedOrbitalDynamics(
+                UserData(dynamics=UserData()), None
+            )
+
+        # An empty batch gives an empty stack of attitude matrices
+        self.assertEqual(
+            Spacecraft.dynamics.attitudeMatrix(np.array([])).shape, (0, 3, 3)
+        )
+
+        faintPulsar = md.signals.PeriodicXRaySource(
+            profile=profileFile,
+            avgPhotonFlux=1e-6,
+            pulsedFraction=0.8,
+            phaseDerivatives={0: 0, 1: 1.0/0.00305},
+            RA=1.0,
+            DEC=0.3,
+            name='A'
+        )
+        np.random.seed(1)
+        photonBatch = faintPulsar.generatePhotonArrivals(
+            10, spacecraft=Spacecraft(), columnar=True
+        )
+        self.assertEqual(len(photonBatch), 0)
+        self.assertEqual(photonBatch.unitVec.shape, (0, 3))
+        self.assertEqual(
+            Spacecraft.dynamics.attitudeMatrix(np.array([])).shape, (0, 3, 3)
+        )
+
+    def testInverseCDFArrivals(self):
+        # The inverse of the profile integral should recover the phase
+        integral = np.random.uniform(0, self.pulsar.singlePeriodIntegral[-1], 1000)
+        np.testing.assert_allclose(
+            self.pulsar.phaseFractionIntegral(
+                self.pulsar.inversePhaseFractionIntegral(integral)
+            ),
+            integral,
+            rtol=1e-10
+        )
+
+        def rangeFunction(t):
+            return 3000.0 * np.sin(t/30.0)
+
+        np.random.seed(2)
+        tMax = 300
+        arrivalTimes = self.pulsar.generateArrivalTimesInverseCDF(
+            tMax, rangeFunction=rangeFunction
+        )
+        expectedCount = self.pulsar.signalIntegral(0, tMax)
+        self.assertLess(
+            np.abs(len(arrivalTimes) - expectedCount), 5 * np.sqrt(expectedCount)
+        )
+        self.assertTrue(np.all(np.diff(arrivalTimes) >= 0))
+
+        # Received phase of the photons should follow the profile
+        receivedPhase = self.pulsar.getPhaseCycles(
+            arrivalTimes + rangeFunction(arrivalTimes)/self.pulsar.speedOfLight()
+        )[1]
+        phaseBins = np.linspace(0, 1, 33)
+        histogram = np.histogram(receivedPhase, phaseBins)[0]
+        expectedHistogram = (
+            np.diff(self.pulsar.phaseFractionIntegral(phaseBins)) *
+            self.pulsar.scaleFactor * tMax / self.pulsar.pulsarPeriod +
+            self.pulsar.backgroundCountRate * tMax / 32
+        )
+        chiSquare = np.sum(np.square(histogram - expectedHistogram)/expectedHistogram)
+        self.assertLess(chiSquare, 70)
+
+        with self.assertRaises(ValueError):
+            self.pulsar.generatePhotonArrivals(10, method='unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
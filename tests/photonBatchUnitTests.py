@@ -0,0 +1,238 @@
+import unittest
+import os
+from context import modest as md
+import numpy as np
+
+profileFile = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    'pulsarData/profiles/B1821-24.txt'
+)
+
+
+class TestPhotonBatch(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.photonList = [
+            {
+                't': {'value': t, 'var': 1e-12},
+                'RA': {'value': np.random.normal(), 'var': 1e-6},
+                'DEC': {'value': np.random.normal(), 'var': 2e-6},
+                'energy': {'value': np.random.uniform(2, 10), 'var': 0.1},
+                'name': 'A'
+            }
+            for t in np.sort(np.random.uniform(0, 10, 20))
+        ]
+
+    def testListRoundTrip(self):
+        photonBatch = md.utils.PhotonBatch.fromList(self.photonList)
+        self.assertEqual(len(photonBatch), 20)
+        self.assertIsNone(photonBatch.unitVec)
+        for photon, batchPhoton in zip(self.photonList, photonBatch):
+            self.assertEqual(photon, batchPhoton)
+        self.assertEqual(photonBatch[3], self.photonList[3])
+        self.assertEqual(photonBatch.toList(), self.photonList)
+
+        # Column dicts can be converted back and forth as well
+        columnBatch = md.utils.PhotonBatch.fromColumns(photonBatch.toColumns())
+        self.assertEqual(columnBatch.toList(), self.photonList)
+
+    def testSliceConcatenateSort(self):
+        photonBatch = md.utils.PhotonBatch.fromList(self.photonList)
+
+        # Slices are views of the original columns
+        photonSlice = photonBatch[5:10]
+        self.assertEqual(len(photonSlice), 5)
+        self.assertTrue(np.shares_memory(photonSlice.t, photonBatch.t))
+        self.assertEqual(photonSlice[0], self.photonList[5])
+
+        # Columns missing from some of the batches are left out of those
+        # photons
+        backgroundBatch = md.utils.PhotonBatch(
+            np.random.uniform(0, 10, 5),
+            unitVec=np.tile([0, 0, 1.0], [5, 1]),
+            name='background'
+        )
+        combinedBatch = md.utils.PhotonBatch.concatenate(
+            [photonBatch, backgroundBatch]
+        ).sort()
+        self.assertEqual(len(combinedBatch), 25)
+        self.assertTrue(np.all(np.diff(combinedBatch.t) >= 0))
+        for photon in combinedBatch:
+            if photon['name'] == 'background':
+                self.assertEqual(set(photon.keys()), {'t', 'unitVec', 'name'})
+            else:
+                self.assertNotIn('unitVec', photon)
+                self.assertIn(photon, self.photonList)
+
+    def testFilterBatchUpdate(self):
+        pulsar = md.signals.PeriodicXRaySource(
+            profile=profileFile,
+            avgPhotonFlux=20.0,
+            pulsedFraction=0.8,
+            phaseDerivatives={0: 0, 1: 1.0/0.00305},
+            RA=1.0,
+            DEC=0.3,
+            name='A'
+        )
+        np.random.seed(1)
+        photonBatch = pulsar.generatePhotonArrivals(2, columnar=True)
+
+        filters = []
+        for runIndex in range(2):
+            myFilter = md.ModularFilter()
+            myFilter.addStates(
+                'A',
+                md.substates.CorrelationVector(pulsar, 20, pulsar.pulsarPeriod/21)
+            )
+            myFilter.addSignalSource('A', pulsar)
+            filters.append(myFilter)
+
+        # Updating with the batch gives the same result as updating with one
+        # photon at a time
+        filters[0].measurementUpdateBatch(photonBatch)
+        for photon in photonBatch.toList():
+            filters[1].timeUpdateEKF(photon['t']['value'] - filters[1].tCurrent)
+            filters[1].measurementUpdateEKF(photon, photon['name'])
+
+        np.testing.assert_array_equal(
+            filters[0].getGlobalStateVector(), filters[1].getGlobalStateVector()
+        )
+        self.assertEqual(filters[0].tCurrent, photonBatch.t[-1])
+
+        with self.assertRaises(ValueError):
+            filters[0].measurementUpdateBatch(photonBatch, updateMethod='unknown')
+
+    def testPhotonChunks(self):
+        pulsar = md.signals.PeriodicXRaySource(
+            profile=profileFile,
+            avgPhotonFlux=20.0,
+            pulsedFraction=0.8,
+            phaseDerivatives={0: 0, 1: 1.0/0.00305},
+            RA=1.0,
+            DEC=0.3,
+            name='A'
+        )
+
+        # Fixed-length chunks cover consecutive intervals of time
+        chunks = list(pulsar.generatePhotonChunks(tMax=20, chunkLength=3, seed=1))
+        self.assertEqual(len(chunks), 7)
+        for chunkIndex, chunk in enumerate(chunks):
+            self.assertTrue(np.all(chunk.t >= chunkIndex * 3))
+            self.assertTrue(np.all(chunk.t < np.min([(chunkIndex + 1) * 3, 20])))
+        arrivalTimes = np.concatenate([chunk.t for chunk in chunks])
+        self.assertLess(np.abs(len(arrivalTimes) - 400), 5 * np.sqrt(400))
+
+        # The stream does not depend on use of the global random state in
+        # between chunks
+        otherChunks = []
+        for chunk in pulsar.generatePhotonChunks(tMax=20, chunkLength=3, seed=1):
+            np.random.uniform()
+            otherChunks.append(chunk)
+        np.testing.assert_array_equal(
+            np.concatenate([chunk.t for chunk in otherChunks]), arrivalTimes
+        )
+
+        # Fixed-size chunks of an unbounded stream
+        background = md.signals.UniformNoiseXRaySource(photonFlux=50.0)
+        photonStream = background.generatePhotonChunks(chunkSize=100, seed=2)
+        lastTime = 0
+        for chunkIndex in range(5):
+            chunk = next(photonStream)
+            self.assertEqual(len(chunk), 100)
+            self.assertTrue(np.all(chunk.t >= lastTime))
+            self.assertTrue(np.all(chunk.name == 'background'))
+            lastTime = chunk.t[-1]
+
+        with self.assertRaises(ValueError):
+            next(background.generatePhotonChunks(tMax=1))
+
+        # Measurement noise doesn't break the time order within or across
+        # chunks, and no photons are lost at the chunk boundaries
+        for chunkArgs in [{'chunkLength': 0.05}, {'chunkSize': 7}]:
+            chunks = list(background.generatePhotonChunks(
+                tMax=20, seed=5, TOA_StdDev=1e-2, **chunkArgs
+            ))
+            noisyTimes = np.concatenate([chunk.t for chunk in chunks])
+            self.assertTrue(np.all(np.diff(noisyTimes) >= 0))
+            self.assertLess(np.abs(len(noisyTimes) - 1000), 5 * np.sqrt(1000))
+        self.assertEqual(len(chunks[0]), 7)
+
+        class Detector():
+            TOA_StdDev = 1e-3
+            AOA_StdDev = 1e-4
+            FOV = 1.0
+
+        class Spacecraft():
+            detector = Detector()
+
+        chunks = list(pulsar.generatePhotonChunks(
+            tMax=20, chunkLength=0.05, seed=6, spacecraft=Spacecraft()
+        ))
+        noisyTimes = np.concatenate([chunk.t for chunk in chunks])
+        self.assertTrue(np.all(np.diff(noisyTimes) >= 0))
+        self.assertTrue(np.all(np.diff(chunks[0].t) >= 0))
+
+    def testMergePhotonStreams(self):
+        pulsar = md.signals.PeriodicXRaySource(
+            profile=profileFile,
+            avgPhotonFlux=20.0,
+            pulsedFraction=0.8,
+            phaseDerivatives={0: 0, 1: 1.0/0.00305},
+            RA=1.0,
+            DEC=0.3,
+            name='A'
+        )
+        background = md.signals.UniformNoiseXRaySource(photonFlux=50.0)
+
+        def photonSources():
+            return [
+                pulsar.generatePhotonChunks(tMax=10, chunkSize=37, seed=3),
+                background.generatePhotonChunks(tMax=10, chunkLength=0.7, seed=4),
+                self.photonList
+            ]
+
+        mergedChunks = list(md.utils.mergePhotonStreams(photonSources()))
+        mergedTimes = np.concatenate([chunk.t for chunk in mergedChunks])
+        self.assertTrue(np.all(np.diff(mergedTimes) >= 0))
+
+        # The stream merge gives the same photons as merging everything at
+        # once
+        allPhotons = md.utils.mergePhotonBatches([
+            md.utils.PhotonBatch.concatenate(list(photonSource))
+            if not isinstance(photonSource, list) else photonSource
+            for photonSource in photonSources()
+        ])
+        np.testing.assert_array_equal(mergedTimes, allPhotons.t)
+        np.testing.assert_array_equal(
+            np.concatenate([chunk.name for chunk in mergedChunks]),
+            allPhotons.name
+        )
+        self.assertEqual(
+            set(allPhotons.name), {'A', 'background'}
+        )
+
+        # Streams with TOA measurement noise are still merged in time order
+        noisyTimes = np.concatenate([
+            chunk.t for chunk in md.utils.mergePhotonStreams([
+                background.generatePhotonChunks(
+                    tMax=10, chunkLength=0.7, seed=5, TOA_StdDev=1e-3
+                ),
+                md.signals.UniformNoiseXRaySource(
+                    photonFlux=30.0
+                ).generatePhotonChunks(
+                    tMax=10, chunkSize=23, seed=6, TOA_StdDev=1e-3
+                )
+            ])
+        ])
+        self.assertTrue(np.all(np.diff(noisyTimes) >= 0))
+        self.assertTrue(np.abs(len(noisyTimes) - 800) < 150)
+
+        # Out-of-order sources are rejected rather than merged silently
+        unsortedBatch = md.utils.PhotonBatch.fromList(self.photonList)
+        unsortedBatch = unsortedBatch[::-1]
+        with self.assertRaises(ValueError):
+            list(md.utils.mergePhotonStreams([unsortedBatch]))
+
+
+if __name__ == '__main__':
+    unittest.main()
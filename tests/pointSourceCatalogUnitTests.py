@@ -0,0 +1,98 @@
+import unittest
+from context import modest as md
+import numpy as np
+
+
+class TestPointSourceCatalog(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(5)
+        self.sources = [
+            md.signals.StaticXRayPointSource(
+                RA,
+                DEC,
+                photonCountRate=flux,
+                name='source%i' % index,
+                extent=extent,
+                useTOAprobability=(index % 2 == 0)
+            )
+            for index, (RA, DEC, flux, extent) in enumerate(zip(
+                np.random.uniform(0.9, 1.1, 8),
+                np.random.uniform(0.2, 0.4, 8),
+                np.random.uniform(0.1, 10, 8),
+                [0, 0, 1e-3, 0, 2e-2, 0, 0, 5e-3]
+            ))
+        ]
+        self.catalog = md.signals.PointSourceCatalog(self.sources)
+
+        self.attitude = md.substates.Attitude(
+            attitudeQuaternion=md.utils.euler2quaternion([0.1, -0.3, 1.0]),
+            attitudeErrorCovariance=np.diag([1e-4, 2e-4, 5e-5])
+        )
+        self.stateDict = {'attitude': {'stateObject': self.attitude}}
+
+        # Photons near the sources, as seen in the body frame
+        bodyUnitVec = self.catalog.predictedUnitVectors(self.attitude)
+        bodyUnitVec = (
+            bodyUnitVec[np.random.randint(8, size=20)] +
+            np.random.normal(scale=3e-3, size=[20, 3])
+        )
+        RA, DEC = md.utils.spacegeometry.unitVector2RaDec(bodyUnitVec.T)
+        self.photons = md.utils.PhotonBatch.fromColumns({
+            't': {'value': np.linspace(0, 1, 20)},
+            'RA': {'value': RA, 'var': 1e-5},
+            'DEC': {'value': DEC, 'var': 1e-5}
+        })
+
+    def testMatchesSources(self):
+        batchProbabilities = self.catalog.computeAssociationProbabilities(
+            self.photons, self.stateDict
+        )
+        self.assertEqual(batchProbabilities.shape, (20, 8))
+        self.assertTrue(np.any(batchProbabilities > 0))
+        for photonIndex, photon in enumerate(self.photons):
+            probabilities = self.catalog.computeAssociationProbabilities(
+                photon, self.stateDict
+            )
+            expectedProbabilities = [
+                source.computeAssociationProbability(photon, self.stateDict)
+                for source in self.sources
+            ]
+            np.testing.assert_allclose(
+                probabilities, expectedProbabilities, rtol=1e-8
+            )
+            np.testing.assert_allclose(
+                batchProbabilities[photonIndex], expectedProbabilities, rtol=1e-8
+            )
+
+        self.assertIs(self.catalog['source3'], self.sources[3])
+        with self.assertRaises(ValueError):
+            md.signals.PointSourceCatalog(self.sources + [self.sources[0]])
+
+    def testFilterProbabilities(self):
+        background = md.signals.UniformNoiseXRaySource(photonFlux=1.0)
+
+        sourceFilter = md.ModularFilter()
+        sourceFilter.addStates('attitude', self.attitude)
+        sourceFilter.addSignalSource('background', background)
+        for source in self.sources:
+            sourceFilter.addSignalSource(source.name, source)
+
+        catalogFilter = md.ModularFilter()
+        catalogFilter.addStates('attitude', self.attitude)
+        catalogFilter.addSignalSource('background', background)
+        catalogFilter.addSignalSourceCatalog('catalog', self.catalog)
+        self.assertIs(catalogFilter.signalSources['source0'], self.sources[0])
+
+        for photon in self.photons:
+            expectedDict = sourceFilter.computeAssociationProbabilities(photon)
+            probabilityDict = catalogFilter.computeAssociationProbabilities(photon)
+            self.assertEqual(set(probabilityDict), set(expectedDict))
+            self.assertAlmostEqual(sum(probabilityDict.values()), 1)
+            for signalName in expectedDict:
+                self.assertAlmostEqual(
+                    probabilityDict[signalName], expectedDict[signalName]
+                )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from context import modest as md
+import numpy as np
+
+
+class TestPoissonSources(unittest.TestCase):
+    def testGenerateEvents(self):
+        np.random.seed(0)
+        source = md.signals.StaticPoissonSource(100.0)
+        events = source.generateEvents(60, t0=10)
+        self.assertLess(np.abs(len(events) - 5000), 5 * np.sqrt(5000))
+        self.assertTrue(np.all(np.diff(events) >= 0))
+        self.assertTrue(np.all((events >= 10) & (events < 60)))
+
+        # Gaps between events should be exponentially distributed
+        self.assertAlmostEqual(np.mean(np.diff(events)), 0.01, delta=5e-4)
+
+    def testBackgroundArrivals(self):
+        np.random.seed(1)
+        background = md.signals.UniformNoiseXRaySource(photonFlux=200.0, detectorFOV=30)
+        photonBatch = background.generatePhotonArrivals(
+            10, AOA_StdDev=1e-3, TOA_StdDev=1e-6, columnar=True
+        )
+        self.assertTrue(np.all(photonBatch.tVar == 1e-12))
+        self.assertTrue(np.all(photonBatch.RAVar == 1e-6))
+        np.testing.assert_allclose(
+            md.utils.spacegeometry.sidUnitVec(photonBatch.RA, photonBatch.DEC),
+            photonBatch.unitVec.transpose(),
+            atol=1e-12
+        )
+        # All arrival vectors are inside the field of view
+        self.assertTrue(np.all(photonBatch.unitVec[:, 0] >= np.cos(np.pi/6)))
+
+        photonList = background.generatePhotonArrivals(10)
+        self.assertEqual(photonList[0]['name'], 'background')
+        self.assertEqual(set(photonList[0].keys()), {'t', 'unitVec', 'RA', 'DEC', 'name'})
+
+    def testPointSourceArrivals(self):
+        np.random.seed(2)
+        star = md.signals.StaticXRayPointSource(0.5, -0.2, photonCountRate=50.0, name='star')
+
+        def attitude(t):
+            return [md.utils.euler2quaternion([0, 0.1, 1e-2 * tk]) for tk in t]
+
+        photonBatch = star.generatePhotonArrivals(
+            20, attitude=attitude, columnar=True
+        )
+        self.assertLess(np.abs(len(photonBatch) - 1000), 5 * np.sqrt(1000))
+        for photonIndex in [0, len(photonBatch) // 2, len(photonBatch) - 1]:
+            expectedUnitVec = attitude(
+                [photonBatch.t[photonIndex]]
+            )[0].rotation_matrix.transpose().dot(star.unitVec())
+            np.testing.assert_allclose(
+                photonBatch.unitVec[photonIndex], expectedUnitVec, atol=1e-12
+            )
+            expectedRa, expectedDec = md.utils.spacegeometry.unitVector2RaDec(
+                expectedUnitVec
+            )
+            self.assertAlmostEqual(photonBatch.RA[photonIndex], expectedRa, places=12)
+            self.assertAlmostEqual(photonBatch.DEC[photonIndex], expectedDec, places=12)
+        self.assertTrue(np.all(photonBatch.name == 'star'))
+
+        # Stacked rotation matrices give the same arrival vectors as the
+        # quaternions
+        def attitudeMatrix(t):
+            t = np.asarray(t)
+            return md.utils.euler2rotationMatrix([0 * t, 0.1 + 0 * t, 1e-2 * t])
+
+        np.testing.assert_allclose(
+            attitudeMatrix(photonBatch.t),
+            [q.rotation_matrix for q in attitude(photonBatch.t)],
+            atol=1e-14
+        )
+        np.random.seed(2)
+        matrixBatch = star.generatePhotonArrivals(
+            20, attitudeMatrix=attitudeMatrix, columnar=True
+        )
+        np.testing.assert_array_equal(matrixBatch.t, photonBatch.t)
+        np.testing.assert_allclose(matrixBatch.unitVec, photonBatch.unitVec, atol=1e-14)
+
+        # The per-photon interface accepts sequences of attitudes as well
+        arrivalVectors = star.generateArrivalVector(attitude(photonBatch.t[0:3]))
+        self.assertEqual(len(arrivalVectors), 3)
+        self.assertAlmostEqual(arrivalVectors[1]['RA']['value'], photonBatch.RA[1], places=12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import unittest
+import os
+from context import modest as md
+import numpy as np
+
+profileFile = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    'pulsarData/profiles/B1821-24.txt'
+)
+
+
+class TestPulsarAcquisition(unittest.TestCase):
+    def setUp(self):
+        self.pulsar = md.signals.PeriodicXRaySource(
+            profile=profileFile,
+            avgPhotonFlux=20.0,
+            pulsedFraction=0.8,
+            phaseDerivatives={0: 0, 1: 1.0/0.00305},
+            RA=1.0,
+            DEC=0.3,
+            name='A'
+        )
+        self.trueTDOA = 0.0011
+
+        # Photon arrival times generated by thinning
+        np.random.seed(3)
+        tMax = 40
+        candidates = np.cumsum(
+            np.random.exponential(
+                1/self.pulsar.peakAmplitude,
+                int(tMax * self.pulsar.peakAmplitude * 1.2)
+            )
+        )
+        candidates = candidates[candidates < tMax]
+        signal = np.array(
+            [self.pulsar.getSignal(t + self.trueTDOA) for t in candidates]
+        )
+        self.arrivalTimes = candidates[
+            np.random.uniform(size=len(candidates)) <
+            signal/self.pulsar.peakAmplitude
+        ]
+
+    def testTDOA(self):
+        acquisition = md.utils.pulsarAcquisition.acquireTDOA(
+            self.arrivalTimes, self.pulsar
+        )
+        self.assertEqual(acquisition['nPhotons'], len(self.arrivalTimes))
+        self.assertLess(
+            np.abs(acquisition['signalTDOA'] - self.trueTDOA),
+            4 * np.sqrt(acquisition['TDOAVar'])
+        )
+
+        # Photon measurement dicts are accepted as well
+        photons = [{'t': {'value': t}} for t in self.arrivalTimes]
+        self.assertEqual(
+            md.utils.pulsarAcquisition.acquireTDOA(
+                photons, self.pulsar
+            )['signalTDOA'],
+            acquisition['signalTDOA']
+        )
+
+    def testCorrelationVector(self):
+        # The acquired correlation vector should be the average over the
+        # photons of the signal integral measured by each tap
+        filterOrder = 40
+        dT = self.pulsar.pulsarPeriod/(filterOrder + 1)
+        photons = self.arrivalTimes[0:200]
+        acquisition = md.utils.pulsarAcquisition.acquireTDOA(
+            photons, self.pulsar, filterOrder=filterOrder, dT=dT
+        )
+        expectedVector = np.array([
+            np.mean([
+                self.pulsar.signalIntegral(
+                    t + (tap * dT) - dT/2, t + (tap * dT) + dT/2
+                )
+                for t in photons
+            ])
+            for tap in range(filterOrder)
+        ])
+        np.testing.assert_allclose(
+            acquisition['correlationVector'], expectedVector, rtol=5e-3
+        )
+        self.assertTrue(
+            np.all(np.diag(acquisition['correlationVectorCovariance']) > 0)
+        )
+
+        # A correlation vector initialized from the acquisition is in peak
+        # lock after the first photon
+        correlation = md.substates.CorrelationVector(
+            self.pulsar,
+            filterOrder,
+            dT,
+            correlationVector=acquisition['correlationVector'],
+            correlationVectorCovariance=acquisition['correlationVectorCovariance'],
+            signalTDOA=acquisition['signalTDOA'],
+            TDOAVar=acquisition['TDOAVar']
+        )
+        myFilter = md.ModularFilter()
+        myFilter.addStates('A', correlation)
+        myFilter.addSignalSource('A', self.pulsar)
+        t = self.arrivalTimes[200]
+        myFilter.timeUpdateEKF(t - photons[-1])
+        myFilter.measurementUpdateEKF({'t': {'value': t, 'var': 1e-12}}, 'A')
+        self.assertTrue(correlation.peakLock)
+        self.assertLess(
+            np.abs(np.mod(correlation.signalTDOA, self.pulsar.pulsarPeriod) -
+                   self.trueTDOA),
+            dT
+        )
+
+    def testTDOAVelocity(self):
+        # Photons from a pulsar whose delay changes with time
+        trueVelocity = 3e-5
+        np.random.seed(4)
+        tMax = 40
+        candidates = np.cumsum(
+            np.random.exponential(
+                1/self.pulsar.peakAmplitude,
+                int(tMax * self.pulsar.peakAmplitude * 1.2)
+            )
+        )
+        candidates = candidates[candidates < tMax]
+        signal = np.array([
+            self.pulsar.getSignal(t + self.trueTDOA + (trueVelocity * t))
+            for t in candidates
+        ])
+        arrivalTimes = candidates[
+            np.random.uniform(size=len(candidates)) <
+            signal/self.pulsar.peakAmplitude
+        ]
+
+        acquisition = md.utils.pulsarAcquisition.acquireTDOAVelocity(
+            arrivalTimes,
+            self.pulsar,
+            0,
+            5e-5,
+            filterOrder=40,
+            referenceTime=0
+        )
+        self.assertLess(
+            np.abs(acquisition['signalTDOA'] - self.trueTDOA),
+            4 * np.sqrt(acquisition['TDOAVar'])
+        )
+        self.assertLess(
+            np.abs(acquisition['velocity'] - trueVelocity),
+            4 * np.sqrt(acquisition['velocityVar'])
+        )
+        self.assertEqual(len(acquisition['correlationVector']), 40)
+
+        # Splitting the velocity trials across processes gives the same result
+        pooledAcquisition = md.utils.pulsarAcquisition.acquireTDOAVelocity(
+            arrivalTimes,
+            self.pulsar,
+            0,
+            5e-5,
+            referenceTime=0,
+            processes=2
+        )
+        np.testing.assert_array_equal(
+            pooledAcquisition['trialPeaks'], acquisition['trialPeaks']
+        )
+        self.assertEqual(pooledAcquisition['velocity'], acquisition['velocity'])
+
+        # A single instant cannot resolve the velocity
+        with self.assertRaises(ValueError):
+            md.utils.pulsarAcquisition.acquireTDOAVelocity(
+                np.ones(10), self.pulsar, 0, 5e-5
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()